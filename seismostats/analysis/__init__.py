@@ -1,2 +1,3 @@
 # flake8: noqa
-from seismostats.analysis.estimate_mc import mc_ks, mc_max_curvature
+from seismostats.analysis.estimate_mc import (KSDistanceCache, mc_ks,
+                                              mc_max_curvature)
@@ -4,6 +4,7 @@ from typing import Literal
 import numpy as np
 
 from seismostats.analysis.bvalue.base import BValueEstimator
+from seismostats.analysis.bvalue.by_mc import estimate_b_by_mc
 from seismostats.analysis.bvalue.classic import ClassicBValueEstimator
 from seismostats.analysis.bvalue.more_positive import \
     BMorePositiveBValueEstimator
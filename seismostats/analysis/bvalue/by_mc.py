@@ -0,0 +1,197 @@
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Literal
+
+import numpy as np
+
+from seismostats.analysis.bvalue.base import BValueEstimator
+from seismostats.analysis.bvalue.classic import ClassicBValueEstimator
+from seismostats.analysis.bvalue.utils import b_value_to_beta, beta_to_b_value
+from seismostats.analysis.bvalue.utsu import UtsuBValueEstimator
+from seismostats.utils._config import get_option
+from seismostats.utils.binning import binning_test, get_fmd
+
+# b-value estimators that only depend on the count, the sum and the sum of
+# squares of the magnitudes above mc
+_SUFFIX_METHODS = (ClassicBValueEstimator, UtsuBValueEstimator)
+
+
+def _b_values_from_fmd(
+    bins: np.ndarray,
+    counts: np.ndarray,
+    mcs: np.ndarray,
+    delta_m: float,
+    b_method: BValueEstimator = ClassicBValueEstimator,
+    weighted_counts: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Return the b-values, their Shi and Bolt standard deviations and the
+    number of events above each of the ``mcs``, derived from suffix counts,
+    sums and sums of squares of the frequency-magnitude distribution. Only
+    implemented for the estimators in ``_SUFFIX_METHODS``.
+
+    Args:
+        bins:       bin centers of the FMD in ascending order, as returned by
+                ``get_fmd``
+        counts:     counts per bin
+        mcs:        completeness magnitudes
+        delta_m:    discretization of the magnitudes
+        b_method:   b-value estimator
+        weighted_counts: sum of the weights of the magnitudes per bin. If
+                None, all magnitudes have the same weight.
+
+    Returns:
+        b_values:   b-values for each mc
+        stds:       Shi and Bolt standard deviations of the b-values
+        ns:         number of events above each mc
+    '''
+    mcs = np.asarray(mcs, dtype=float)
+    if weighted_counts is None:
+        weighted_counts = counts
+
+    def suffix_sum(values):
+        return np.append(np.cumsum(values[::-1])[::-1], 0)[idx]
+
+    # magnitudes relative to the smallest bin, which reduces cancellation
+    # in the variance
+    x = bins - bins[0] if len(bins) > 0 else bins
+    idx = np.searchsorted(bins, mcs - delta_m / 2)
+    ns = suffix_sum(counts)
+    sum_w = suffix_sum(weighted_counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = suffix_sum(weighted_counts * x) / sum_w
+        std_mags = np.sqrt(np.maximum(
+            suffix_sum(weighted_counts * x**2) / sum_w - mean**2, 0))
+        mean_above_mc = mean + bins[0] - mcs if len(bins) > 0 else mean
+
+        if b_method is UtsuBValueEstimator:
+            beta = 1 / (mean_above_mc + delta_m / 2)
+        elif delta_m > 0:
+            beta = 1 / delta_m * np.log(1 + delta_m / mean_above_mc)
+        else:
+            beta = 1 / mean_above_mc
+
+        b_values = beta_to_b_value(beta)
+        stds = np.log(10) * b_values**2 * std_mags / np.sqrt(sum_w - 1)
+
+    return b_values, stds, ns
+
+
+def _estimate_b_mc(args: tuple) -> tuple[float, float, int]:
+    # module level, so that it can be run in a process pool
+    magnitudes, mc, delta_m, weights, b_parameter, method, kwargs = args
+    estimator = method()
+    estimator.calculate(magnitudes, mc=mc, delta_m=delta_m, weights=weights,
+                        **kwargs)
+    if b_parameter == 'beta':
+        return estimator.beta, estimator.std_beta, estimator.n
+    return estimator.b_value, estimator.std, estimator.n
+
+
+def estimate_b_by_mc(
+    magnitudes: np.ndarray,
+    mcs: np.ndarray,
+    delta_m: float,
+    weights: np.ndarray | None = None,
+    b_parameter: Literal['b_value', 'beta'] = 'b_value',
+    method: BValueEstimator = ClassicBValueEstimator,
+    n_jobs: int | None = None,
+    **kwargs
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Return the b-value (or beta) estimates, their Shi and Bolt standard
+    deviations and the number of events used, for each of the completeness
+    magnitudes ``mcs``.
+
+    For the classic and the Utsu estimator, the frequency-magnitude
+    distribution is computed once and the estimates for all mcs are derived
+    from its cumulative counts, sums and sums of squares, in
+    O(n + n_bins + n_mcs). The binning of the magnitudes is tested once. For
+    other estimators, the estimator is called for each mc, in parallel if
+    ``n_jobs`` is given.
+
+    Args:
+        magnitudes: Array of magnitudes
+        mcs:        Array of completeness magnitudes
+        delta_m:    Discretization of magnitudes.
+        weights:    Array of weights for the magnitudes.
+        b_parameter:Either 'b_value' or 'beta'.
+        method:     b-value estimator to use.
+        n_jobs:     Number of processes used for estimators other than the
+                classic and the Utsu estimator, -1 uses all CPUs. If None,
+                the mcs are evaluated one after the other.
+        **kwargs:   Additional keyword arguments for the b-value estimator.
+
+    Returns:
+        b_values:   b-values (or betas) for each mc
+        stds:       Shi and Bolt standard deviations of the estimates
+        ns:         number of events used for each estimate
+    '''
+    if b_parameter not in ['b_value', 'beta']:
+        raise ValueError('b_parameter must be either "b_value" or "beta"')
+
+    mcs = np.asarray(mcs, dtype=float)
+    magnitudes = np.asarray(magnitudes, dtype=float)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+
+    if method not in _SUFFIX_METHODS or kwargs:
+        args = [(magnitudes, mc, delta_m, weights, b_parameter, method,
+                 kwargs) for mc in mcs]
+        if n_jobs is None:
+            results = [_estimate_b_mc(arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(
+                    max_workers=None if n_jobs == -1 else n_jobs) as executor:
+                results = list(executor.map(_estimate_b_mc, args))
+        if len(results) == 0:
+            return np.array([]), np.array([]), np.array([], dtype=int)
+        b_values, stds, ns = (np.array(x) for x in zip(*results))
+        return b_values, stds, ns
+
+    # same checks as the estimator performs, for the smallest mc
+    if weights is not None:
+        assert len(magnitudes) == len(weights), (
+            'The number of magnitudes and weights must be equal.'
+        )
+    if len(mcs) > 0:
+        idx = magnitudes >= np.min(mcs) - delta_m / 2
+        if delta_m == 0:
+            tolerance = 1e-08
+        else:
+            tolerance = max(delta_m / 100, 1e-08)
+        assert binning_test(magnitudes[idx], delta_m, tolerance), \
+            'Magnitudes are not binned correctly.'
+        if weights is not None:
+            assert np.all(weights[idx] >= 0), 'Weights must be nonnegative.'
+
+    if len(magnitudes) == 0:
+        bins = counts = np.array([])
+        idx_bin = np.array([], dtype=int)
+    elif delta_m == 0:
+        bins, idx_bin, counts = np.unique(
+            magnitudes, return_inverse=True, return_counts=True)
+    else:
+        bins, counts, binned = get_fmd(magnitudes, delta_m)
+        idx_bin = np.rint((binned - bins[0]) / delta_m).astype(int)
+    weighted_counts = None if weights is None else np.bincount(
+        idx_bin, weights=weights, minlength=len(bins))
+
+    b_values, stds, ns = _b_values_from_fmd(
+        bins, counts, mcs, delta_m, method, weighted_counts)
+
+    if get_option('warnings') is True and len(magnitudes) > 0:
+        # lowest magnitude above each mc
+        nonzero = np.flatnonzero(counts)
+        idx_lowest = np.minimum(
+            np.searchsorted(nonzero, np.searchsorted(bins, mcs - delta_m / 2)),
+            len(nonzero) - 1)
+        if np.any(bins[nonzero[idx_lowest]] - mcs > delta_m / 2):
+            warnings.warn(
+                'No magnitudes in the lowest magnitude bin are present. '
+                'Check if mc is chosen correctly.'
+            )
+
+    if b_parameter == 'beta':
+        return b_value_to_beta(b_values), stds * np.log(10), ns
+    return b_values, stds, ns
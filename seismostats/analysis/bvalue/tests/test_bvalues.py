@@ -3,12 +3,15 @@ import os
 import numpy as np
 import pandas as pd
 import pytest
-from numpy.testing import assert_almost_equal
+from numpy.testing import assert_allclose, assert_almost_equal
 
 from seismostats.analysis.bvalue import (BMorePositiveBValueEstimator,
                                          BPositiveBValueEstimator,
                                          ClassicBValueEstimator,
-                                         UtsuBValueEstimator)
+                                         UtsuBValueEstimator, estimate_b,
+                                         estimate_b_by_mc)
+from seismostats.analysis.bvalue.by_mc import _b_values_from_fmd
+from seismostats.utils.binning import get_fmd
 from seismostats.utils.simulate_distributions import bin_to_precision
 
 PATH_RESOURCES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
@@ -198,3 +201,74 @@ def test_estimate_b_more_positive(
     assert_almost_equal(b_estimate, b_est_correct)
     assert_almost_equal(b_estimate, b_estimate_weighted)
     assert_almost_equal(b_estimate, b_estimate_half_weighted)
+
+
+@pytest.mark.parametrize(
+    'method, delta_m, b_parameter',
+    [
+        (ClassicBValueEstimator, 0.1, 'b_value'),
+        (ClassicBValueEstimator, 0.01, 'beta'),
+        (ClassicBValueEstimator, 0, 'b_value'),
+        (UtsuBValueEstimator, 0.1, 'beta'),
+        (BPositiveBValueEstimator, 0.1, 'b_value'),
+    ],
+)
+def test_estimate_b_by_mc(method, delta_m: float, b_parameter: str):
+    mags = magnitudes(1)
+    if delta_m > 0:
+        mags = bin_to_precision(mags, delta_m)
+    weights = np.random.default_rng(0).uniform(0.5, 1.5, len(mags))
+    mcs = [0.0, 0.5, 1.0, 1.5]
+
+    for w in [None, weights]:
+        b_values, stds, ns = estimate_b_by_mc(
+            mags, mcs, delta_m=delta_m, weights=w, b_parameter=b_parameter,
+            method=method)
+        for mc, b, std, n in zip(mcs, b_values, stds, ns):
+            b_loop, std_loop, n_loop = estimate_b(
+                mags, mc, delta_m=delta_m, weights=w,
+                b_parameter=b_parameter, method=method, return_std=True,
+                return_n=True)
+            assert_almost_equal(b, b_loop, decimal=10)
+            assert_almost_equal(std, std_loop, decimal=10)
+            assert n == n_loop
+
+    # parallel evaluation for other estimators
+    b_values_parallel, _, _ = estimate_b_by_mc(
+        mags, mcs, delta_m=delta_m, b_parameter=b_parameter, method=method,
+        n_jobs=2)
+    b_values, _, _ = estimate_b_by_mc(
+        mags, mcs, delta_m=delta_m, b_parameter=b_parameter, method=method)
+    assert_allclose(b_values_parallel, b_values)
+
+
+@pytest.mark.parametrize(
+    'b_method', [ClassicBValueEstimator, UtsuBValueEstimator])
+def test_b_values_from_fmd(b_method):
+    mags = bin_to_precision(magnitudes(1), 0.01)
+    mcs = bin_to_precision(np.arange(0.5, 2.5, 0.13), 0.01)
+    bins, counts, _ = get_fmd(mags, 0.01)
+
+    b_values, stds, ns = _b_values_from_fmd(
+        bins, counts, mcs, 0.01, b_method)
+    for mc, b, std, n in zip(mcs, b_values, stds, ns):
+        b_loop, std_loop, n_loop = estimate_b(
+            mags[mags >= mc - 0.005], mc, 0.01, method=b_method,
+            return_std=True, return_n=True)
+        assert_almost_equal(b, b_loop, decimal=10)
+        assert_almost_equal(std, std_loop, decimal=10)
+        assert n == n_loop
+
+
+def test_estimate_b_by_mc_weights():
+    mags = bin_to_precision(magnitudes(1), 0.1)
+    weights = np.ones(len(mags))
+
+    with pytest.raises(AssertionError):
+        estimate_b_by_mc(mags, [0.5, 1.0], 0.1, weights=weights[1:])
+
+    # negative weights below the smallest mc are not used
+    weights[mags < 0.45] = -1
+    estimate_b_by_mc(mags, [0.5, 1.0], 0.1, weights=weights)
+    with pytest.raises(AssertionError):
+        estimate_b_by_mc(mags, [0.4, 1.0], 0.1, weights=weights)
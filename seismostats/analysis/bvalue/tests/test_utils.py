@@ -6,8 +6,66 @@ from numpy.testing import assert_almost_equal
 
 from seismostats.analysis.bvalue.tests.test_bvalues import magnitudes
 from seismostats.analysis.bvalue.utils import (b_value_to_beta,
+                                               find_next_larger,
                                                make_more_incomplete,
                                                shi_bolt_confidence)
+from seismostats.utils.binning import bin_to_precision
+
+
+def _find_next_larger_loop(magnitudes, delta_m, dmc):
+    # reference implementation with a pairwise search
+    if dmc is None:
+        dmc = delta_m
+    idx_next_larger = np.zeros(len(magnitudes))
+    for ii in range(len(magnitudes) - 1):
+        for jj in range(ii + 1, len(magnitudes)):
+            mag_diff_loop = magnitudes[jj] - magnitudes[ii]
+            if mag_diff_loop > dmc - delta_m / 2:
+                idx_next_larger[ii] = jj
+                break
+    return idx_next_larger.astype(int)
+
+
+def test_find_next_larger():
+    magnitudes = np.array([10, 4, 3, 9])
+    idx = find_next_larger(magnitudes, delta_m=1, dmc=None)
+    assert (idx == [0, 3, 3, 0]).all()
+
+    assert len(find_next_larger(np.array([]), delta_m=0.1, dmc=None)) == 0
+    assert (find_next_larger(np.array([1.0]), 0.1, None) == [0]).all()
+
+
+@pytest.mark.parametrize(
+    "delta_m, dmc",
+    [(0.1, None), (0.1, 0.3), (0.01, 0), (0.2, -0.5), (0, 0.2), (0, None)]
+)
+def test_find_next_larger_equivalence(delta_m: float, dmc: float | None):
+    rng = np.random.default_rng(42)
+    for n in [2, 3, 10, 100, 500]:
+        mags = rng.exponential(1 / np.log(10), n)
+        if delta_m > 0:
+            mags = bin_to_precision(mags, delta_m)
+        idx = find_next_larger(mags, delta_m, dmc)
+        idx_loop = _find_next_larger_loop(mags, delta_m, dmc)
+        assert (idx == idx_loop).all()
+
+    # monotonic series are the worst case for the search
+    mags = np.arange(200) * 0.01
+    assert (find_next_larger(mags, 0.01, 0.5)
+            == _find_next_larger_loop(mags, 0.01, 0.5)).all()
+    assert (find_next_larger(mags[::-1], 0.01, 0.5)
+            == _find_next_larger_loop(mags[::-1], 0.01, 0.5)).all()
+
+
+def test_find_next_larger_large():
+    rng = np.random.default_rng(1)
+    mags = bin_to_precision(rng.exponential(1 / np.log(10), 10**6), 0.1)
+    idx = find_next_larger(mags, delta_m=0.1, dmc=0.1)
+
+    for ii in rng.choice(len(mags) - 1, 50, replace=False):
+        larger = np.flatnonzero(mags[ii + 1:] - mags[ii] > 0.05)
+        expected = larger[0] + ii + 1 if len(larger) > 0 else 0
+        assert idx[ii] == expected
 
 
 def test_make_more_incomplete():
@@ -44,6 +102,30 @@ def test_make_more_incomplete():
     assert (mags_inc == magnitudes[idx]).all()
 
 
+def test_make_more_incomplete_equivalence():
+    rng = np.random.default_rng(3)
+    n = 500
+    magnitudes = bin_to_precision(rng.exponential(1 / np.log(10), n), 0.1)
+    times = np.datetime64('2020-01-01T00:00:00') + rng.integers(
+        0, 10**6, n).astype('timedelta64[s]')
+    delta_t = np.timedelta64(3600, 's')
+
+    _, _, idx = make_more_incomplete(
+        magnitudes, times, delta_t=delta_t, return_idx=True)
+
+    # reference: compare each event with all earlier events within delta_t
+    idx_sort = np.argsort(times)
+    magnitudes = magnitudes[idx_sort]
+    times = times[idx_sort]
+    idx_loop = np.full(n, True)
+    for ii in range(1, n):
+        idx_close = np.where(times[ii] - times[:ii] < delta_t)[0]
+        if np.any(magnitudes[idx_close] > magnitudes[ii]):
+            idx_loop[ii] = False
+
+    assert (idx == idx_loop).all()
+
+
 @pytest.mark.parametrize(
     "std, mags, b, b_parameter",
     [
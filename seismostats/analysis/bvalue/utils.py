@@ -78,6 +78,9 @@ def find_next_larger(magnitudes: np.array,
     result in [0, 3, 3, 0]. Note that the value of idx is 0 if no
     next magnitude exists.
 
+    The search is vectorized over all events using a max-segment tree, which
+    needs O(n log n) operations and O(n) memory.
+
     Args:
         magnitudes:     ordered magnitudes (in the dimension of interest, e.g.
                     time)
@@ -88,15 +91,59 @@ def find_next_larger(magnitudes: np.array,
     """
     if dmc is None:
         dmc = delta_m
-
-    idx_next_larger = np.zeros(len(magnitudes))
-    for ii in range(len(magnitudes) - 1):
-        for jj in range(ii + 1, len(magnitudes)):
-            mag_diff_loop = magnitudes[jj] - magnitudes[ii]
-            if mag_diff_loop > dmc - delta_m / 2:
-                idx_next_larger[ii] = jj
-                break
-    return idx_next_larger.astype(int)
+    threshold = dmc - delta_m / 2
+
+    magnitudes = np.asarray(magnitudes, dtype=float)
+    n = len(magnitudes)
+    idx_next_larger = np.zeros(n, dtype=int)
+    if n < 2:
+        return idx_next_larger
+
+    # max-segment tree: leaves at tree[size:size + n], node k holds the
+    # maximum of its children 2k and 2k + 1
+    size = 1 << int(np.ceil(np.log2(n)))
+    tree = np.full(2 * size, -np.inf)
+    tree[size:size + n] = magnitudes
+    level = size
+    while level > 1:
+        tree[level // 2:level] = np.maximum(tree[level:2 * level:2],
+                                            tree[level + 1:2 * level:2])
+        level //= 2
+
+    # the difference is taken in the same way as in the pairwise comparison
+    # (m_j - m_i > threshold), subtracting m_i is monotonic in floating point
+    # so comparing the maximum of a node is equivalent
+    query = np.arange(n - 1)
+    ref = magnitudes[query]
+    node = query + 1 + size
+
+    # ascend: move right along the tree until a node contains a larger event
+    ascending = np.ones(len(query), dtype=bool)
+    while True:
+        active = np.flatnonzero(ascending)
+        if len(active) == 0:
+            break
+        found = tree[node[active]] - ref[active] > threshold
+        ascending[active[found]] = False
+        active = active[~found]
+        # strip trailing right-child steps, then step to the right sibling
+        parent = node[active] // ((node[active] + 1) & ~node[active])
+        exhausted = parent == 0
+        node[active] = parent + 1
+        node[active[exhausted]] = 0
+        ascending[active[exhausted]] = False
+
+    # descend: go to the leftmost child that contains a larger event
+    active = np.flatnonzero((node > 0) & (node < size))
+    while len(active) > 0:
+        node[active] *= 2
+        smaller = tree[node[active]] - ref[active] <= threshold
+        node[active[smaller]] += 1
+        active = active[node[active] < size]
+
+    has_next = node > 0
+    idx_next_larger[query[has_next]] = node[has_next] - size
+    return idx_next_larger
 
 
 def make_more_incomplete(
@@ -133,17 +180,17 @@ def make_more_incomplete(
     magnitudes = magnitudes[idx_sort]
     times = times[idx_sort]
 
-    idx = np.full(len(magnitudes), True)
-    for ii in range(1, len(magnitudes)):
-        # get all times that are closer than delta_t
-        idx_close = np.where(times[ii] - times[:ii] < delta_t)[0]
-
-        # check if these events are larger than the current event
-        idx_loop = magnitudes[idx_close] > magnitudes[ii]
-
-        # if there are any, remove the current event
-        if sum(idx_loop) > 0:
-            idx[ii] = False
+    # if any earlier event within delta_t is larger, the closest earlier
+    # larger event is within delta_t as well, so it is sufficient to check
+    # the previous larger event (the next larger one in reversed order)
+    n = len(magnitudes)
+    idx_prev = find_next_larger(magnitudes[::-1], delta_m=0, dmc=0)
+    has_prev = idx_prev[::-1] != 0
+    idx_prev = n - 1 - idx_prev[::-1]
+
+    idx = np.full(n, True)
+    idx_close = times[has_prev] - times[idx_prev[has_prev]] < delta_t
+    idx[np.flatnonzero(has_prev)[idx_close]] = False
 
     magnitudes = magnitudes[idx]
     times = times[idx]
@@ -1,6 +1,14 @@
 # flake8: noqa
 
+from seismostats.analysis.declustering.base import Declusterer, DeclusteringResult
 from seismostats.analysis.declustering.dec_gardner_knopoff import GardnerKnopoffType1
 from seismostats.analysis.declustering.distance_time_windows import (
     UhrhammerWindow, GardnerKnopoffWindow, GruenthalWindow
 )
+from seismostats.analysis.declustering.dec_zaliapin_ben_zion import (
+    NearestNeighborResult, ZaliapinBenZion
+)
+from seismostats.analysis.declustering.dec_reasenberg import Reasenberg
+from seismostats.analysis.declustering.tiled import TiledDeclusterer
+from seismostats.analysis.declustering.online import OnlineGardnerKnopoff
+from seismostats.analysis.declustering.ensemble import GardnerKnopoffEnsemble
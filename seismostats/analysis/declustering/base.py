@@ -4,17 +4,141 @@ import numpy as np
 import pandas as pd
 
 
+class DeclusteringResult:
+    """
+    Result of a declustering algorithm. Each event belongs to exactly one
+    cluster (a mainshock without fore- or aftershocks forms a cluster of
+    size one). Cluster ids start at 1, the properties of the cluster with
+    id ``k`` are stored at position ``k - 1`` of the per-cluster arrays.
+
+    Args:
+        mainshock_flags:    boolean array indicating whether the i'th event
+                        is a mainshock
+        cluster_ids:        cluster id of each event
+        mainshock_index:    index of the mainshock event of each cluster
+        cluster_sizes:      number of events in each cluster
+        cluster_start:      time of the first event of each cluster
+        cluster_end:        time of the last event of each cluster
+    """
+
+    def __init__(self,
+                 mainshock_flags: np.ndarray,
+                 cluster_ids: np.ndarray,
+                 mainshock_index: np.ndarray,
+                 cluster_sizes: np.ndarray,
+                 cluster_start: np.ndarray,
+                 cluster_end: np.ndarray):
+        self.mainshock_flags = mainshock_flags
+        self.cluster_ids = cluster_ids
+        self.mainshock_index = mainshock_index
+        self.cluster_sizes = cluster_sizes
+        self.cluster_start = cluster_start
+        self.cluster_end = cluster_end
+
+    @classmethod
+    def from_cluster_labels(cls,
+                            labels: np.ndarray,
+                            time: np.ndarray,
+                            magnitude: np.ndarray,
+                            **kwargs):
+        """
+        Creates the result from a label of the cluster of each event. The
+        clusters are numbered in the order of their first event, and the
+        largest event of a cluster is its mainshock (the earliest one if
+        several events have the same magnitude).
+
+        Args:
+            labels:     integer label of the cluster of each event
+            time:       time of each event in ns (int64)
+            magnitude:  magnitude of each event
+            **kwargs:   additional arguments of the result class
+
+        Returns:
+            result: the declustering result
+        """
+        n_events = len(labels)
+        _, inverse = np.unique(labels, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n_clusters = inverse.max(initial=-1) + 1
+
+        # number the clusters by the position of their first event in time
+        order = np.lexsort((np.arange(n_events), time))
+        first = np.full(n_clusters, n_events)
+        np.minimum.at(first, inverse[order], np.arange(n_events))
+        rank = np.empty(n_clusters, dtype=int)
+        rank[np.argsort(first)] = np.arange(n_clusters)
+        cluster_ids = rank[inverse] + 1
+
+        order = np.lexsort((time, -magnitude, cluster_ids))
+        is_first = np.ones(n_events, dtype=bool)
+        is_first[1:] = cluster_ids[order][1:] != cluster_ids[order][:-1]
+
+        return cls.from_cluster_ids(cluster_ids, order[is_first], time,
+                                    **kwargs)
+
+    @classmethod
+    def from_cluster_ids(cls,
+                         cluster_ids: np.ndarray,
+                         mainshock_index: np.ndarray,
+                         time: np.ndarray,
+                         **kwargs):
+        """
+        Creates the result from the cluster id of each event and the
+        mainshock of each cluster, the remaining properties of the clusters
+        are derived from them.
+
+        Args:
+            cluster_ids:        cluster id of each event, starting at 1
+            mainshock_index:    index of the mainshock event of each cluster
+            time:               time of each event in ns (int64)
+            **kwargs:           additional arguments of the result class
+
+        Returns:
+            result: the declustering result
+        """
+        n_clusters = len(mainshock_index)
+        mainshock_flags = np.zeros(len(cluster_ids), dtype=bool)
+        mainshock_flags[mainshock_index] = True
+
+        cluster_start = np.full(n_clusters, np.iinfo(np.int64).max)
+        cluster_end = np.full(n_clusters, np.iinfo(np.int64).min)
+        np.minimum.at(cluster_start, cluster_ids - 1, time)
+        np.maximum.at(cluster_end, cluster_ids - 1, time)
+
+        return cls(
+            mainshock_flags=mainshock_flags,
+            cluster_ids=cluster_ids,
+            mainshock_index=mainshock_index,
+            cluster_sizes=np.bincount(cluster_ids - 1, minlength=n_clusters),
+            cluster_start=cluster_start.astype("datetime64[ns]"),
+            cluster_end=cluster_end.astype("datetime64[ns]"),
+            **kwargs)
+
+    @property
+    def n_clusters(self) -> int:
+        """
+        Number of clusters.
+        """
+        return len(self.mainshock_index)
+
+    @property
+    def time_spans(self) -> np.ndarray:
+        """
+        Time between the first and the last event of each cluster.
+        """
+        return self.cluster_end - self.cluster_start
+
+
 class Declusterer(ABC):
     """
     Abstract base class for the implementation of declustering algorithms
     """
 
-    def __int__(self):
-        self.__cluster_ids = None
-        self.__results = None
+    def __init__(self):
+        self.result: DeclusteringResult | None = None
 
     @abstractmethod
-    def _decluster(self, catalog: pd.DataFrame) -> np.ndarray[np.bool_]:
+    def _decluster(self, catalog: pd.DataFrame) -> DeclusteringResult:
         """
         Implement the declustering algorithm
 
@@ -23,7 +147,7 @@ class Declusterer(ABC):
         """
         return NotImplemented
 
-    def __call__(self, catalog: pd.DataFrame) -> np.ndarray[np.bool_]:
+    def __call__(self, catalog: pd.DataFrame) -> DeclusteringResult:
         """
         Declusters the catalog
 
@@ -31,8 +155,8 @@ class Declusterer(ABC):
             catalog: earthquake catalog to be declustered
 
         Returns:
-            mainshock_flags: boolean array indicating whether the i'th event
-                             is a mainshock
+            result: mainshock flags, cluster ids and properties of the
+                    clusters
         """
-        self.__results = self._decluster(catalog)
-        return self.__results
+        self.result = self._decluster(catalog)
+        return self.result
@@ -4,12 +4,25 @@
 
 import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
 
-from seismostats.analysis.declustering.base import Declusterer
+from seismostats.analysis.declustering.base import (Declusterer,
+                                                    DeclusteringResult)
 from seismostats.analysis.declustering.distance_time_windows import (
     BaseDistanceTimeWindow
 )
-from seismostats.analysis.declustering.utils import haversine
+from seismostats.analysis.declustering.utils import (EARTH_RADIUS_KM,
+                                                     _haversine_threshold,
+                                                     _WithinDistance,
+                                                     unit_vectors)
+
+
+def _time_ns(catalog: pd.DataFrame) -> np.ndarray:
+    """
+    Times of the events in ns as int64.
+    """
+    time = catalog["time"].astype("datetime64[s]", errors="ignore").values
+    return time.astype("datetime64[ns]").astype(np.int64)
 
 
 class GardnerKnopoffType1(Declusterer):
@@ -21,21 +34,60 @@ class GardnerKnopoffType1(Declusterer):
     Seism. Soc. Am., 64(5): 1363-1367.
     """
 
+    # time windows with fewer events are searched without the spatial index
+    _max_brute_force = 1024
+
     def __init__(self, time_distance_window: BaseDistanceTimeWindow,
-                 fs_time_prop: float = 1.0):
+                 fs_time_prop: float = 1.0,
+                 spatial_index: bool = True):
         """
         Args:
             time_distance_window: BaseDistanceTimeWindow
             fs_time_prop: float in the interval [0,1], expressing
                 the size of the time window used for searching for foreshocks,
                 as a fractional proportion of the size of the aftershock window.
+            spatial_index: if True, events within the distance window of a
+                mainshock with a long time window are found using a KD-tree
+                of the event locations, otherwise all events in the time
+                window are compared. The result is the same.
         """
         super().__init__()
         self.time_distance_window = time_distance_window
         self.fs_time_prop = fs_time_prop
+        self.spatial_index = spatial_index
+
+    def _windows(self, magnitude: np.ndarray
+                 ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Space window and the lengths of the fore- and aftershock time
+        windows of each event.
+
+        Args:
+            magnitude: array of magnitudes
+
+        Returns:
+            space_windows:  space windows in km
+            before:         foreshock time windows in ns
+            after:          aftershock time windows in ns
+        """
+        space_windows, time_windows = self.time_distance_window(magnitude)
+        time_windows = time_windows.astype("timedelta64[ns]")
+        fs_time_windows = time_windows * self.fs_time_prop
+        return (space_windows, fs_time_windows.astype(np.int64),
+                time_windows.astype(np.int64))
+
+    @staticmethod
+    def _order(catalog: pd.DataFrame) -> np.ndarray:
+        """
+        Order in which the events are considered as mainshocks: by
+        decreasing magnitude, the earliest event first for equal
+        magnitudes.
+        """
+        return catalog[["magnitude", "time"]].sort_values(
+            by=["magnitude", "time"], ascending=[False, True],
+            kind="mergesort").index.to_numpy()
 
-    def _decluster(self, catalog: pd.DataFrame,
-                   ) -> np.ndarray[np.bool_]:
+    def _decluster(self, catalog: pd.DataFrame) -> DeclusteringResult:
         """
         Apply the Gardner-Knopoff declustering algorithm to the catalog.
 
@@ -49,8 +101,8 @@ class GardnerKnopoffType1(Declusterer):
             catalog: the catalog of earthquakes
 
         Returns:
-            mainshock_flags: boolean array indicating whether the i'th event
-                             is a mainshock
+            result: mainshock flags and cluster ids of the events, and
+                    mainshock, size and time span of each cluster
 
         Raises:
             ValueError: if a required column is missing
@@ -60,52 +112,113 @@ class GardnerKnopoffType1(Declusterer):
             raise ValueError("catalog must contain the following columns: "
                              + ", ".join(cols))
 
-        # each cluster of events is assigned a non-negative integer id
-        cluster_ids = np.zeros(len(catalog), dtype=int)
-        cluster_id = 1
-        magnitude = catalog["magnitude"]
-        longitude = catalog["longitude"]
-        latitude = catalog["latitude"]
+        magnitude = catalog["magnitude"].to_numpy(dtype=float)
+        longitude = catalog["longitude"].to_numpy(dtype=float)
+        latitude = catalog["latitude"].to_numpy(dtype=float)
 
-        time = catalog["time"].astype("datetime64[s]", errors="ignore").values
-        space_windows, time_windows = self.time_distance_window(magnitude)
-        ordered = catalog[list(cols)].sort_values(by=["magnitude", "time"],
-                                                  ascending=[False, True],
-                                                  kind="mergesort")
-        mainshock_flags = np.ones(len(catalog), dtype=bool)
-        for i, long, lat in zip(ordered.index,
-                                ordered["longitude"],
-                                ordered["latitude"]):
-            # If already assigned to a cluster, skip
-            if cluster_ids[i] != 0:
-                continue
-
-            # Find Events inside both fore- and aftershock time windows
-            dt = time - time[i]
-            vsel = np.logical_and(
-                cluster_ids == 0,
-                np.logical_and(
-                    dt >= (-time_windows[i] * self.fs_time_prop),
-                    dt <= time_windows[i],
-                ),
-            )
-            # Of those events inside time window,
-            # find those inside the distance window
-            vsel1 = (
-                haversine(
-                    longitude[vsel],
-                    latitude[vsel],
-                    long,
-                    lat,
-                )
-                <= space_windows[i]
-            )
-            vsel[vsel] = vsel1
-            # Assign id and flags to this cluster
-            cluster_ids[vsel] = cluster_id
-            cluster_id += 1
-            mainshock_flags[vsel] = 0
-            mainshock_flags[i] = 1
-
-        self.__cluster_ids = cluster_ids
-        return mainshock_flags
+        time = _time_ns(catalog)
+        space_windows, before, after = self._windows(magnitude)
+        order = self._order(catalog)
+
+        # the events inside the time window of a mainshock are a contiguous
+        # slice of the events sorted by time, its bounds are found for all
+        # events at once
+        idx_time = np.argsort(time, kind="stable")
+        time_sorted = time[idx_time]
+        position = np.empty(len(catalog), dtype=int)
+        position[idx_time] = np.arange(len(catalog))
+
+        starts = np.searchsorted(time_sorted, time - before, side="left")
+        stops = np.searchsorted(time_sorted, time + after, side="right")
+
+        tree = None
+        if self.spatial_index:
+            tree = cKDTree(unit_vectors(longitude, latitude))
+
+        cluster_ids, mainshock_index = _gardner_knopoff(
+            longitude, latitude, space_windows, starts, stops, order,
+            idx_time, position, tree, self._max_brute_force)
+        return DeclusteringResult.from_cluster_ids(
+            cluster_ids, mainshock_index, time)
+
+
+def _gardner_knopoff(longitude: np.ndarray,
+                     latitude: np.ndarray,
+                     space_windows: np.ndarray,
+                     starts: np.ndarray,
+                     stops: np.ndarray,
+                     order: np.ndarray,
+                     idx_time: np.ndarray,
+                     position: np.ndarray,
+                     tree: cKDTree | None = None,
+                     max_brute_force: int = 1024,
+                     margin: float = 0.0,
+                     ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assigns the events to the clusters of the mainshocks.
+
+    Args:
+        longitude:      longitudes of the events in degrees
+        latitude:       latitudes of the events in degrees
+        space_windows:  space windows of the events in km
+        starts:         position in time order of the first event in the
+                    time window of each event
+        stops:          position in time order after the last event in
+                    the time window of each event
+        order:          order in which the events are considered as
+                    mainshocks
+        idx_time:       indices of the events sorted by time
+        position:       position of each event in time order
+        tree:           KD-tree of the unit vectors of the event locations,
+                    used for time windows with more than max_brute_force
+                    events. If None, all events in the time windows are
+                    compared.
+        max_brute_force: number of events in a time window above which the
+                    tree is used
+        margin:         distance in km that the events may have moved
+                    since the tree was built, added to the search radius
+
+    Returns:
+        cluster_ids:        cluster id of each event, starting at 1 in the
+                        order in which the mainshocks are found
+        mainshock_index:    index of the mainshock of each cluster
+    """
+    # each cluster of events is assigned a non-negative integer id
+    cluster_ids = np.zeros(len(longitude), dtype=int)
+    mainshock_index = []
+    within = _WithinDistance(longitude, latitude)
+    threshold = _haversine_threshold(space_windows)
+    if tree is not None:
+        points = tree.data
+
+    for i in order:
+        # If already assigned to a cluster, skip
+        if cluster_ids[i] != 0:
+            continue
+
+        # Find Events inside both fore- and aftershock time windows
+        start = starts[i]
+        stop = stops[i]
+
+        if tree is not None and stop - start > max_brute_force:
+            # chord length of the distance window on the unit sphere,
+            # slightly enlarged since the exact distance is tested below
+            angle = min((space_windows[i] + margin) / (2 * EARTH_RADIUS_KM),
+                        np.pi / 2)
+            radius = 2 * np.sin(angle) * (1 + 1e-9) + 1e-12
+            vsel = np.asarray(
+                tree.query_ball_point(points[i], radius), dtype=int)
+            vsel = vsel[(position[vsel] >= start)
+                        & (position[vsel] < stop)]
+        else:
+            vsel = idx_time[start:stop]
+        vsel = vsel[cluster_ids[vsel] == 0]
+
+        # Of those events inside time window,
+        # find those inside the distance window
+        vsel = vsel[within(vsel, i, threshold[i])]
+        # Assign id to this cluster
+        mainshock_index.append(i)
+        cluster_ids[vsel] = len(mainshock_index)
+
+    return cluster_ids, np.array(mainshock_index, dtype=int)
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from seismostats.analysis.declustering.base import (Declusterer,
+                                                    DeclusteringResult)
+from seismostats.analysis.declustering.utils import (EARTH_RADIUS_KM,
+                                                     _UnionFind, haversine,
+                                                     unit_vectors)
+
+_NS_PER_DAY = 86400 * 1e9
+
+
+def _crack_radius(magnitude: np.ndarray) -> np.ndarray:
+    """
+    Radius of the circular crack in km of an earthquake with the given
+    magnitude (Kanamori and Anderson, 1975).
+    """
+    return 0.011 * 10 ** (0.4 * magnitude)
+
+
+class Reasenberg(Declusterer):
+    """
+    This class implements the Reasenberg algorithm as described in
+    this paper:
+    Reasenberg, P. (1985). Second-order moment of central California
+    seismicity, 1969-1982. J. Geophys. Res., 90(B7): 5479-5495.
+
+    The events are processed in time order. Each event has an interaction
+    zone of rfact crack radii around it, and events of a cluster also
+    have the interaction zone of the largest event of the cluster. Later
+    events within an interaction zone and within the look-ahead time of
+    the event are linked to its cluster, merging clusters if needed. The
+    look-ahead time of an event of a cluster is the time needed to
+    observe the next event of the cluster with probability p, following
+    Omori's law. The largest event of a cluster is the mainshock.
+    """
+
+    # time windows with fewer events are searched without the spatial index
+    _max_brute_force = 1024
+
+    def __init__(self,
+                 rfact: float = 10,
+                 xmeff: float = 1.5,
+                 xk: float = 0.5,
+                 p: float = 0.95,
+                 tau_min: float = 1.0,
+                 tau_max: float = 10.0,
+                 spatial_index: bool = True):
+        """
+        Args:
+            rfact:      number of crack radii around each event within
+                    which later events are linked to its cluster
+            xmeff:      effective lower magnitude cutoff of the catalog
+            xk:         factor by which the magnitude cutoff is raised
+                    during clusters, as a fraction of the magnitude of
+                    the largest event of the cluster
+            p:          probability of observing the next event of a
+                    cluster within the look-ahead time
+            tau_min:    look-ahead time in days of events that are not in a
+                    cluster or are the largest event of their cluster
+            tau_max:    maximum look-ahead time in days
+            spatial_index: if True, events within the interaction zone of
+                    an event with a long look-ahead time are found using
+                    a KD-tree of the event locations, otherwise all events
+                    in the look-ahead time are compared. The result is the
+                    same.
+        """
+        super().__init__()
+        self.rfact = rfact
+        self.xmeff = xmeff
+        self.xk = xk
+        self.p = p
+        self.tau_min = tau_min
+        self.tau_max = tau_max
+        self.spatial_index = spatial_index
+
+    def _decluster(self, catalog: pd.DataFrame) -> DeclusteringResult:
+        """
+        Apply the Reasenberg declustering algorithm to the catalog.
+
+        The catalog must contain the following columns:
+        - time, magnitude, longitude, latitude
+
+        Distances are computed between the epicenters.
+
+        Args:
+            catalog: the catalog of earthquakes
+
+        Returns:
+            result: mainshock flags and cluster ids of the events, and
+                    mainshock, size and time span of each cluster
+
+        Raises:
+            ValueError: if a required column is missing
+        """
+        cols = set(("time", "magnitude", "longitude", "latitude"))
+        if not cols.issubset(set(catalog.columns)):
+            raise ValueError("catalog must contain the following columns: "
+                             + ", ".join(cols))
+
+        magnitude = catalog["magnitude"].to_numpy(dtype=float)
+        longitude = catalog["longitude"].to_numpy(dtype=float)
+        latitude = catalog["latitude"].to_numpy(dtype=float)
+        time = catalog["time"].astype("datetime64[s]", errors="ignore").values
+        time = time.astype("datetime64[ns]").astype(np.int64)
+        radius = self.rfact * _crack_radius(magnitude)
+
+        # the events within the look-ahead time of an event are a
+        # contiguous slice of the events sorted by time
+        idx_time = np.argsort(time, kind="stable")
+        time_sorted = time[idx_time]
+        position = np.empty(len(catalog), dtype=int)
+        position[idx_time] = np.arange(len(catalog))
+
+        tree = None
+        if self.spatial_index:
+            points = unit_vectors(longitude, latitude)
+            tree = cKDTree(points)
+
+        def interacting(center: int, start: int, stop: int) -> np.ndarray:
+            # events at positions start to stop in time order within the
+            # interaction zone of the event center
+            if tree is not None and stop - start > self._max_brute_force:
+                vsel = np.asarray(tree.query_ball_point(
+                    points[center],
+                    radius[center] / EARTH_RADIUS_KM * (1 + 1e-9) + 1e-12),
+                    dtype=int)
+                vsel = vsel[(position[vsel] >= start)
+                            & (position[vsel] < stop)]
+            else:
+                vsel = idx_time[start:stop]
+            return vsel[haversine(longitude[vsel], latitude[vsel],
+                                  longitude[center], latitude[center])
+                        <= radius[center]]
+
+        clusters = _UnionFind(len(catalog))
+        # largest event of each cluster among the events processed so far
+        largest = np.full(len(catalog), -1)
+        log_p = -np.log(1 - self.p)
+
+        for i in idx_time:
+            root = clusters.find(i)
+            big = largest[root]
+            if big < 0 or magnitude[i] > magnitude[big]:
+                big = i
+                largest[root] = i
+                tau = self.tau_min
+            else:
+                delta_m = (1 - self.xk) * magnitude[big] - self.xmeff
+                tau = (log_p * (time[i] - time[big]) / _NS_PER_DAY
+                       / 10 ** (2 * (delta_m - 1) / 3))
+                tau = min(max(tau, self.tau_min), self.tau_max)
+
+            start = position[i] + 1
+            stop = np.searchsorted(time_sorted,
+                                   time[i] + int(tau * _NS_PER_DAY),
+                                   side="right")
+            if stop <= start:
+                continue
+
+            vsel = interacting(i, start, stop)
+            if big != i:
+                vsel = np.union1d(vsel, interacting(big, start, stop))
+            if len(vsel) == 0:
+                continue
+
+            # merge the clusters of the linked events into this cluster
+            for other in np.unique(clusters.find_all(vsel)):
+                if other == root:
+                    continue
+                big, other_big = largest[root], largest[other]
+                root = clusters.union(root, other)
+                if other_big >= 0 and (
+                        magnitude[other_big] > magnitude[big]
+                        or (magnitude[other_big] == magnitude[big]
+                            and position[other_big] < position[big])):
+                    big = other_big
+                largest[root] = big
+
+        roots = clusters.find_all(np.arange(len(catalog)))
+        return DeclusteringResult.from_cluster_labels(roots, time, magnitude)
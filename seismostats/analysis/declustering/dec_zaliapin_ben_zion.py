@@ -0,0 +1,412 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from seismostats.analysis.declustering.base import (Declusterer,
+                                                    DeclusteringResult)
+from seismostats.analysis.declustering.utils import (EARTH_RADIUS_KM,
+                                                     unit_vectors)
+
+_NS_PER_YEAR = 365.25 * 86400 * 1e9
+
+
+class NearestNeighborResult(DeclusteringResult):
+    """
+    Result of the nearest-neighbor declustering. In addition to the
+    clusters, the nearest neighbor (parent) of each event and the
+    components of the nearest-neighbor distance are stored.
+
+    Args:
+        parent:             index of the nearest neighbor of each event,
+                        -1 if the event has no earlier event
+        eta:                nearest-neighbor distance of each event
+        rescaled_time:      rescaled time T to the nearest neighbor in years
+        rescaled_distance:  rescaled distance R to the nearest neighbor in
+                        km to the power of the fractal dimension
+        eta_0:              threshold on eta below which an event is linked
+                        to its parent
+        **kwargs:           arguments of DeclusteringResult
+    """
+
+    def __init__(self,
+                 parent: np.ndarray,
+                 eta: np.ndarray,
+                 rescaled_time: np.ndarray,
+                 rescaled_distance: np.ndarray,
+                 eta_0: float,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.parent = parent
+        self.eta = eta
+        self.rescaled_time = rescaled_time
+        self.rescaled_distance = rescaled_distance
+        self.eta_0 = eta_0
+
+
+class ZaliapinBenZion(Declusterer):
+    """
+    This class implements the nearest-neighbor declustering as described in
+    these papers:
+    Zaliapin, I., Gabrielov, A., Keilis-Borok, V. and Wong, H. (2008).
+    Clustering analysis of seismicity and aftershock identification.
+    Phys. Rev. Lett., 101(1): 018501.
+    Zaliapin, I. and Ben-Zion, Y. (2013). Earthquake clusters in southern
+    California I: Identification and stability. J. Geophys. Res. Solid
+    Earth, 118(6): 2847-2864.
+
+    The nearest-neighbor distance of event j to an earlier event i is
+    eta_ij = T_ij * R_ij, with the rescaled time
+    T_ij = t_ij * 10**(-q * b * m_i) and the rescaled distance
+    R_ij = r_ij**d_f * 10**(-(1 - q) * b * m_i). Events are linked to
+    their nearest neighbor if eta is below the threshold eta_0. The
+    connected events form a cluster, whose largest event is the
+    mainshock.
+    """
+
+    # events are compared directly with the preceding events in time,
+    # older events are searched in blocks of at least this many events
+    _min_block_size = 64
+    # magnitude range of the events in one spatial index of a block
+    _magnitude_band_width = 0.5
+    # number of events processed at once
+    _chunk_size = 10000
+
+    def __init__(self,
+                 b_value: float = 1.0,
+                 fractal_dimension: float = 1.6,
+                 q: float = 0.5,
+                 eta_0: float | None = None):
+        """
+        Args:
+            b_value:            b-value of the catalog
+            fractal_dimension:  fractal dimension d_f of the epicenters
+            q:                  weight of the magnitude in the rescaled time,
+                            in the interval [0,1]
+            eta_0:              threshold on the nearest-neighbor distance,
+                            below which events are linked. If None, it is
+                            estimated by fitting a mixture of two normal
+                            distributions to log10(eta).
+        """
+        super().__init__()
+        self.b_value = b_value
+        self.fractal_dimension = fractal_dimension
+        self.q = q
+        self.eta_0 = eta_0
+
+    def _decluster(self, catalog: pd.DataFrame) -> NearestNeighborResult:
+        """
+        Apply the nearest-neighbor declustering algorithm to the catalog.
+
+        The catalog must contain the following columns:
+        - time, magnitude, longitude, latitude
+
+        Args:
+            catalog: the catalog of earthquakes
+
+        Returns:
+            result: mainshock flags and clusters, together with the
+                    nearest neighbor of each event
+
+        Raises:
+            ValueError: if a required column is missing
+        """
+        cols = set(("time", "magnitude", "longitude", "latitude"))
+        if not cols.issubset(set(catalog.columns)):
+            raise ValueError("catalog must contain the following columns: "
+                             + ", ".join(cols))
+
+        magnitude = catalog["magnitude"].to_numpy(dtype=float)
+        time = catalog["time"].astype("datetime64[s]", errors="ignore").values
+        time = time.astype("datetime64[ns]").astype(np.int64)
+        points = unit_vectors(catalog["longitude"].to_numpy(dtype=float),
+                              catalog["latitude"].to_numpy(dtype=float))
+
+        parent, distance, years = self._nearest_neighbors(
+            time, magnitude, points)
+
+        has_parent = parent >= 0
+        bm = self.b_value * magnitude[np.where(has_parent, parent, 0)]
+        rescaled_time = np.full(len(catalog), np.inf)
+        rescaled_distance = np.full(len(catalog), np.inf)
+        rescaled_time[has_parent] = (years * 10 ** (-self.q * bm))[has_parent]
+        rescaled_distance[has_parent] = (
+            distance ** self.fractal_dimension
+            * 10 ** (-(1 - self.q) * bm))[has_parent]
+        eta = rescaled_time * rescaled_distance
+
+        eta_0 = self.eta_0
+        if eta_0 is None:
+            eta_0 = 10 ** _mixture_threshold(
+                np.log10(eta[has_parent & (eta > 0)]))
+
+        # follow the links to the first event of each cluster
+        root = np.arange(len(catalog))
+        linked = has_parent & (eta <= eta_0)
+        root[linked] = parent[linked]
+        while True:
+            next_root = root[root]
+            if np.array_equal(next_root, root):
+                break
+            root = next_root
+
+        return NearestNeighborResult.from_cluster_labels(
+            root, time, magnitude, parent=parent, eta=eta,
+            rescaled_time=rescaled_time,
+            rescaled_distance=rescaled_distance, eta_0=eta_0)
+
+    def _nearest_neighbors(self,
+                           time: np.ndarray,
+                           magnitude: np.ndarray,
+                           points: np.ndarray,
+                           ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the nearest neighbor of each event among the earlier events.
+
+        The events are swept in time order. Each event is compared directly
+        with the last preceding events. All older events are split into
+        blocks of consecutive events whose sizes are powers of two, with
+        one spatial index per magnitude band of each block. Since the
+        events of a block are at least the time to its last event apart,
+        and their magnitude is at most the largest magnitude in the band,
+        only the events within a bounded distance can be nearer than the
+        current nearest neighbor.
+
+        Args:
+            time:       times in ns
+            magnitude:  magnitudes
+            points:     unit vectors of the epicenters
+
+        Returns:
+            parent:     index of the nearest neighbor, -1 if there is none
+            distance:   distance to the nearest neighbor in km
+            years:      time to the nearest neighbor in years
+        """
+        n_events = len(time)
+        idx_time = np.argsort(time, kind="stable")
+        time_sorted = time[idx_time]
+        years_sorted = (time_sorted - time_sorted[0] if n_events else
+                        time_sorted) / _NS_PER_YEAR
+        points_sorted = points[idx_time]
+        magnitude_sorted = magnitude[idx_time]
+        log_weight_sorted = -self.b_value * magnitude_sorted
+        band_sorted = np.floor(
+            (magnitude_sorted - np.min(magnitude, initial=np.inf))
+            / self._magnitude_band_width).astype(int)
+        # number of events that occurred strictly before each event
+        n_before = np.searchsorted(time_sorted, time_sorted, side="left")
+
+        min_level = int(np.log2(self._min_block_size))
+        max_level = max(int(np.log2(max(n_events, 1))), min_level)
+        # spatial indices of the blocks that are currently searched
+        trees = {}
+
+        parent = np.full(n_events, -1)
+        log_eta = np.full(n_events, np.inf)
+        for chunk in np.array_split(
+                np.arange(n_events),
+                max(1, int(np.ceil(n_events / self._chunk_size)))):
+            # events compared directly, all older events are split in
+            # blocks of consecutive events
+            n_old = np.maximum(
+                (n_before[chunk] >> min_level << min_level)
+                - self._min_block_size, 0)
+            candidates = n_old[:, None] + np.arange(
+                2 * self._min_block_size)
+            valid = candidates < n_before[chunk, None]
+            candidates = np.where(valid, candidates, 0)
+            log_eta_direct = np.where(valid, _log_eta(
+                years_sorted[chunk, None] - years_sorted[candidates],
+                points_sorted[chunk, None], points_sorted[candidates],
+                log_weight_sorted[candidates], self.fractal_dimension),
+                np.inf)
+            nearest = np.argmin(log_eta_direct, axis=1)
+            log_eta[chunk] = log_eta_direct[np.arange(len(chunk)), nearest]
+            parent[chunk] = np.where(
+                log_eta[chunk] < np.inf,
+                candidates[np.arange(len(chunk)), nearest], -1)
+
+            # the blocks of the older events are given by the binary
+            # representation of their number, most recent blocks first
+            for level in range(min_level, max_level + 1):
+                in_block = chunk[(n_old >> level) & 1 == 1]
+                if len(in_block) == 0:
+                    continue
+                block_ids = (n_old[in_block - chunk[0]] >> level) - 1
+                bounds = np.flatnonzero(np.diff(block_ids)) + 1
+                for children, block_id in zip(
+                        np.split(in_block, bounds),
+                        block_ids[np.r_[0, bounds]]):
+                    block = trees.get((level, block_id))
+                    if block is None:
+                        block = _block_trees(
+                            block_id << level, (block_id + 1) << level,
+                            band_sorted, magnitude_sorted, points_sorted)
+                        trees[(level, block_id)] = block
+                    for positions, tree, max_magnitude in block:
+                        self._search_block(
+                            children, positions, tree, max_magnitude,
+                            parent, log_eta, years_sorted, points_sorted,
+                            log_weight_sorted)
+
+            # blocks that are part of a larger block for all later events
+            # are not searched anymore
+            for level, block_id in list(trees):
+                if (block_id + 2) << level <= n_old[-1]:
+                    del trees[(level, block_id)]
+
+        # back to the order of the catalog
+        has_parent = parent >= 0
+        parent_sorted = np.where(has_parent, idx_time[parent], -1)
+        parent = np.empty(n_events, dtype=int)
+        parent[idx_time] = parent_sorted
+        has_parent = parent >= 0
+        distance = np.full(n_events, np.nan)
+        years = np.full(n_events, np.nan)
+        distance[has_parent] = _great_circle(
+            points[has_parent], points[parent[has_parent]])
+        years[has_parent] = (time[has_parent] - time[parent[has_parent]]
+                             ) / _NS_PER_YEAR
+        return parent, distance, years
+
+    def _search_block(self,
+                      children: np.ndarray,
+                      positions: np.ndarray,
+                      tree: cKDTree,
+                      max_magnitude: float,
+                      parent: np.ndarray,
+                      log_eta: np.ndarray,
+                      years_sorted: np.ndarray,
+                      points_sorted: np.ndarray,
+                      log_weight_sorted: np.ndarray):
+        """
+        Update the nearest neighbors of the children with the events of one
+        magnitude band of a block. Children and events are given as
+        positions in time order.
+        """
+        min_years = years_sorted[children] - years_sorted[positions[-1]]
+        with np.errstate(divide="ignore"):
+            log_radius = (log_eta[children]
+                          + self.b_value * max_magnitude
+                          - np.log10(min_years)) / self.fractal_dimension
+        radius = np.minimum(
+            10 ** np.minimum(log_radius, 5) / EARTH_RADIUS_KM, 2.0)
+        radius = radius * (1 + 1e-9) + 1e-12
+
+        # only query the children that are close to the bounding box
+        points = points_sorted[children]
+        outside = np.maximum(np.maximum(tree.mins - points,
+                                        points - tree.maxes), 0)
+        close = np.sum(outside ** 2, axis=1) <= radius ** 2
+        if not close.any():
+            return
+        children = children[close]
+        found = tree.query_ball_point(points[close], radius[close],
+                                      return_sorted=False)
+        lengths = np.fromiter(map(len, found), dtype=int, count=len(found))
+        n_found = lengths.sum()
+        if n_found == 0:
+            return
+        candidates = positions[np.fromiter(
+            itertools.chain.from_iterable(found), dtype=int, count=n_found)]
+        children = np.repeat(children, lengths)
+        log_eta_new = _log_eta(
+            years_sorted[children] - years_sorted[candidates],
+            points_sorted[children], points_sorted[candidates],
+            log_weight_sorted[candidates], self.fractal_dimension)
+
+        # keep the nearest candidate of each child
+        order = np.lexsort((log_eta_new, children))
+        children = children[order]
+        first = np.ones(n_found, dtype=bool)
+        first[1:] = children[1:] != children[:-1]
+        children = children[first]
+        candidates = candidates[order][first]
+        log_eta_new = log_eta_new[order][first]
+
+        nearer = log_eta_new < log_eta[children]
+        parent[children[nearer]] = candidates[nearer]
+        log_eta[children[nearer]] = log_eta_new[nearer]
+
+
+def _block_trees(start: int,
+                 stop: int,
+                 band: np.ndarray,
+                 magnitude: np.ndarray,
+                 points: np.ndarray) -> list:
+    """
+    Spatial index of each magnitude band of the events at positions
+    start to stop, with the positions and the largest magnitude of the
+    events in the band.
+    """
+    order = start + np.argsort(band[start:stop], kind="stable")
+    bounds = np.flatnonzero(np.diff(band[order])) + 1
+    return [(positions, cKDTree(points[positions]),
+             magnitude[positions].max())
+            for positions in np.split(order, bounds)]
+
+
+def _great_circle(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance in km between pairs of unit vectors.
+    """
+    chord = np.sqrt(np.sum((a - b) ** 2, axis=-1))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1))
+
+
+def _log_eta(years: np.ndarray,
+             a: np.ndarray,
+             b: np.ndarray,
+             log_weight: np.ndarray,
+             fractal_dimension: float) -> np.ndarray:
+    """
+    log10 of the nearest-neighbor distance, infinite if the time
+    difference is not positive.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_eta = (np.log10(years)
+                   + fractal_dimension * np.log10(_great_circle(a, b))
+                   + log_weight)
+    return np.where(years > 0, log_eta, np.inf)
+
+
+def _mixture_threshold(x: np.ndarray,
+                       bin_width: float = 0.01,
+                       n_iter: int = 500) -> float:
+    """
+    Fits a mixture of two normal distributions to x and returns the value
+    between the two means at which both components are equally likely.
+    The fit is done on a histogram of x with the given bin width.
+    """
+    x = x[np.isfinite(x)]
+    if len(x) < 2:
+        return -np.inf
+    counts, edges = np.histogram(
+        x, bins=max(int(np.ptp(x) / bin_width), 1))
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    mu = np.percentile(x, [25, 75]).astype(float)
+    sigma = np.full(2, max(np.std(x), bin_width))
+    weight = np.full(2, 0.5)
+    for _ in range(n_iter):
+        density = weight / sigma * np.exp(
+            -0.5 * ((centers[:, None] - mu) / sigma) ** 2)
+        resp = counts[:, None] * density / np.maximum(
+            density.sum(axis=1, keepdims=True), 1e-300)
+        n_k = np.maximum(resp.sum(axis=0), 1e-12)
+        mu_new = (resp * centers[:, None]).sum(axis=0) / n_k
+        sigma = np.maximum(np.sqrt(
+            (resp * (centers[:, None] - mu_new) ** 2).sum(axis=0) / n_k),
+            bin_width)
+        weight = n_k / n_k.sum()
+        converged = np.allclose(mu_new, mu, rtol=0, atol=1e-6)
+        mu = mu_new
+        if converged:
+            break
+
+    lower, upper = np.argsort(mu)
+    grid = np.linspace(mu[lower], mu[upper], 1001)
+    log_density = (np.log(weight[:, None] / sigma[:, None])
+                   - 0.5 * ((grid - mu[:, None]) / sigma[:, None]) ** 2)
+    return grid[np.argmax(log_density[upper] >= log_density[lower])]
@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 
 
-DistanceTimeWindow = tuple[np.ndarray[float], np.ndarray[pd.Timedelta]]
+DistanceTimeWindow = tuple[np.ndarray[float], np.ndarray[np.timedelta64]]
 _DistanceTimeWindow = tuple[np.ndarray[float], np.ndarray[float]]
 
 
@@ -40,7 +40,7 @@ class BaseDistanceTimeWindow(abc.ABC):
         """
         return NotImplemented
 
-    def __call__(self, magnitude: np.ndarray):
+    def __call__(self, magnitude: np.ndarray) -> DistanceTimeWindow:
         """
         Calculate the space and time windows for given magnitudes with cutoff
 
@@ -49,12 +49,13 @@ class BaseDistanceTimeWindow(abc.ABC):
 
         Returns:
             sw_space: array of space windows in km
-            sw_time: array of time windows
+            sw_time: array of time windows as timedelta64[ns]
         """
         sw_space, sw_time = self._calc(magnitude)
         if self.time_cutoff:
             sw_time = np.clip(sw_time, a_min=0, a_max=self.time_cutoff)
-        sw_time = np.array([pd.Timedelta(days=t) for t in sw_time])
+        sw_time = pd.to_timedelta(np.asarray(sw_time, dtype=float),
+                                  unit="D").to_numpy()
         return sw_space, sw_time
 
 
@@ -0,0 +1,204 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from seismostats.analysis.declustering.dec_gardner_knopoff import (
+    GardnerKnopoffType1, _gardner_knopoff, _time_ns)
+from seismostats.analysis.declustering.distance_time_windows import (
+    BaseDistanceTimeWindow
+)
+from seismostats.analysis.declustering.utils import (EARTH_RADIUS_KM,
+                                                     haversine, unit_vectors)
+
+
+class GardnerKnopoffEnsemble:
+    """
+    Gardner-Knopoff declustering of many realisations of the catalog and
+    of the declustering parameters, giving the probability of each event
+    to be a mainshock.
+
+    In each realisation, the window is drawn from the given windows, the
+    proportion of the foreshock time window is drawn uniformly from the
+    given range, and the epicenters are moved by normally distributed
+    errors. The time order of the events, the order in which they are
+    considered as mainshocks and the KD-tree of the epicenters are computed
+    once and shared by all realisations.
+    """
+
+    # time windows with fewer events are searched without the spatial index
+    _max_brute_force = 1024
+
+    def __init__(self,
+                 time_distance_windows: BaseDistanceTimeWindow
+                 | list[BaseDistanceTimeWindow],
+                 fs_time_prop: float | tuple[float, float] = 1.0,
+                 location_uncertainty: float | str | None = None,
+                 n_realizations: int = 100,
+                 seed: int | None = None,
+                 n_jobs: int | None = None):
+        """
+        Args:
+            time_distance_windows: window, or list of windows from which
+                        the window of each realisation is drawn with equal
+                        probability
+            fs_time_prop:   proportion of the foreshock time window, or
+                        range from which it is drawn uniformly
+            location_uncertainty: standard deviation in km of the error
+                        of the epicenter in each horizontal direction, or
+                        name of the catalog column containing it for each
+                        event. If None, the epicenters are not changed.
+            n_realizations: number of realisations
+            seed:           seed of the random number generator. The result
+                        does not depend on n_jobs.
+            n_jobs:         number of processes used, -1 uses all CPUs. If
+                        None, all realisations are run in this process.
+        """
+        if isinstance(time_distance_windows, BaseDistanceTimeWindow):
+            time_distance_windows = [time_distance_windows]
+        self.time_distance_windows = list(time_distance_windows)
+        self.fs_time_prop = fs_time_prop
+        self.location_uncertainty = location_uncertainty
+        self.n_realizations = n_realizations
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.mainshock_probability: np.ndarray | None = None
+
+    def __call__(self, catalog: pd.DataFrame) -> np.ndarray:
+        """
+        Declusters the realisations of the catalog.
+
+        The catalog must contain the following columns:
+        - time, magnitude, longitude, latitude
+
+        Args:
+            catalog: the catalog of earthquakes
+
+        Returns:
+            mainshock_probability: fraction of the realisations in which
+                    each event is a mainshock
+
+        Raises:
+            ValueError: if a required column is missing
+        """
+        cols = ["time", "magnitude", "longitude", "latitude"]
+        if isinstance(self.location_uncertainty, str):
+            cols.append(self.location_uncertainty)
+        if not set(cols).issubset(set(catalog.columns)):
+            raise ValueError("catalog must contain the following columns: "
+                             + ", ".join(cols))
+        catalog = catalog[cols].reset_index(drop=True)
+
+        longitude = catalog["longitude"].to_numpy(dtype=float)
+        latitude = catalog["latitude"].to_numpy(dtype=float)
+        time = _time_ns(catalog)
+        idx_time = np.argsort(time, kind="stable")
+        position = np.empty(len(catalog), dtype=int)
+        position[idx_time] = np.arange(len(catalog))
+
+        if isinstance(self.location_uncertainty, str):
+            sigma = catalog[self.location_uncertainty].to_numpy(dtype=float)
+        else:
+            sigma = self.location_uncertainty or 0.0
+
+        shared = {
+            "magnitude": catalog["magnitude"].to_numpy(dtype=float),
+            "longitude": longitude,
+            "latitude": latitude,
+            "sigma": np.nan_to_num(np.broadcast_to(sigma, len(catalog))),
+            "time": time,
+            "time_sorted": time[idx_time],
+            "order": GardnerKnopoffType1._order(catalog),
+            "idx_time": idx_time,
+            "position": position,
+            "tree": cKDTree(unit_vectors(longitude, latitude)),
+            "windows": self.time_distance_windows,
+            "fs_time_prop": self.fs_time_prop,
+            "max_brute_force": self._max_brute_force,
+        }
+
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_realizations)
+        if self.n_jobs is None:
+            counts = _count_mainshocks(shared, seeds)
+        else:
+            max_workers = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+            # a few batches of realisations per process, so that the shared
+            # arrays are sent to each process only a few times
+            batches = np.array_split(np.arange(self.n_realizations),
+                                     min(4 * max_workers,
+                                         max(self.n_realizations, 1)))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                counts = sum(executor.map(
+                    _count_mainshocks, [shared] * len(batches),
+                    [[seeds[i] for i in batch] for batch in batches]))
+
+        self.mainshock_probability = counts / max(self.n_realizations, 1)
+        return self.mainshock_probability
+
+
+def _count_mainshocks(shared: dict,
+                      seeds: list[np.random.SeedSequence]) -> np.ndarray:
+    """
+    Number of the realisations with the given seeds in which each event
+    is a mainshock.
+    """
+    magnitude = shared["magnitude"]
+    time = shared["time"]
+    counts = np.zeros(len(magnitude), dtype=np.int64)
+
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        window = shared["windows"][
+            rng.integers(len(shared["windows"]))]
+        fs_time_prop = shared["fs_time_prop"]
+        if not np.isscalar(fs_time_prop):
+            fs_time_prop = rng.uniform(*fs_time_prop)
+        space_windows, before, after = GardnerKnopoffType1(
+            window, fs_time_prop)._windows(magnitude)
+
+        longitude, latitude, margin = _perturb(
+            shared["longitude"], shared["latitude"], shared["sigma"], rng)
+
+        starts = np.searchsorted(shared["time_sorted"], time - before,
+                                 side="left")
+        stops = np.searchsorted(shared["time_sorted"], time + after,
+                                side="right")
+        _, mainshock_index = _gardner_knopoff(
+            longitude, latitude, np.asarray(space_windows, dtype=float),
+            starts, stops, shared["order"], shared["idx_time"],
+            shared["position"], shared["tree"], shared["max_brute_force"],
+            margin)
+        counts[mainshock_index] += 1
+    return counts
+
+
+def _perturb(longitude: np.ndarray,
+             latitude: np.ndarray,
+             sigma: np.ndarray,
+             rng: np.random.Generator,
+             ) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Moves the epicenters by normally distributed errors with standard
+    deviation sigma in km in each horizontal direction.
+
+    Returns:
+        longitude:  perturbed longitudes
+        latitude:   perturbed latitudes
+        margin:     upper bound in km of the change of the distance
+                between two epicenters
+    """
+    if not np.any(sigma > 0):
+        return longitude, latitude, 0.0
+    km_to_deg = np.degrees(1 / EARTH_RADIUS_KM)
+    shift = rng.normal(size=(2, len(longitude))) * sigma * km_to_deg
+    new_latitude = np.clip(latitude + shift[1], -90, 90)
+    with np.errstate(divide="ignore"):
+        new_longitude = longitude + shift[0] / np.maximum(
+            np.cos(np.radians(latitude)), 1e-6)
+    new_longitude = (new_longitude + 180) % 360 - 180
+
+    # the KD-tree contains the original epicenters
+    moved = haversine(new_longitude, new_latitude, longitude, latitude)
+    return new_longitude, new_latitude, 2 * float(moved.max()) * (1 + 1e-9)
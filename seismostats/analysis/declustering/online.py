@@ -0,0 +1,366 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering.base import (Declusterer,
+                                                    DeclusteringResult)
+from seismostats.analysis.declustering.dec_gardner_knopoff import (
+    GardnerKnopoffType1, _time_ns)
+from seismostats.analysis.declustering.distance_time_windows import (
+    BaseDistanceTimeWindow
+)
+from seismostats.analysis.declustering.utils import within_distance
+
+_FIELDS = {
+    "number": np.int64, "time": np.int64, "longitude": float,
+    "latitude": float, "magnitude": float, "space_windows": float,
+    "before": np.int64, "after": np.int64, "claimer": np.int64,
+    "fallback": np.int64, "fallback_magnitude": float, "alive": bool,
+}
+
+
+class OnlineGardnerKnopoff(Declusterer):
+    """
+    Gardner-Knopoff declustering of a stream of events, for real-time
+    feeds.
+
+    The events are added one after the other in time order and are
+    numbered in the order in which they are added. Each new event is
+    classified as a mainshock or as a member of the cluster of an earlier
+    mainshock. A new event can also take over earlier events from the
+    clusters of smaller mainshocks, so the mainshocks of the events whose
+    result changes are returned as well.
+
+    Only the events whose windows are still open are kept: an event is
+    kept as long as it can be within the windows of a new event of at
+    most max_magnitude, or a new event can be within its aftershock
+    window. An event whose windows are closed is also kept while its
+    mainshock is kept, so that it follows when its mainshock becomes part
+    of the cluster of a larger one. Memory is therefore bounded by the
+    number of events in the active windows and not by the length of the
+    stream.
+
+    Declustering a catalog gives the same result as GardnerKnopoffType1,
+    unless a new event is larger than max_magnitude, or the change of
+    the result of an event propagates to events whose result is already
+    final, which requires a chain of clusters with increasing magnitudes.
+    The mainshocks returned are always mainshocks of the result.
+    """
+
+    _initial_capacity = 1024
+
+    def __init__(self, time_distance_window: BaseDistanceTimeWindow,
+                 fs_time_prop: float = 1.0,
+                 max_magnitude: float = 9.0):
+        """
+        Args:
+            time_distance_window: BaseDistanceTimeWindow
+            fs_time_prop:   float in the interval [0,1], expressing the size
+                        of the time window used for searching for
+                        foreshocks, as a fractional proportion of the size
+                        of the aftershock window.
+            max_magnitude:  largest magnitude expected in the stream, it
+                        defines how long events are kept
+        """
+        super().__init__()
+        self.time_distance_window = time_distance_window
+        self.fs_time_prop = fs_time_prop
+        self.max_magnitude = max_magnitude
+        self.reset()
+
+    def reset(self):
+        """
+        Removes all events, the next event added is event number 0.
+        """
+        self._windows = GardnerKnopoffType1(self.time_distance_window,
+                                            self.fs_time_prop)._windows
+        _, before, _ = self._windows(np.array([self.max_magnitude]))
+        self._horizon = int(before[0])
+
+        self.n_events = 0
+        self._last_time = np.iinfo(np.int64).min
+        self._buffers = {name: np.empty(self._initial_capacity, dtype=dtype)
+                         for name, dtype in _FIELDS.items()}
+        self._buffers["alive"][:] = False
+        # number of slots in use, the slots of removed events are reused
+        self._size = 0
+        self._free = []
+        self._slots = {}
+        # events by the time after which they are removed
+        self._expiry = []
+        # slots of the removed events by the number of their kept mainshock
+        self._members = {}
+
+    @property
+    def n_active(self) -> int:
+        """
+        Number of events that are kept.
+        """
+        return self._size - len(self._free)
+
+    def add(self, time, longitude: float, latitude: float,
+            magnitude: float) -> dict[int, int]:
+        """
+        Adds the next event of the stream.
+
+        Args:
+            time:       time of the event, not earlier than the time of
+                    the previous event
+            longitude:  longitude of the event in degrees
+            latitude:   latitude of the event in degrees
+            magnitude:  magnitude of the event
+
+        Returns:
+            changes:    number of the mainshock of the new event and of
+                    the earlier events whose mainshock changed, by event
+                    number. A mainshock is its own mainshock.
+
+        Raises:
+            ValueError: if the event is earlier than the previous event
+        """
+        time = pd.Timestamp(time).to_datetime64().astype("datetime64[s]")
+        space_windows, before, after = self._windows(np.array([magnitude]))
+        return self._add(int(time.astype("datetime64[ns]").astype(np.int64)),
+                         float(longitude), float(latitude), float(magnitude),
+                         float(space_windows[0]), int(before[0]),
+                         int(after[0]))
+
+    def _add(self, time: int, longitude: float, latitude: float,
+             magnitude: float, space_window: float, before: int,
+             after: int) -> dict[int, int]:
+        """
+        Adds the next event with its windows, times in ns.
+        """
+        if time < self._last_time:
+            raise ValueError("events must be added in time order")
+        self._last_time = time
+
+        # remove the events whose windows are closed
+        while self._expiry and self._expiry[0][0] < time:
+            _, number = heapq.heappop(self._expiry)
+            self._remove(number)
+
+        number = self.n_events
+        self.n_events += 1
+        slot = self._allocate()
+        self._slots[number] = slot
+        values = {"number": number, "time": time, "longitude": longitude,
+                  "latitude": latitude, "magnitude": magnitude,
+                  "space_windows": space_window, "before": before,
+                  "after": after, "claimer": -1, "fallback": -1,
+                  "fallback_magnitude": -np.inf, "alive": True}
+        for name, value in values.items():
+            self._buffers[name][slot] = value
+        heapq.heappush(self._expiry,
+                       (time + max(after, self._horizon), number))
+        return self._update([slot])
+
+    def _allocate(self) -> int:
+        """
+        Returns a free slot, enlarging the buffers if needed.
+        """
+        if self._free:
+            return self._free.pop()
+        capacity = len(self._buffers["alive"])
+        if self._size == capacity:
+            for name, buffer in self._buffers.items():
+                grown = np.empty(2 * capacity, dtype=buffer.dtype)
+                grown[:capacity] = buffer
+                self._buffers[name] = grown
+            self._buffers["alive"][capacity:] = False
+        self._size += 1
+        return self._size - 1
+
+    def _remove(self, number: int):
+        """
+        Removes an event whose windows are closed. If it is a mainshock,
+        its result is final and it remains the mainshock of the kept events
+        in its windows, unless they are taken by a larger mainshock. Its
+        members that were removed before are released. Otherwise the event
+        is released once the result of its mainshock is final.
+        """
+        slot = self._slots.pop(number)
+        claimer = int(self._buffers["claimer"][slot])
+        if claimer == number:
+            self._finalize(slot, self._contained(slot))
+        elif claimer in self._slots:
+            self._members.setdefault(claimer, set()).add(slot)
+        else:
+            self._release(slot)
+
+    def _finalize(self, slot: int, contained: np.ndarray):
+        """
+        Makes the removed mainshock in the given slot the fallback of the
+        kept events in its windows, and releases it and its removed
+        members.
+        """
+        b = self._buffers
+        number = b["number"][slot]
+        for s in contained:
+            if (b["fallback"][s] < 0
+                    or b["magnitude"][slot] > b["fallback_magnitude"][s]
+                    or (b["magnitude"][slot] == b["fallback_magnitude"][s]
+                        and number < b["fallback"][s])):
+                b["fallback"][s] = number
+                b["fallback_magnitude"][s] = b["magnitude"][slot]
+        for s in self._members.pop(int(number), ()):
+            self._release(s)
+        self._release(slot)
+
+    def _release(self, slot: int):
+        """
+        Frees the slot of a removed event, its result is final.
+        """
+        self._buffers["alive"][slot] = False
+        self._free.append(slot)
+
+    def _worse(self, slot: int) -> np.ndarray:
+        """
+        Mask of the slots of the events that are considered as mainshocks
+        after the event in the given slot.
+        """
+        b = self._buffers
+        magnitude = b["magnitude"][:self._size]
+        return ((magnitude < b["magnitude"][slot])
+                | ((magnitude == b["magnitude"][slot])
+                   & (b["number"][:self._size] > b["number"][slot])))
+
+    def _contained(self, slot: int) -> np.ndarray:
+        """
+        Slots of the kept events within the windows of the event in the
+        given slot that are considered as mainshocks after it.
+        """
+        b = self._buffers
+        time = b["time"][:self._size]
+        mask = (b["alive"][:self._size] & self._worse(slot)
+                & (time >= b["time"][slot] - b["before"][slot])
+                & (time <= b["time"][slot] + b["after"][slot]))
+        vsel = np.flatnonzero(mask)
+        return vsel[within_distance(
+            b["longitude"][vsel], b["latitude"][vsel],
+            b["longitude"][slot], b["latitude"][slot],
+            b["space_windows"][slot])]
+
+    def _mainshock(self, slot: int) -> int:
+        """
+        Number of the mainshock of the event in the given slot: the first
+        mainshock considered whose windows contain the event, or the event
+        itself if there is none.
+        """
+        b = self._buffers
+        time = b["time"][:self._size]
+        mask = (b["alive"][:self._size]
+                & (b["claimer"][:self._size] == b["number"][:self._size])
+                & ~self._worse(slot)
+                & (time - b["before"][:self._size] <= b["time"][slot])
+                & (time + b["after"][:self._size] >= b["time"][slot]))
+        mask[slot] = False
+        vsel = np.flatnonzero(mask)
+        vsel = vsel[within_distance(
+            b["longitude"][vsel], b["latitude"][vsel],
+            b["longitude"][slot], b["latitude"][slot],
+            b["space_windows"][vsel])]
+
+        candidates = [(-b["magnitude"][s], b["number"][s]) for s in vsel]
+        if b["fallback"][slot] >= 0:
+            candidates.append((-b["fallback_magnitude"][slot],
+                               b["fallback"][slot]))
+        if not candidates:
+            return int(b["number"][slot])
+        return int(min(candidates)[1])
+
+    def _update(self, slots: list[int]) -> dict[int, int]:
+        """
+        Updates the mainshocks of the events in the given slots, and of
+        all events whose result depends on them, in the order in which
+        they are considered as mainshocks.
+        """
+        b = self._buffers
+        queue = [(-b["magnitude"][s], b["number"][s], s) for s in slots]
+        heapq.heapify(queue)
+        queued = set(slots)
+        changes = {}
+        while queue:
+            _, number, slot = heapq.heappop(queue)
+            queued.discard(slot)
+            old = b["claimer"][slot]
+            new = self._mainshock(slot)
+            if new == old:
+                continue
+            b["claimer"][slot] = new
+            changes[int(number)] = new
+            contained = self._contained(slot)
+
+            if int(number) not in self._slots:
+                # a removed member follows its new mainshock
+                members = self._members[int(old)]
+                members.discard(slot)
+                if not members:
+                    del self._members[int(old)]
+                if new == number:
+                    self._finalize(slot, contained)
+                elif new in self._slots:
+                    self._members.setdefault(new, set()).add(slot)
+                else:
+                    self._release(slot)
+
+            # the events in the windows of an event depend on whether it
+            # is a mainshock
+            if (old == number) != (new == number):
+                for s in contained:
+                    if s not in queued:
+                        queued.add(s)
+                        heapq.heappush(
+                            queue, (-b["magnitude"][s], b["number"][s], s))
+        return changes
+
+    def _decluster(self, catalog: pd.DataFrame) -> DeclusteringResult:
+        """
+        Add the events of the catalog in time order to an empty stream.
+
+        The catalog must contain the following columns:
+        - time, magnitude, longitude, latitude
+
+        Args:
+            catalog: the catalog of earthquakes
+
+        Returns:
+            result: mainshock flags and cluster ids of the events, and
+                    mainshock, size and time span of each cluster
+
+        Raises:
+            ValueError: if a required column is missing
+        """
+        cols = ["time", "magnitude", "longitude", "latitude"]
+        if not set(cols).issubset(set(catalog.columns)):
+            raise ValueError("catalog must contain the following columns: "
+                             + ", ".join(cols))
+        catalog = catalog[cols].reset_index(drop=True)
+
+        magnitude = catalog["magnitude"].to_numpy(dtype=float)
+        longitude = catalog["longitude"].to_numpy(dtype=float)
+        latitude = catalog["latitude"].to_numpy(dtype=float)
+        time = _time_ns(catalog)
+        space_windows, before, after = self._windows(magnitude)
+        space_windows = np.asarray(space_windows, dtype=float)
+
+        self.reset()
+        idx_time = np.argsort(time, kind="stable")
+        mainshock = np.empty(len(catalog), dtype=int)
+        for i in idx_time:
+            changes = self._add(time[i], longitude[i], latitude[i],
+                                magnitude[i], space_windows[i], before[i],
+                                after[i])
+            for number, claimer in changes.items():
+                mainshock[idx_time[number]] = idx_time[claimer]
+
+        # number the clusters in the order of GardnerKnopoffType1
+        mainshock_flags = mainshock == np.arange(len(catalog))
+        order = GardnerKnopoffType1._order(catalog)
+        mainshock_index = order[mainshock_flags[order]]
+        ids = np.zeros(len(catalog), dtype=int)
+        ids[mainshock_index] = np.arange(1, len(mainshock_index) + 1)
+        cluster_ids = ids[mainshock]
+        return DeclusteringResult.from_cluster_ids(
+            cluster_ids, mainshock_index, time)
@@ -34,7 +34,7 @@ class GardnerKnopoffType1TestCase(unittest.TestCase):
         tdw = GardnerKnopoffWindow()
         dec = GardnerKnopoffType1(time_distance_window=tdw,
                                   fs_time_prop=1.0)
-        mainshock_flags = dec(self.cat)
+        mainshock_flags = dec(self.cat).mainshock_flags
         np.testing.assert_allclose(mainshock_flags, self.expected)
 
     def test_dec_gardner_knopoff_time_cutoff(self):
@@ -45,8 +45,78 @@ class GardnerKnopoffType1TestCase(unittest.TestCase):
         tdw = GardnerKnopoffWindow(time_cutoff=100)
         dec = GardnerKnopoffType1(time_distance_window=tdw,
                                   fs_time_prop=1.0)
-        mainshock_flags = dec(self.cat)
+        mainshock_flags = dec(self.cat).mainshock_flags
         expected = self.expected.copy()
         # event becomes mainshock when time_cutoff = 100
         expected[4] = True
         np.testing.assert_allclose(mainshock_flags, expected)
+
+    def test_dec_gardner_knopoff_spatial_index(self):
+        """
+        Testing that the spatial index gives the same result as comparing
+        all events in the time window
+        """
+        rng = np.random.default_rng(42)
+        n = 2000
+        catalog = pd.DataFrame({
+            "time": np.datetime64("2000-01-01") + np.sort(
+                rng.integers(0, 10 * 365 * 86400, n)).astype(
+                    "timedelta64[s]"),
+            "longitude": rng.uniform(5, 11, n),
+            "latitude": rng.uniform(45, 48, n),
+            "magnitude": np.round(rng.exponential(0.5, n) + 2, 1),
+        })
+        tdw = GardnerKnopoffWindow()
+        dec = GardnerKnopoffType1(time_distance_window=tdw,
+                                  fs_time_prop=0.5,
+                                  spatial_index=False)
+        mainshock_flags = dec(catalog).mainshock_flags
+
+        dec_tree = GardnerKnopoffType1(time_distance_window=tdw,
+                                       fs_time_prop=0.5,
+                                       spatial_index=True)
+        # use the spatial index for all time windows
+        dec_tree._max_brute_force = 0
+        np.testing.assert_array_equal(dec_tree(catalog).mainshock_flags,
+                                      mainshock_flags)
+        self.assertGreater(np.sum(~mainshock_flags), 0)
+
+        np.testing.assert_array_equal(dec_tree(self.cat).mainshock_flags,
+                                      self.expected)
+
+    def test_dec_gardner_knopoff_clusters(self):
+        """
+        Testing the cluster properties returned with the mainshock flags
+        """
+        tdw = GardnerKnopoffWindow()
+        dec = GardnerKnopoffType1(time_distance_window=tdw,
+                                  fs_time_prop=1.0)
+        result = dec(self.cat)
+        self.assertIs(dec.result, result)
+
+        cluster_ids = result.cluster_ids
+        self.assertEqual(cluster_ids.min(), 1)
+        self.assertEqual(result.n_clusters, cluster_ids.max())
+        np.testing.assert_array_equal(
+            result.cluster_sizes,
+            np.bincount(cluster_ids)[1:])
+        self.assertEqual(result.cluster_sizes.sum(), len(self.cat))
+
+        # each cluster has exactly one mainshock, which is its largest event
+        np.testing.assert_array_equal(
+            np.sort(result.mainshock_index),
+            np.flatnonzero(result.mainshock_flags))
+        np.testing.assert_array_equal(
+            cluster_ids[result.mainshock_index],
+            np.arange(1, result.n_clusters + 1))
+        magnitude = self.cat["magnitude"].to_numpy()
+        for k, i in enumerate(result.mainshock_index):
+            in_cluster = cluster_ids == k + 1
+            self.assertEqual(magnitude[i], magnitude[in_cluster].max())
+
+        time = pd.to_datetime(self.cat["time"]).to_numpy()
+        for k in range(result.n_clusters):
+            in_cluster = cluster_ids == k + 1
+            self.assertEqual(result.cluster_start[k], time[in_cluster].min())
+            self.assertEqual(result.cluster_end[k], time[in_cluster].max())
+        self.assertTrue(np.all(result.time_spans >= np.timedelta64(0)))
@@ -0,0 +1,168 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering import Reasenberg
+from seismostats.analysis.declustering.utils import haversine
+
+
+def _reasenberg_reference(catalog: pd.DataFrame, rfact=10, xmeff=1.5,
+                          xk=0.5, p=0.95, tau_min=1.0, tau_max=10.0):
+    """
+    Reasenberg declustering with cluster numbers that are relabeled when
+    clusters are merged, comparing all later events in the look-ahead
+    time. Returns the cluster number of each event.
+    """
+    time = catalog["time"].to_numpy().astype(
+        "datetime64[ns]").astype(np.int64)
+    days = time / (86400 * 1e9)
+    magnitude = catalog["magnitude"].to_numpy()
+    longitude = catalog["longitude"].to_numpy()
+    latitude = catalog["latitude"].to_numpy()
+    radius = rfact * 0.011 * 10 ** (0.4 * magnitude)
+    order = np.argsort(time, kind="stable")
+    position = np.argsort(order)
+
+    # each event starts in its own cluster
+    cluster = np.arange(len(catalog))
+    largest = {}
+    for i in order:
+        k = cluster[i]
+        if k not in largest or magnitude[i] > magnitude[largest[k]]:
+            largest[k] = i
+            tau = tau_min
+        else:
+            big = largest[k]
+            delta_m = (1 - xk) * magnitude[big] - xmeff
+            tau = (-np.log(1 - p) * (days[i] - days[big])
+                   / 10 ** (2 * (delta_m - 1) / 3))
+            tau = min(max(tau, tau_min), tau_max)
+        big = largest[k]
+
+        later = order[position[i] + 1:]
+        later = later[time[later] - time[i] <= int(tau * 86400 * 1e9)]
+        linked = later[
+            (haversine(longitude[later], latitude[later],
+                       longitude[i], latitude[i]) <= radius[i])
+            | (haversine(longitude[later], latitude[later],
+                         longitude[big], latitude[big]) <= radius[big])]
+        for j in linked:
+            other = cluster[j]
+            if other == k:
+                continue
+            cluster[cluster == other] = k
+            other_big = largest.pop(other, None)
+            if other_big is not None and (
+                    magnitude[other_big] > magnitude[largest[k]]
+                    or (magnitude[other_big] == magnitude[largest[k]]
+                        and position[other_big] < position[largest[k]])):
+                largest[k] = other_big
+    return cluster
+
+
+class ReasenbergTestCase(unittest.TestCase):
+    """
+    Unit tests for the Reasenberg declustering algorithm class.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 1500
+        self.cat = pd.DataFrame({
+            "time": np.datetime64("2000-01-01") + np.sort(
+                rng.integers(0, 2 * 365 * 86400, n)).astype(
+                    "timedelta64[s]"),
+            "longitude": rng.uniform(7, 8, n),
+            "latitude": rng.uniform(46, 47, n),
+            "magnitude": np.round(rng.exponential(0.5, n) + 2.5, 1),
+        })
+
+    def test_reference(self):
+        """
+        Testing that the clusters are the same as those of a direct
+        implementation of the algorithm
+        """
+        result = Reasenberg(rfact=20)(self.cat)
+        expected = _reasenberg_reference(self.cat, rfact=20)
+
+        # same partition of the events into clusters
+        _, expected_ids = np.unique(expected, return_inverse=True)
+        pairs = np.unique(np.column_stack(
+            [result.cluster_ids, expected_ids.ravel()]), axis=0)
+        self.assertEqual(len(pairs), result.n_clusters)
+        self.assertEqual(len(pairs), len(np.unique(expected)))
+        self.assertLess(result.n_clusters, len(self.cat))
+
+        magnitude = self.cat["magnitude"].to_numpy()
+        for k, i in enumerate(result.mainshock_index):
+            in_cluster = result.cluster_ids == k + 1
+            self.assertTrue(result.mainshock_flags[i])
+            self.assertEqual(magnitude[i], magnitude[in_cluster].max())
+        self.assertEqual(np.sum(result.mainshock_flags), result.n_clusters)
+        np.testing.assert_array_equal(
+            result.cluster_sizes, np.bincount(result.cluster_ids)[1:])
+
+    def test_spatial_index(self):
+        """
+        Testing that the spatial index gives the same result as comparing
+        all events in the look-ahead time
+        """
+        dec = Reasenberg(rfact=20, spatial_index=False)
+        cluster_ids = dec(self.cat).cluster_ids
+
+        dec_tree = Reasenberg(rfact=20, spatial_index=True)
+        dec_tree._max_brute_force = 0
+        np.testing.assert_array_equal(dec_tree(self.cat).cluster_ids,
+                                      cluster_ids)
+
+    def test_sequence(self):
+        """
+        Testing a mainshock with aftershocks, an event outside of the
+        interaction zone and an event after the look-ahead time
+        """
+        catalog = pd.DataFrame({
+            "time": pd.to_datetime([
+                "2000-01-01 00:00", "2000-01-01 12:00", "2000-01-02 06:00",
+                "2000-01-02 07:00", "2000-03-01 00:00"]),
+            "longitude": [8.0, 8.01, 8.0, 9.0, 8.0],
+            "latitude": [46.0, 46.0, 46.01, 46.0, 46.0],
+            "magnitude": [4.0, 5.0, 3.0, 3.0, 3.0],
+        })
+        result = Reasenberg()(catalog)
+        np.testing.assert_array_equal(result.cluster_ids, [1, 1, 1, 2, 3])
+        np.testing.assert_array_equal(result.mainshock_flags,
+                                      [False, True, False, True, True])
+        np.testing.assert_array_equal(result.mainshock_index, [1, 3, 4])
+        np.testing.assert_array_equal(result.cluster_sizes, [3, 1, 1])
+        self.assertEqual(result.time_spans[0],
+                         np.timedelta64(30, "h").astype("timedelta64[ns]"))
+
+    def test_equal_magnitudes(self):
+        """
+        Testing that of two events with the same magnitude, the first one
+        remains the largest event of the cluster
+        """
+        catalog = pd.DataFrame({
+            "time": pd.to_datetime([
+                "2000-01-01 00:00", "2000-01-01 12:00", "2000-01-04 12:00"]),
+            "longitude": [8.0, 8.0, 8.0],
+            "latitude": [46.0, 46.0, 46.0],
+            "magnitude": [3.0, 3.0, 2.0],
+        })
+        # the second event is linked to the first one within tau_min. Its
+        # look-ahead time follows Omori's law from the first event, with
+        # delta_m = 0.5 * 3 - 1.5 = 0, tau = -ln(0.05) * 0.5 / 10**(-2/3)
+        # = 6.95 days, so the third event, 3 days later, is linked as well.
+        # Were the second event the largest, its look-ahead time would be
+        # tau_min = 1 day.
+        result = Reasenberg()(catalog)
+        np.testing.assert_array_equal(result.cluster_ids, [1, 1, 1])
+        np.testing.assert_array_equal(result.mainshock_index, [0])
+        np.testing.assert_array_equal(result.mainshock_flags,
+                                      [True, False, False])
+        np.testing.assert_array_equal(result.cluster_sizes, [3])
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            Reasenberg()(self.cat.drop(columns="time"))
@@ -0,0 +1,165 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering import ZaliapinBenZion
+from seismostats.analysis.declustering.utils import haversine
+
+
+def _synthetic_catalog(n: int, seed: int) -> pd.DataFrame:
+    """
+    Background events with aftershocks close in time and space.
+    """
+    rng = np.random.default_rng(seed)
+    n_background = n // 2
+    time = rng.uniform(0, 10 * 365 * 86400, n_background)
+    longitude = rng.uniform(5, 11, n_background)
+    latitude = rng.uniform(45, 48, n_background)
+    parent = rng.integers(0, n_background, n - n_background)
+    time = np.concatenate(
+        [time, time[parent] + rng.exponential(86400, len(parent))])
+    longitude = np.concatenate(
+        [longitude, longitude[parent] + rng.normal(0, 0.02, len(parent))])
+    latitude = np.concatenate(
+        [latitude, latitude[parent] + rng.normal(0, 0.02, len(parent))])
+    # simultaneous events at the same location
+    time[-5:] = time[:5]
+    longitude[-5:] = longitude[:5]
+    latitude[-5:] = latitude[:5]
+    return pd.DataFrame({
+        "time": np.datetime64("2000-01-01") + time.astype("timedelta64[s]"),
+        "longitude": longitude,
+        "latitude": latitude,
+        "magnitude": np.round(rng.exponential(0.5, n) + 1, 1),
+    })
+
+
+def _nearest_neighbors_brute_force(catalog: pd.DataFrame,
+                                   b_value: float,
+                                   fractal_dimension: float):
+    time = catalog["time"].to_numpy().astype(
+        "datetime64[ns]").astype(np.int64)
+    years = time / (365.25 * 86400 * 1e9)
+    magnitude = catalog["magnitude"].to_numpy()
+    parent = np.full(len(catalog), -1)
+    log_eta = np.full(len(catalog), np.inf)
+    for j in range(len(catalog)):
+        earlier = np.flatnonzero(time < time[j])
+        if len(earlier) == 0:
+            continue
+        distance = haversine(catalog["longitude"].to_numpy()[earlier],
+                             catalog["latitude"].to_numpy()[earlier],
+                             catalog["longitude"][j],
+                             catalog["latitude"][j])
+        with np.errstate(divide="ignore"):
+            log_eta_j = (np.log10(years[j] - years[earlier])
+                         + fractal_dimension * np.log10(distance)
+                         - b_value * magnitude[earlier])
+        nearest = np.argmin(log_eta_j)
+        parent[j] = earlier[nearest]
+        log_eta[j] = log_eta_j[nearest]
+    return parent, log_eta
+
+
+class ZaliapinBenZionTestCase(unittest.TestCase):
+    """
+    Unit tests for the nearest-neighbor declustering algorithm class.
+    """
+
+    def setUp(self):
+        self.cat = _synthetic_catalog(600, seed=1)
+
+    def test_nearest_neighbors(self):
+        """
+        Testing that the nearest neighbors are the same as when comparing
+        all pairs of events
+        """
+        dec = ZaliapinBenZion(b_value=1.1, fractal_dimension=1.5)
+        # search most events in the blocks of older events
+        dec._min_block_size = 4
+        dec._chunk_size = 97
+        result = dec(self.cat)
+
+        parent, log_eta = _nearest_neighbors_brute_force(
+            self.cat, b_value=1.1, fractal_dimension=1.5)
+        np.testing.assert_array_equal(result.parent, parent)
+        has_parent = parent >= 0
+        self.assertEqual(np.sum(~has_parent), 1)
+        with np.errstate(divide="ignore"):
+            np.testing.assert_allclose(
+                np.log10(result.eta[has_parent]), log_eta[has_parent],
+                atol=1e-8)
+        np.testing.assert_allclose(
+            result.rescaled_time * result.rescaled_distance, result.eta)
+
+        # the same result with the default settings
+        result_default = ZaliapinBenZion(
+            b_value=1.1, fractal_dimension=1.5)(self.cat)
+        np.testing.assert_array_equal(result_default.parent, parent)
+
+    def test_rescaled_components(self):
+        """
+        Testing the rescaled time and distance to the nearest neighbor
+        """
+        dec = ZaliapinBenZion(b_value=1.0, fractal_dimension=1.6, q=0.3)
+        result = dec(self.cat)
+        j = np.flatnonzero(result.parent >= 0)[10]
+        i = result.parent[j]
+        years = (pd.Timestamp(self.cat["time"][j])
+                 - pd.Timestamp(self.cat["time"][i])
+                 ) / pd.Timedelta(days=365.25)
+        distance = haversine(self.cat["longitude"].to_numpy()[[i]],
+                             self.cat["latitude"].to_numpy()[[i]],
+                             self.cat["longitude"][j],
+                             self.cat["latitude"][j])[0]
+        magnitude = self.cat["magnitude"][i]
+        self.assertAlmostEqual(result.rescaled_time[j],
+                               years * 10 ** (-0.3 * magnitude))
+        self.assertAlmostEqual(result.rescaled_distance[j],
+                               distance ** 1.6 * 10 ** (-0.7 * magnitude))
+
+    def test_clusters(self):
+        """
+        Testing that linked events form the clusters and that the largest
+        event of each cluster is the mainshock
+        """
+        dec = ZaliapinBenZion(eta_0=1e-4)
+        result = dec(self.cat)
+        self.assertEqual(result.eta_0, 1e-4)
+
+        linked = (result.parent >= 0) & (result.eta <= 1e-4)
+        self.assertGreater(np.sum(linked), 0)
+        cluster_ids = result.cluster_ids
+        np.testing.assert_array_equal(
+            cluster_ids[linked], cluster_ids[result.parent[linked]])
+        np.testing.assert_array_equal(
+            np.sort(cluster_ids[~linked]), np.arange(1, result.n_clusters + 1))
+        np.testing.assert_array_equal(
+            result.cluster_sizes, np.bincount(cluster_ids)[1:])
+
+        magnitude = self.cat["magnitude"].to_numpy()
+        time = self.cat["time"].to_numpy().astype("datetime64[ns]")
+        self.assertEqual(np.sum(result.mainshock_flags), result.n_clusters)
+        for k, i in enumerate(result.mainshock_index):
+            in_cluster = cluster_ids == k + 1
+            self.assertTrue(result.mainshock_flags[i])
+            self.assertEqual(magnitude[i], magnitude[in_cluster].max())
+            self.assertEqual(result.cluster_start[k], time[in_cluster].min())
+            self.assertEqual(result.cluster_end[k], time[in_cluster].max())
+
+    def test_estimated_threshold(self):
+        """
+        Testing that the estimated threshold separates the aftershocks
+        from the background events
+        """
+        result = ZaliapinBenZion()(self.cat)
+        self.assertTrue(np.isfinite(result.eta_0))
+        linked = result.eta <= result.eta_0
+        # the aftershocks are in the second half of the catalog
+        self.assertGreater(np.mean(linked[300:]), 0.9)
+        self.assertLess(np.mean(linked[:300]), 0.2)
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            ZaliapinBenZion()(self.cat.drop(columns="latitude"))
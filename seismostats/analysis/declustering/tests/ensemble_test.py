@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering import (GardnerKnopoffEnsemble,
+                                               GardnerKnopoffType1,
+                                               GardnerKnopoffWindow,
+                                               GruenthalWindow,
+                                               UhrhammerWindow)
+from seismostats.analysis.declustering.ensemble import _perturb
+
+
+class GardnerKnopoffEnsembleTestCase(unittest.TestCase):
+    """
+    Unit tests for the ensemble Gardner-Knopoff declustering.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        n_background = 1000
+        time = rng.uniform(0, 10 * 365 * 86400, n_background)
+        longitude = rng.uniform(6, 10, n_background)
+        latitude = rng.uniform(45, 48, n_background)
+        parent = rng.integers(0, n_background, 2000)
+        self.cat = pd.DataFrame({
+            "time": np.datetime64("2000-01-01") + np.concatenate(
+                [time, time[parent] + rng.exponential(5 * 86400, 2000)]
+            ).astype("timedelta64[s]"),
+            "longitude": np.concatenate(
+                [longitude, longitude[parent] + rng.normal(0, 0.05, 2000)]),
+            "latitude": np.concatenate(
+                [latitude, latitude[parent] + rng.normal(0, 0.05, 2000)]),
+            "magnitude": np.round(rng.exponential(0.45, 3000) + 1, 1),
+            "location_uncertainty": rng.uniform(0, 5, 3000),
+        })
+
+    def test_fixed_parameters(self):
+        """
+        Testing that without perturbations each realisation gives the
+        result of GardnerKnopoffType1
+        """
+        expected = GardnerKnopoffType1(
+            time_distance_window=GruenthalWindow(),
+            fs_time_prop=0.5)(self.cat).mainshock_flags
+        ensemble = GardnerKnopoffEnsemble(GruenthalWindow(), 0.5,
+                                          n_realizations=3)
+        np.testing.assert_array_equal(ensemble(self.cat), expected)
+
+    def test_realization(self):
+        """
+        Testing that a realisation gives the result of GardnerKnopoffType1
+        for the drawn window, foreshock proportion and epicenters
+        """
+        windows = [GardnerKnopoffWindow(), GruenthalWindow(),
+                   UhrhammerWindow()]
+        ensemble = GardnerKnopoffEnsemble(
+            windows, (0.2, 1.0), location_uncertainty="location_uncertainty",
+            n_realizations=1, seed=3)
+        probability = ensemble(self.cat)
+
+        # draw the same random numbers as the realisation
+        rng = np.random.default_rng(np.random.SeedSequence(3).spawn(1)[0])
+        window = windows[rng.integers(len(windows))]
+        fs_time_prop = rng.uniform(0.2, 1.0)
+        longitude, latitude, _ = _perturb(
+            self.cat["longitude"].to_numpy(), self.cat["latitude"].to_numpy(),
+            self.cat["location_uncertainty"].to_numpy(), rng)
+        catalog = self.cat.assign(longitude=longitude, latitude=latitude)
+        expected = GardnerKnopoffType1(
+            time_distance_window=window,
+            fs_time_prop=fs_time_prop)(catalog).mainshock_flags
+        np.testing.assert_array_equal(probability, expected)
+
+    def test_probability(self):
+        windows = [GardnerKnopoffWindow(), GruenthalWindow()]
+        ensemble = GardnerKnopoffEnsemble(
+            windows, (0.2, 1.0), location_uncertainty=2.0,
+            n_realizations=8, seed=5)
+        probability = ensemble(self.cat)
+        self.assertIs(ensemble.mainshock_probability, probability)
+        self.assertEqual(probability.shape, (len(self.cat),))
+        np.testing.assert_array_equal(probability * 8,
+                                      np.round(probability * 8))
+        self.assertTrue(np.any((probability > 0) & (probability < 1)))
+
+        # the same realisations are run in a process pool
+        ensemble.n_jobs = 2
+        np.testing.assert_array_equal(ensemble(self.cat), probability)
+
+    def test_missing_column(self):
+        ensemble = GardnerKnopoffEnsemble(
+            GardnerKnopoffWindow(), location_uncertainty="uncertainty")
+        with self.assertRaises(ValueError):
+            ensemble(self.cat)
@@ -0,0 +1,123 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering import (GardnerKnopoffType1,
+                                               GardnerKnopoffWindow,
+                                               GruenthalWindow,
+                                               OnlineGardnerKnopoff)
+
+
+class OnlineGardnerKnopoffTestCase(unittest.TestCase):
+    """
+    Unit tests for the streaming Gardner-Knopoff declustering.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n_background = 1000
+        time = rng.uniform(0, 10 * 365 * 86400, n_background)
+        longitude = rng.uniform(6, 10, n_background)
+        latitude = rng.uniform(45, 48, n_background)
+        parent = rng.integers(0, n_background, 2000)
+        self.cat = pd.DataFrame({
+            "time": np.datetime64("2000-01-01") + np.concatenate(
+                [time, time[parent] + rng.exponential(5 * 86400, 2000)]
+            ).astype("timedelta64[s]"),
+            "longitude": np.concatenate(
+                [longitude, longitude[parent] + rng.normal(0, 0.05, 2000)]),
+            "latitude": np.concatenate(
+                [latitude, latitude[parent] + rng.normal(0, 0.05, 2000)]),
+            "magnitude": np.round(rng.exponential(0.45, 3000) + 1, 1),
+        })
+
+    def test_same_as_batch(self):
+        """
+        Testing that the result is the same as the one of
+        GardnerKnopoffType1
+        """
+        for window, fs_time_prop in [(GardnerKnopoffWindow(), 1.0),
+                                     (GruenthalWindow(), 0.3)]:
+            expected = GardnerKnopoffType1(
+                time_distance_window=window,
+                fs_time_prop=fs_time_prop)(self.cat)
+            dec = OnlineGardnerKnopoff(time_distance_window=window,
+                                       fs_time_prop=fs_time_prop)
+            result = dec(self.cat)
+            np.testing.assert_array_equal(result.mainshock_flags,
+                                          expected.mainshock_flags)
+            np.testing.assert_array_equal(result.cluster_ids,
+                                          expected.cluster_ids)
+            np.testing.assert_array_equal(result.mainshock_index,
+                                          expected.mainshock_index)
+            np.testing.assert_array_equal(result.cluster_sizes,
+                                          expected.cluster_sizes)
+            np.testing.assert_array_equal(result.cluster_start,
+                                          expected.cluster_start)
+            np.testing.assert_array_equal(result.cluster_end,
+                                          expected.cluster_end)
+
+            # only the events of the last years are kept
+            self.assertEqual(dec.n_events, len(self.cat))
+            self.assertLess(dec.n_active, len(self.cat) // 2)
+
+    def test_add(self):
+        dec = OnlineGardnerKnopoff(GardnerKnopoffWindow())
+        self.assertEqual(dec.add("2000-01-01", 8.0, 46.0, 3.0), {0: 0})
+        # a larger event takes the earlier event
+        self.assertEqual(dec.add("2000-01-02", 8.01, 46.0, 4.0),
+                         {1: 1, 0: 1})
+        self.assertEqual(dec.add("2000-01-03", 8.0, 46.0, 2.0), {2: 1})
+        # far from the other events
+        self.assertEqual(dec.add("2000-01-03", 10.0, 46.0, 2.0), {3: 3})
+        self.assertEqual(dec.n_active, 4)
+
+        # the windows of the earlier events are closed
+        self.assertEqual(dec.add("2010-01-01", 8.0, 46.0, 2.0), {4: 4})
+        self.assertEqual(dec.n_active, 1)
+
+        with self.assertRaises(ValueError):
+            dec.add("2009-01-01", 8.0, 46.0, 2.0)
+
+        dec.reset()
+        self.assertEqual(dec.add("2000-01-01", 8.0, 46.0, 3.0), {0: 0})
+
+    def test_removed_members(self):
+        """
+        Testing that events whose windows are closed follow their mainshock
+        when it becomes part of the cluster of a larger one
+        """
+        rng = np.random.default_rng(3)
+        time = rng.uniform(0, 5 * 365 * 86400, 1500)
+        longitude = rng.uniform(5, 11, 1500)
+        latitude = rng.uniform(45, 48, 1500)
+        parent = rng.integers(0, 1500, 1500)
+        cat = pd.DataFrame({
+            "time": np.datetime64("2000-01-01") + np.concatenate(
+                [time, time[parent] + rng.exponential(5 * 86400, 1500)]
+            ).astype("timedelta64[s]"),
+            "longitude": np.concatenate(
+                [longitude, longitude[parent] + rng.normal(0, 0.05, 1500)]),
+            "latitude": np.concatenate(
+                [latitude, latitude[parent] + rng.normal(0, 0.05, 1500)]),
+            "magnitude": np.round(rng.exponential(0.45, 3000) + 2, 1),
+        }).iloc[rng.permutation(3000)].reset_index(drop=True)
+
+        for window in [GardnerKnopoffWindow(), GruenthalWindow()]:
+            expected = GardnerKnopoffType1(window, fs_time_prop=0.3)(cat)
+            result = OnlineGardnerKnopoff(window, fs_time_prop=0.3)(cat)
+            np.testing.assert_array_equal(result.cluster_ids,
+                                          expected.cluster_ids)
+            np.testing.assert_array_equal(result.mainshock_index,
+                                          expected.mainshock_index)
+
+            # the mainshocks returned by add are mainshocks in the end
+            dec = OnlineGardnerKnopoff(window, fs_time_prop=0.3)
+            mainshock = {}
+            for _, event in cat.sort_values("time", kind="stable").iterrows():
+                mainshock.update(dec.add(event["time"], event["longitude"],
+                                         event["latitude"],
+                                         event["magnitude"]))
+            for claimer in mainshock.values():
+                self.assertEqual(mainshock[claimer], claimer)
@@ -13,7 +13,8 @@ def test_gardner_knopoff_window():
     mag = np.array([5.0, 6.6])
     sw_space, sw_time = window(mag)
     assert_array_almost_equal(sw_space, np.array([39.994475, 63.107358]))
-    total_s = np.array([delta.total_seconds() for delta in sw_time])
+    assert sw_time.dtype == np.dtype("timedelta64[ns]")
+    total_s = sw_time / np.timedelta64(1, "s")
     expected = np.array([12416915.980999, 77021813.941164])
     assert_array_almost_equal(total_s, expected)
 
@@ -23,7 +24,8 @@ def test_gruenthal_window():
     mag = np.array([5.0, 6.6])
     sw_space, sw_time = window(mag)
     assert_array_almost_equal(sw_space, np.array([56.62752, 79.180511]))
-    total_s = np.array([delta.total_seconds() for delta in sw_time])
+    assert sw_time.dtype == np.dtype("timedelta64[ns]")
+    total_s = sw_time / np.timedelta64(1, "s")
     expected = np.array([18923361.968176, 78507969.029983])
     assert_array_almost_equal(total_s, expected)
 
@@ -33,6 +35,7 @@ def test_uhrhammer_window():
     mag = np.array([5.0, 6.6])
     sw_space, sw_time = window(mag)
     assert_array_almost_equal(sw_space, np.array([20.005355, 72.414025]))
-    total_s = np.array([delta.total_seconds() for delta in sw_time])
+    assert sw_time.dtype == np.dtype("timedelta64[ns]")
+    total_s = sw_time / np.timedelta64(1, "s")
     expected = np.array([2354273.993272, 16983332.073632])
     assert_array_almost_equal(total_s, expected)
@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering import (GardnerKnopoffType1,
+                                               GardnerKnopoffWindow,
+                                               GruenthalWindow,
+                                               TiledDeclusterer)
+from seismostats.analysis.declustering.tiled import _tiles, _WindowSearch
+
+
+def _synthetic_catalog(n: int, seed: int) -> pd.DataFrame:
+    """
+    Background events with aftershocks close in time and space.
+    """
+    rng = np.random.default_rng(seed)
+    n_background = n // 3
+    time = rng.uniform(0, 5 * 365 * 86400, n_background)
+    longitude = rng.uniform(5, 15, n_background)
+    latitude = rng.uniform(40, 48, n_background)
+    parent = rng.integers(0, n_background, n - n_background)
+    time = np.concatenate(
+        [time, time[parent] + rng.exponential(5 * 86400, len(parent))])
+    longitude = np.concatenate(
+        [longitude, longitude[parent] + rng.normal(0, 0.1, len(parent))])
+    latitude = np.concatenate(
+        [latitude, latitude[parent] + rng.normal(0, 0.1, len(parent))])
+    return pd.DataFrame({
+        "time": np.datetime64("2000-01-01") + time.astype("timedelta64[s]"),
+        "longitude": longitude,
+        "latitude": latitude,
+        "magnitude": np.round(rng.exponential(0.5, n) + 3, 1),
+    })
+
+
+class TiledDeclustererTestCase(unittest.TestCase):
+    """
+    Unit tests for the tiled declustering.
+    """
+
+    def setUp(self):
+        self.cat = _synthetic_catalog(6000, seed=3)
+
+    def test_same_as_serial(self):
+        """
+        Testing that the result is the same as the one of the serial run
+        """
+        for window, fs_time_prop, n_tiles in [
+                (GardnerKnopoffWindow(), 1.0, 4),
+                (GardnerKnopoffWindow(), 0.3, (5, 3)),
+                (GruenthalWindow(), 0.5, 9)]:
+            dec = GardnerKnopoffType1(time_distance_window=window,
+                                      fs_time_prop=fs_time_prop)
+            expected = dec(self.cat)
+            result = TiledDeclusterer(dec, n_tiles=n_tiles)(self.cat)
+            np.testing.assert_array_equal(result.mainshock_flags,
+                                          expected.mainshock_flags)
+            np.testing.assert_array_equal(result.cluster_ids,
+                                          expected.cluster_ids)
+            np.testing.assert_array_equal(result.mainshock_index,
+                                          expected.mainshock_index)
+            np.testing.assert_array_equal(result.cluster_sizes,
+                                          expected.cluster_sizes)
+            np.testing.assert_array_equal(result.cluster_start,
+                                          expected.cluster_start)
+            np.testing.assert_array_equal(result.cluster_end,
+                                          expected.cluster_end)
+
+    def test_process_pool(self):
+        dec = GardnerKnopoffType1(time_distance_window=GardnerKnopoffWindow())
+        expected = dec(self.cat)
+        result = TiledDeclusterer(dec, n_tiles=4, n_jobs=2)(self.cat)
+        np.testing.assert_array_equal(result.cluster_ids,
+                                      expected.cluster_ids)
+
+    def test_tiles(self):
+        longitude = self.cat["longitude"].to_numpy()
+        latitude = self.cat["latitude"].to_numpy()
+        tiles = _tiles(longitude, latitude, 50.0, (3, 2))
+        self.assertEqual(len(tiles), 6)
+
+        # each event belongs to exactly one tile
+        n_core = np.zeros(len(self.cat), dtype=int)
+        for region, in_core, border in tiles:
+            n_core[region[in_core]] += 1
+            self.assertTrue(np.all(in_core[border]))
+            # the halo contains the events closer than 50 km to the tile
+            halo = region[~in_core]
+            self.assertGreater(len(halo), 0)
+        np.testing.assert_array_equal(n_core, 1)
+
+    def test_window_search(self):
+        """
+        Testing that the mainshock of each event in the serial run is the
+        first mainshock whose windows contain it
+        """
+        dec = GardnerKnopoffType1(time_distance_window=GardnerKnopoffWindow(),
+                                  fs_time_prop=0.5)
+        result = dec(self.cat)
+        magnitude = self.cat["magnitude"].to_numpy()
+        space_windows, before, after = dec._windows(magnitude)
+        rank = np.empty(len(self.cat), dtype=int)
+        rank[dec._order(self.cat)] = np.arange(len(self.cat))
+        search = _WindowSearch({
+            "longitude": self.cat["longitude"].to_numpy(),
+            "latitude": self.cat["latitude"].to_numpy(),
+            "time": self.cat["time"].to_numpy().astype(
+                "datetime64[ns]").astype(np.int64),
+            "rank": rank, "magnitude": magnitude,
+            "space_windows": space_windows, "before": before,
+            "after": after})
+
+        claimers = search.claimers(np.arange(len(self.cat)),
+                                   result.mainshock_flags, chunk_size=1000)
+        np.testing.assert_array_equal(
+            claimers, result.mainshock_index[result.cluster_ids - 1])
+
+        i = result.mainshock_index[0]
+        successors = search.successors(i)
+        self.assertTrue(np.all(rank[successors] > rank[i]))
+        np.testing.assert_array_equal(
+            np.sort(np.flatnonzero(result.cluster_ids == 1)),
+            np.sort(np.append(successors, i)))
+
+    def test_declusterer_type(self):
+        with self.assertRaises(TypeError):
+            TiledDeclusterer(GardnerKnopoffWindow())
@@ -1,4 +1,8 @@
-from seismostats.analysis.declustering.utils import haversine
+from seismostats.analysis.declustering.utils import (_UnionFind,
+                                                     _haversine_threshold,
+                                                     _WithinDistance,
+                                                     haversine, unit_vectors,
+                                                     within_distance)
 from numpy.testing import assert_array_almost_equal
 import numpy as np
 import pytest
@@ -22,3 +26,54 @@ import pytest
 def test_haversine(longs, lats, target_lon, target_lat, expected):
     result = haversine(longs, lats, target_lon, target_lat)
     assert_array_almost_equal(result, expected)
+
+
+def test_unit_vectors():
+    longs = np.array([0, 10, 20, 30, 40])
+    lats = np.array([0, 1, 2, 3, 4])
+    points = unit_vectors(longs, lats)
+    assert_array_almost_equal(np.linalg.norm(points, axis=1), np.ones(5))
+
+    # chord length corresponds to the great-circle distance
+    chord = np.linalg.norm(points - unit_vectors(42.2, 3.5), axis=1)
+    assert_array_almost_equal(2 * 6371.227 * np.arcsin(chord / 2),
+                              haversine(longs, lats, 42.2, 3.5))
+
+
+def test_within_distance():
+    rng = np.random.default_rng(0)
+    longs = rng.uniform(-180, 180, 1000)
+    lats = rng.uniform(-90, 90, 1000)
+    distance = rng.uniform(0, 25000, 1000)
+    expected = haversine(longs, lats, 7.5, 46.5) <= distance
+    np.testing.assert_array_equal(
+        within_distance(longs, lats, 7.5, 46.5, distance), expected)
+    # same location, and antipodal location with the largest distance
+    assert within_distance(np.array([7.5]), np.array([46.5]),
+                           7.5, 46.5, 0.0)[0]
+    assert within_distance(np.array([-172.5]), np.array([-46.5]),
+                           7.5, 46.5, np.pi * 6371.227)[0]
+
+    within = _WithinDistance(longs, lats)
+    threshold = _haversine_threshold(distance)
+    for target in [0, 10, 999]:
+        index = rng.permutation(1000)[:500]
+        np.testing.assert_array_equal(
+            within(index, target, threshold[target]),
+            within_distance(longs[index], lats[index], longs[target],
+                            lats[target], distance[target]))
+    assert len(within(np.array([], dtype=int), 0, threshold[0])) == 0
+
+
+def test_union_find():
+    sets = _UnionFind(6)
+    root = sets.union(sets.find(0), sets.find(1))
+    root = sets.union(sets.find(3), root)
+    sets.union(sets.find(4), sets.find(5))
+    assert sets.find(3) == root
+    assert sets.size[root] == 3
+    roots = sets.find_all(np.arange(6))
+    assert len(np.unique(roots)) == 3
+    assert roots[0] == roots[1] == roots[3]
+    assert roots[4] == roots[5]
+    assert roots[2] == 2
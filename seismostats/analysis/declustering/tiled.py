@@ -0,0 +1,347 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from seismostats.analysis.declustering.base import (Declusterer,
+                                                    DeclusteringResult)
+from seismostats.analysis.declustering.dec_gardner_knopoff import (
+    GardnerKnopoffType1, _time_ns)
+from seismostats.analysis.declustering.utils import (EARTH_RADIUS_KM,
+                                                     within_distance)
+
+
+class TiledDeclusterer(Declusterer):
+    """
+    Runs a Gardner-Knopoff declusterer on spatial tiles of the catalog,
+    optionally in parallel, with the same result as the serial run.
+
+    The catalog is split into a grid of longitude/latitude tiles with
+    about the same number of events. Each tile is declustered together
+    with a halo of the events closer to it than the largest space window.
+    The result of an event is only affected by events within the largest
+    space window, so only the events of a tile that are that close to its
+    border can differ from the serial run. These are checked against the
+    results of the neighbouring tiles, and wrong results are corrected in
+    the order in which the serial run considers the events as mainshocks.
+
+    The tiles are defined in longitude and latitude, the catalog must
+    not cross the antimeridian.
+    """
+
+    def __init__(self,
+                 declusterer: GardnerKnopoffType1,
+                 n_tiles: int | tuple[int, int] = 4,
+                 n_jobs: int | None = None):
+        """
+        Args:
+            declusterer:    the declusterer that is run on each tile
+            n_tiles:        number of tiles, or number of tiles in
+                        longitude and latitude direction
+            n_jobs:         number of processes used to decluster the
+                        tiles, -1 uses all CPUs. If None, the tiles are
+                        declustered one after the other in this process.
+        """
+        super().__init__()
+        if not isinstance(declusterer, GardnerKnopoffType1):
+            raise TypeError("declusterer must be a GardnerKnopoffType1")
+        self.declusterer = declusterer
+        self.n_tiles = n_tiles
+        self.n_jobs = n_jobs
+
+    def _decluster(self, catalog: pd.DataFrame) -> DeclusteringResult:
+        """
+        Apply the declusterer to the tiles of the catalog and merge the
+        results.
+
+        Args:
+            catalog: the catalog of earthquakes
+
+        Returns:
+            result: mainshock flags and cluster ids of the events, and
+                    mainshock, size and time span of each cluster, the
+                    same as for the serial run
+
+        Raises:
+            ValueError: if a required column is missing
+        """
+        cols = ["time", "magnitude", "longitude", "latitude"]
+        if not set(cols).issubset(set(catalog.columns)):
+            raise ValueError("catalog must contain the following columns: "
+                             + ", ".join(cols))
+        catalog = catalog[cols].reset_index(drop=True)
+
+        magnitude = catalog["magnitude"].to_numpy(dtype=float)
+        longitude = catalog["longitude"].to_numpy(dtype=float)
+        latitude = catalog["latitude"].to_numpy(dtype=float)
+        time = _time_ns(catalog)
+        space_windows, before, after = self.declusterer._windows(magnitude)
+        rank = np.empty(len(catalog), dtype=int)
+        rank[self.declusterer._order(catalog)] = np.arange(len(catalog))
+        windows = {"longitude": longitude, "latitude": latitude,
+                   "time": time, "rank": rank, "magnitude": magnitude,
+                   "space_windows": np.asarray(space_windows, dtype=float),
+                   "before": before, "after": after}
+
+        halo = np.max(windows["space_windows"], initial=0)
+        tiles = _tiles(longitude, latitude, halo, self.n_tiles)
+
+        # decluster the tiles with their halos
+        tile_args = [(self.declusterer, catalog.iloc[region], in_core)
+                     for region, in_core, _ in tiles]
+        claimer = np.empty(len(catalog), dtype=int)
+        for (region, in_core, _), tile_claimer in zip(
+                tiles, self._map(_decluster_tile, tile_args)):
+            claimer[region[in_core]] = region[tile_claimer]
+
+        # check the events close to the tile borders
+        is_mainshock = claimer == np.arange(len(catalog))
+        # the mainshocks of the events at the border are within the halo
+        check_args = [
+            ({key: value[region] for key, value in windows.items()},
+             is_mainshock[region],
+             np.searchsorted(region, claimer[region[border]]),
+             np.flatnonzero(border))
+            for region, _, border in tiles]
+        wrong = [region[local] for (region, _, _), local in zip(
+            tiles, self._map(_check_tile, check_args))]
+        wrong = np.concatenate(wrong) if wrong else np.array([], dtype=int)
+
+        # correct them in the order of the serial run, together with
+        # all events whose result depends on them
+        if len(wrong) > 0:
+            search = _WindowSearch(windows)
+            queue = [(rank[i], i) for i in np.unique(wrong)]
+            heapq.heapify(queue)
+            queued = set(np.unique(wrong).tolist())
+            while queue:
+                _, i = heapq.heappop(queue)
+                queued.discard(i)
+                new_claimer = search.claimers(np.array([i]), is_mainshock)[0]
+                was_mainshock = is_mainshock[i]
+                claimer[i] = new_claimer
+                is_mainshock[i] = new_claimer == i
+                if is_mainshock[i] != was_mainshock:
+                    for j in search.successors(i):
+                        if j not in queued:
+                            heapq.heappush(queue, (rank[j], j))
+                            queued.add(j)
+
+        # number the clusters in the order of the serial run
+        mainshock_index = np.flatnonzero(is_mainshock)
+        mainshock_index = mainshock_index[np.argsort(rank[mainshock_index])]
+        cluster_of = np.empty(len(catalog), dtype=int)
+        cluster_of[mainshock_index] = np.arange(1, len(mainshock_index) + 1)
+        cluster_ids = cluster_of[claimer]
+        return DeclusteringResult.from_cluster_ids(
+            cluster_ids, mainshock_index, time)
+
+    def _map(self, function, args: list) -> list:
+        """
+        Applies the function to each tuple of arguments, in a process
+        pool if n_jobs is given.
+        """
+        if self.n_jobs is None:
+            return [function(*arg) for arg in args]
+        with ProcessPoolExecutor(
+                max_workers=None if self.n_jobs == -1 else self.n_jobs
+        ) as executor:
+            return list(executor.map(function, *zip(*args)))
+
+
+def _longitude_margin(latitude: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Largest difference in longitude in degrees of the points within the
+    given distance in km of points at the given latitudes.
+    """
+    sin_d = np.sin(min(distance / EARTH_RADIUS_KM, np.pi))
+    cos_lat = np.cos(np.radians(latitude))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(cos_lat > sin_d,
+                          np.degrees(np.arcsin(sin_d / cos_lat)), 360.0)
+    return margin * (1 + 1e-9) + 1e-9
+
+
+def _tiles(longitude: np.ndarray,
+           latitude: np.ndarray,
+           halo: float,
+           n_tiles: int | tuple[int, int],
+           ) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Splits the events into tiles of about the same number of events.
+
+    Args:
+        longitude:  longitudes of the events
+        latitude:   latitudes of the events
+        halo:       width of the halo in km
+        n_tiles:    number of tiles, or number of tiles in longitude and
+                latitude direction
+
+    Returns:
+        tiles:  for each tile, the events of the tile and its halo,
+                whether they belong to the tile, and whether they belong
+                to the tile and are closer to its border than the halo
+                width
+    """
+    if isinstance(n_tiles, int):
+        n_lat = max(int(np.sqrt(n_tiles)), 1)
+        while n_tiles % n_lat:
+            n_lat -= 1
+        n_lon = n_tiles // n_lat
+    else:
+        n_lon, n_lat = n_tiles
+
+    margin_lat = np.degrees(halo / EARTH_RADIUS_KM) * (1 + 1e-9) + 1e-9
+    margin_lon = _longitude_margin(
+        np.minimum(np.abs(latitude) + margin_lat, 90), halo)
+
+    def edges(values: np.ndarray, n: int) -> np.ndarray:
+        inner = np.quantile(values, np.arange(1, n) / n) if len(values) \
+            else np.array([])
+        return np.concatenate([[-np.inf], inner, [np.inf]])
+
+    tiles = []
+    lon_edges = edges(longitude, n_lon)
+    for lon_min, lon_max in zip(lon_edges[:-1], lon_edges[1:]):
+        in_column = (longitude >= lon_min) & (longitude < lon_max)
+        lat_edges = edges(latitude[in_column], n_lat)
+        for lat_min, lat_max in zip(lat_edges[:-1], lat_edges[1:]):
+            in_core = in_column & (latitude >= lat_min) & (latitude < lat_max)
+            near = ((longitude + margin_lon >= lon_min)
+                    & (longitude - margin_lon < lon_max)
+                    & (latitude + margin_lat >= lat_min)
+                    & (latitude - margin_lat < lat_max))
+            inside = ((longitude - margin_lon >= lon_min)
+                      & (longitude + margin_lon < lon_max)
+                      & (latitude - margin_lat >= lat_min)
+                      & (latitude + margin_lat < lat_max))
+            region = np.flatnonzero(near | in_core)
+            tiles.append((region, in_core[region],
+                          (in_core & ~inside)[region]))
+    return tiles
+
+
+def _decluster_tile(declusterer: GardnerKnopoffType1,
+                    catalog: pd.DataFrame,
+                    in_core: np.ndarray) -> np.ndarray:
+    """
+    Declusters the events of a tile and its halo, and returns for each
+    event of the tile the position of its mainshock in the catalog.
+    """
+    result = declusterer._decluster(catalog.reset_index(drop=True))
+    claimer = result.mainshock_index[result.cluster_ids - 1]
+    return claimer[in_core]
+
+
+def _check_tile(windows: dict,
+                is_mainshock: np.ndarray,
+                claimer: np.ndarray,
+                border: np.ndarray) -> np.ndarray:
+    """
+    Returns the events at the border of a tile whose mainshock (given by
+    claimer) differs from the one given by the mainshocks of all tiles.
+    """
+    search = _WindowSearch(windows)
+    return border[search.claimers(border, is_mainshock) != claimer]
+
+
+class _WindowSearch:
+    """
+    Finds the events that are in the windows of an event, and the events
+    whose windows contain an event, using the windows of the
+    Gardner-Knopoff algorithm.
+
+    Args:
+        windows:    longitude, latitude, time, rank (order in which the
+                events are considered as mainshocks), magnitude,
+                space_windows, and before and after time windows of the
+                events
+    """
+
+    # magnitude range of the events searched together
+    _magnitude_width = 0.5
+
+    def __init__(self, windows: dict):
+        self.windows = windows
+        self.idx_time = np.argsort(windows["time"], kind="stable")
+        # events in the order of the serial run
+        self.order = np.argsort(windows["rank"])
+        self.time_sorted = windows["time"][self.idx_time]
+
+        # events of similar magnitude sorted by time, with their largest
+        # time windows
+        magnitude = windows["magnitude"]
+        group = np.floor((magnitude - np.min(magnitude, initial=0))
+                         / self._magnitude_width).astype(int)
+        self.groups = []
+        for g in np.unique(group):
+            members = self.idx_time[group[self.idx_time] == g]
+            self.groups.append((members, windows["time"][members],
+                                windows["before"][members].max(),
+                                windows["after"][members].max(),
+                                magnitude[members].max()))
+
+    def _contains(self, mainshocks: np.ndarray,
+                  events: np.ndarray) -> np.ndarray:
+        # whether the events are in the windows of the mainshocks
+        w = self.windows
+        time = w["time"][mainshocks]
+        in_time = ((w["time"][events] >= time - w["before"][mainshocks])
+                   & (w["time"][events] <= time + w["after"][mainshocks]))
+        return in_time & within_distance(
+            w["longitude"][events], w["latitude"][events],
+            w["longitude"][mainshocks], w["latitude"][mainshocks],
+            w["space_windows"][mainshocks])
+
+    def claimers(self, events: np.ndarray, is_mainshock: np.ndarray,
+                 chunk_size: int = 4096) -> np.ndarray:
+        """
+        Returns for each event the first mainshock whose windows contain
+        it, or the event itself if there is none.
+        """
+        w = self.windows
+        rank = w["rank"]
+        events = np.asarray(events, dtype=int)
+        claimers = np.empty(len(events), dtype=int)
+        for start in range(0, len(events), chunk_size):
+            chunk = events[start:start + chunk_size]
+            first_rank = rank[chunk].copy()
+            for members, time, before, after, max_magnitude in self.groups:
+                # only events with at least the magnitude of an event
+                # come before it
+                children = np.flatnonzero(
+                    w["magnitude"][chunk] <= max_magnitude)
+                event_time = w["time"][chunk[children]]
+                lo = np.searchsorted(time, event_time - after, side="left")
+                hi = np.searchsorted(time, event_time + before, side="right")
+
+                # all pairs of an event and a member in its time range
+                lengths = hi - lo
+                owner = np.repeat(children, lengths)
+                candidates = members[
+                    np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+                    + np.arange(lengths.sum())]
+                keep = is_mainshock[candidates] & (
+                    rank[candidates] < rank[chunk[owner]])
+                owner, candidates = owner[keep], candidates[keep]
+                keep = self._contains(candidates, chunk[owner])
+                np.minimum.at(first_rank, owner[keep],
+                              rank[candidates[keep]])
+            claimers[start:start + chunk_size] = self.order[np.searchsorted(
+                rank[self.order], first_rank)]
+        return claimers
+
+    def successors(self, i: int) -> np.ndarray:
+        """
+        Returns the events after i in the order of the serial run that
+        are within the windows of event i.
+        """
+        w = self.windows
+        events = self.idx_time[
+            np.searchsorted(self.time_sorted, w["time"][i] - w["before"][i],
+                            side="left"):
+            np.searchsorted(self.time_sorted, w["time"][i] + w["after"][i],
+                            side="right")]
+        events = events[w["rank"][events] > w["rank"][i]]
+        return events[self._contains(np.full(len(events), i), events)]
@@ -1,9 +1,11 @@
 import numpy as np
 
+EARTH_RADIUS_KM = 6371.227
+
 
 def haversine(longitudes: np.ndarray, latitudes: np.ndarray,
               target_longitude: float, target_latitude: float,
-              earth_rad=6371.227) -> np.ndarray:
+              earth_rad=EARTH_RADIUS_KM) -> np.ndarray:
     """
     The haversine formula determines the great-circle distance
     between two points on a sphere given their longitudes and latitudes.
@@ -29,9 +31,6 @@ def haversine(longitudes: np.ndarray, latitudes: np.ndarray,
     target_longitude = cfact * target_longitude
     target_latitude = cfact * target_latitude
 
-    n = np.max(np.shape(longitudes))
-    distance = np.zeros(n)
-
     # Perform distance calculation
     dlat = latitudes - target_latitude
     dlon = longitudes - target_longitude
@@ -43,3 +42,174 @@ def haversine(longitudes: np.ndarray, latitudes: np.ndarray,
         2.0 * earth_rad * np.arctan2(np.sqrt(aval), np.sqrt(1 - aval))
     ).T
     return distance
+
+
+def _haversine_threshold(distance: np.ndarray | float,
+                         earth_rad=EARTH_RADIUS_KM) -> np.ndarray | float:
+    """
+    Largest value of the haversine of the central angle, sin^2(angle / 2),
+    of two points within the given great-circle distance in km.
+    """
+    return np.sin(np.minimum(np.asarray(distance) / (2.0 * earth_rad),
+                             np.pi / 2)) ** 2
+
+
+def within_distance(longitudes: np.ndarray, latitudes: np.ndarray,
+                    target_longitude: float, target_latitude: float,
+                    distance: np.ndarray | float,
+                    earth_rad=EARTH_RADIUS_KM) -> np.ndarray:
+    """
+    Determines whether each location given in longitudes and latitudes is
+    within the great-circle distance of (target_longitude,
+    target_latitude). Equivalent to ``haversine(...) <= distance``, but
+    the haversine of the central angle is compared to the haversine of
+    the largest angle, without computing the distance.
+
+    Args:
+        longitudes: array of longitudes in degrees
+        latitudes: array of latitudes in degrees
+        target_longitude: longitude in degrees
+        target_latitude: latitude in degrees
+        distance: distance in km, or array of distances for each location
+        earth_rad: radius of the Earth in km
+
+    Returns:
+        boolean array
+    """
+    longitudes = np.radians(longitudes)
+    latitudes = np.radians(latitudes)
+    target_longitude = np.radians(target_longitude)
+    target_latitude = np.radians(target_latitude)
+
+    # same operations as in _WithinDistance
+    aval = np.square(np.sin((latitudes - target_latitude) * 0.5))
+    aval += (np.square(np.sin((longitudes - target_longitude) * 0.5))
+             * (np.cos(latitudes) * np.cos(target_latitude)))
+    return aval <= _haversine_threshold(distance, earth_rad)
+
+
+def unit_vectors(longitudes: np.ndarray, latitudes: np.ndarray
+                 ) -> np.ndarray:
+    """
+    Converts longitudes and latitudes to cartesian unit vectors. The
+    euclidean (chord) distance c between two unit vectors corresponds to
+    the great-circle distance 2 * earth_rad * arcsin(c / 2).
+
+    Args:
+        longitudes: array of longitudes in degrees
+        latitudes: array of latitudes in degrees
+
+    Returns:
+        array of shape (n, 3) with the unit vectors
+    """
+    longitudes = np.radians(longitudes)
+    latitudes = np.radians(latitudes)
+    cos_lat = np.cos(latitudes)
+    return np.column_stack([cos_lat * np.cos(longitudes),
+                            cos_lat * np.sin(longitudes),
+                            np.sin(latitudes)])
+
+
+class _UnionFind:
+    """
+    Disjoint sets of the integers 0 to n - 1, merged by size.
+
+    Args:
+        n: number of elements
+    """
+
+    def __init__(self, n: int):
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=int)
+
+    def find(self, x: int) -> int:
+        """
+        Returns the representative of the set containing x.
+        """
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def find_all(self, x: np.ndarray) -> np.ndarray:
+        """
+        Returns the representatives of the sets containing the elements
+        of x.
+        """
+        roots = self.parent[x]
+        while True:
+            next_roots = self.parent[roots]
+            if np.array_equal(next_roots, roots):
+                return roots
+            roots = next_roots
+
+    def union(self, a: int, b: int) -> int:
+        """
+        Merges the sets with the representatives a and b and returns the
+        representative of the merged set.
+        """
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+class _WithinDistance:
+    """
+    Tests whether events of a catalog are within a distance of another
+    event of the catalog, with the same result as within_distance. The
+    coordinates are converted to radians once, and the intermediate
+    arrays are written to buffers that are reused by all calls.
+
+    Args:
+        longitudes: array of longitudes in degrees
+        latitudes: array of latitudes in degrees
+    """
+
+    def __init__(self, longitudes: np.ndarray, latitudes: np.ndarray):
+        # halving is exact, (a - b) * 0.5 == a * 0.5 - b * 0.5
+        self.half_longitude = np.radians(longitudes) * 0.5
+        self.half_latitude = np.radians(latitudes) * 0.5
+        self.cos_latitude = np.cos(np.radians(latitudes))
+        n = len(self.half_longitude)
+        self._aval = np.empty(n)
+        self._dlon = np.empty(n)
+        self._factor = np.empty(n)
+        self._mask = np.empty(n, dtype=bool)
+
+    def __call__(self, index: np.ndarray, target: int,
+                 threshold: float) -> np.ndarray:
+        """
+        Returns whether the events with the given indices are within the
+        distance of the target event. The returned array is overwritten
+        by the next call.
+
+        Args:
+            index:      indices of the events
+            target:     index of the target event
+            threshold:  _haversine_threshold of the distance
+        """
+        n = len(index)
+        aval = self._aval[:n]
+        dlon = self._dlon[:n]
+        factor = self._factor[:n]
+
+        self.half_latitude.take(index, out=aval)
+        np.subtract(aval, self.half_latitude[target], aval)
+        np.sin(aval, aval)
+        np.square(aval, aval)
+
+        self.half_longitude.take(index, out=dlon)
+        np.subtract(dlon, self.half_longitude[target], dlon)
+        np.sin(dlon, dlon)
+        np.square(dlon, dlon)
+
+        self.cos_latitude.take(index, out=factor)
+        np.multiply(factor, self.cos_latitude[target], factor)
+        np.multiply(dlon, factor, dlon)
+        np.add(aval, dlon, aval)
+        return np.less_equal(aval, threshold, self._mask[:n])
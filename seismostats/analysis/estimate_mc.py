@@ -2,16 +2,21 @@
 for the estimation of the completeness magnitude.
 """
 
+import os
+import tempfile
 import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Literal
 
 import numpy as np
 
-from seismostats.analysis.bvalue import estimate_b
 from seismostats.analysis.bvalue.base import BValueEstimator
+from seismostats.analysis.bvalue.by_mc import _SUFFIX_METHODS, estimate_b_by_mc
 from seismostats.analysis.bvalue.classic import ClassicBValueEstimator
 from seismostats.utils._config import get_option
-from seismostats.utils.binning import bin_to_precision, get_fmd
-from seismostats.utils.simulate_distributions import simulate_magnitudes_binned
+from seismostats.utils.binning import (bin_to_precision, get_fmd,
+                                       normal_round_to_int)
 
 
 def cdf_discrete_GR(
@@ -41,6 +46,277 @@ def cdf_discrete_GR(
     return x, y
 
 
+def _ks_distances_from_counts(
+    counts: np.ndarray,
+    mc: float,
+    delta_m: float,
+    beta: float,
+) -> np.ndarray:
+    """
+    Return the KS distance of each row of a matrix of counts per magnitude
+    bin, with the first column corresponding to the bin of ``mc``.
+    """
+    x = bin_to_precision(mc + np.arange(counts.shape[1]) * delta_m, delta_m)
+    _, y_th = cdf_discrete_GR(x, mc=mc, delta_m=delta_m, beta=beta)
+
+    y_emp = np.cumsum(counts, axis=1)
+    y_emp = y_emp / y_emp[:, -1:]
+    return np.max(np.abs(y_emp - y_th), axis=1)
+
+
+def _simulate_ks_distances(
+    n_sample: int,
+    mc: float,
+    delta_m: float,
+    beta: float,
+    n: int = 10000,
+    max_memory: int = 2**28,
+    simulation: Literal['magnitudes', 'multinomial'] = 'magnitudes',
+) -> np.ndarray:
+    """
+    Simulate the KS distances of ``n`` synthetic samples of size ``n_sample``
+    drawn from the binned GR distribution.
+
+    With ``simulation='magnitudes'``, the synthetic magnitudes are directly
+    converted to integer bin indices and counted per sample in a
+    two-dimensional count matrix, so that all KS distances of a chunk are
+    computed in one reduction. The samples are drawn from the same random
+    stream and in the same order as a single call of
+    ``simulate_magnitudes_binned(n * n_sample, ...)``, so the result is
+    identical for a fixed seed.
+
+    With ``simulation='multinomial'``, the counts per bin of each sample are
+    drawn directly from a multinomial distribution over the discrete GR bin
+    probabilities. The bins are truncated where the expected number of
+    events above is small. The few events that still fall into the
+    truncated tail are drawn individually from the (geometric) tail
+    distribution, so the KS distances have exactly the same distribution as
+    with ``simulation='magnitudes'``.
+
+    Args:
+        n_sample:   Number of magnitudes in each synthetic sample
+        mc:         Completeness magnitude
+        delta_m:    Magnitude bin size
+        beta:       Beta parameter for the Gutenberg-Richter distribution
+        n:          Number of synthetic samples
+        max_memory: Approximate upper limit in bytes for the memory used
+                per chunk of synthetic samples. By default 256 MB.
+        simulation: Either 'magnitudes' or 'multinomial'.
+
+    Returns:
+        ks_ds:      array of KS distances of the synthetic samples
+    """
+    if simulation == 'magnitudes':
+        # bytes per simulated magnitude: the draw and its bin index,
+        # including temporaries of the rounding
+        bytes_per_row = 32 * n_sample
+    elif simulation == 'multinomial':
+        # probability of a magnitude to be in a bin larger than bin k is
+        # q**(k + 1), truncate where 0.01 events per sample are expected
+        q = np.exp(-beta * delta_m)
+        n_bins = int(max(2, np.ceil(np.log(0.01 / n_sample) / np.log(q))))
+        x = bin_to_precision(mc + np.arange(n_bins - 1) * delta_m, delta_m)
+        _, y_th = cdf_discrete_GR(x, mc=mc, delta_m=delta_m, beta=beta)
+        # the last bin collects all magnitudes above the truncation
+        p_bins = np.append(np.diff(y_th, prepend=0), 1 - y_th[-1])
+        # count matrix and temporaries of the cumulative sum
+        bytes_per_row = 32 * n_bins
+    else:
+        raise ValueError(
+            'simulation must be either "magnitudes" or "multinomial"')
+
+    chunk = int(max(1, min(n, max_memory // bytes_per_row)))
+    mc_idx = normal_round_to_int(mc / delta_m)
+
+    ks_ds = np.empty(n)
+    for start in range(0, n, chunk):
+        n_rows = min(chunk, n - start)
+        ks_chunk = ks_ds[start:start + n_rows]
+
+        if simulation == 'multinomial':
+            counts = np.random.multinomial(n_sample, p_bins, size=n_rows)
+            ks_chunk[:] = _ks_distances_from_counts(
+                counts, mc, delta_m, beta)
+
+            # samples with magnitudes in the truncated tail: draw their bins
+            # from the geometric tail distribution and recompute
+            rows = np.flatnonzero(counts[:, -1])
+            if len(rows) > 0:
+                n_tail = counts[rows, -1]
+                tail_idx = n_bins - 2 + np.random.geometric(
+                    1 - q, np.sum(n_tail))
+                counts_tail = np.zeros((len(rows), tail_idx.max() + 1),
+                                       dtype=counts.dtype)
+                counts_tail[:, :n_bins - 1] = counts[rows, :-1]
+                np.add.at(counts_tail, (np.repeat(
+                    np.arange(len(rows)), n_tail), tail_idx), 1)
+                ks_chunk[rows] = _ks_distances_from_counts(
+                    counts_tail, mc, delta_m, beta)
+        else:
+            simulated = np.random.exponential(1 / beta, n_rows * n_sample)
+            simulated += mc - delta_m / 2
+            simulated /= delta_m
+            bin_idx = (normal_round_to_int(simulated)
+                       - mc_idx).astype(np.int64)
+            del simulated
+
+            # bins beyond the largest simulated magnitude do not change the
+            # KS distance, since the empirical CDF is one there and the
+            # difference to the theoretical CDF only decreases
+            n_bins_chunk = int(bin_idx.max()) + 1
+            bin_idx += np.repeat(np.arange(n_rows) * n_bins_chunk, n_sample)
+            counts = np.bincount(
+                bin_idx, minlength=n_rows * n_bins_chunk).reshape(
+                    n_rows, n_bins_chunk)
+            del bin_idx
+
+            ks_chunk[:] = _ks_distances_from_counts(
+                counts, mc, delta_m, beta)
+
+    return ks_ds
+
+
+class KSDistanceCache:
+    """
+    Persistent on-disk cache of simulated KS distances of the binned
+    Gutenberg-Richter distribution.
+
+    Under the null hypothesis, the distribution of the KS distance of a
+    binned GR sample depends only on the sample size and on
+    ``beta * delta_m`` (the ratio of the probabilities of consecutive bins),
+    not on mc or on the number of bins considered. Simulated KS distances
+    are therefore stored in a directory, keyed by the sample size and
+    ``beta * delta_m`` rounded to a number of significant digits, and reused
+    across calls and processes. The least recently used entries are removed
+    once ``max_entries`` is exceeded.
+
+    Note that due to the rounding of the key, the KS distances are simulated
+    with the rounded sample size and ``beta * delta_m``, which can differ
+    slightly from the values of the tested sample.
+
+    Args:
+        path:           Directory of the cache. By default
+                    ``~/.cache/seismostats/ks_distances``.
+        max_entries:    Maximum number of cached simulations.
+        n_digits:       Significant digits to which the sample size is
+                    rounded.
+        beta_digits:    Significant digits to which ``beta * delta_m`` is
+                    rounded.
+
+    Examples:
+        >>> from seismostats.analysis.estimate_mc import KSDistanceCache
+        >>> cache = KSDistanceCache('/tmp/ks_cache')
+        >>> best_mc, *_ = mc_ks(magnitudes, delta_m=0.1, ks_cache=cache)
+    """
+
+    def __init__(self,
+                 path: str | None = None,
+                 max_entries: int = 1000,
+                 n_digits: int = 3,
+                 beta_digits: int = 3):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache',
+                                'seismostats', 'ks_distances')
+        self.path = path
+        self.max_entries = max_entries
+        self.n_digits = n_digits
+        self.beta_digits = beta_digits
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, n_sample: int, beta: float, delta_m: float
+            ) -> tuple[int, float]:
+        """
+        Return the rounded sample size and ``beta * delta_m`` under which the
+        KS distances are cached.
+        """
+        n_key = int(float(f'{n_sample:.{self.n_digits}g}'))
+        beta_key = float(f'{beta * delta_m:.{self.beta_digits}g}')
+        return n_key, beta_key
+
+    def get(self,
+            n_sample: int,
+            beta: float,
+            delta_m: float,
+            n: int = 10000,
+            max_memory: int = 2**28,
+            simulation: Literal['magnitudes', 'multinomial'] = 'magnitudes',
+            ) -> np.ndarray:
+        """
+        Return ``n`` KS distances of synthetic samples of size ``n_sample``,
+        from the cache if available, otherwise they are simulated and added
+        to the cache.
+
+        Args:
+            n_sample:   Number of magnitudes in the sample
+            beta:       Beta parameter for the Gutenberg-Richter distribution
+            delta_m:    Magnitude bin size
+            n:          Number of KS distances
+            max_memory: Memory limit for the simulation, see
+                    :func:`ks_test_gr`.
+            simulation: Simulation method, see :func:`ks_test_gr`.
+
+        Returns:
+            ks_ds:      array of KS distances
+        """
+        n_key, beta_key = self.key(n_sample, beta, delta_m)
+        file = os.path.join(self.path, f'ks_ds_{n_key}_{beta_key!r}.npy')
+
+        try:
+            ks_ds = np.load(file)
+        except (OSError, ValueError):
+            ks_ds = np.array([])
+        if len(ks_ds) >= n:
+            try:
+                os.utime(file)
+            except FileNotFoundError:
+                # evicted by another process in the meantime
+                pass
+            return ks_ds[:n]
+
+        # with delta_m = 1, beta takes the role of beta * delta_m
+        ks_ds = _simulate_ks_distances(
+            n_key, mc=0, delta_m=1, beta=beta_key, n=n,
+            max_memory=max_memory, simulation=simulation)
+
+        # write to a temporary file first, so that other processes never
+        # read an incomplete file
+        f = tempfile.NamedTemporaryFile(
+            dir=self.path, suffix='.tmp', delete=False)
+        try:
+            with f:
+                np.save(f, ks_ds)
+            os.replace(f.name, file)
+        except BaseException:
+            # do not leave the temporary file behind
+            os.remove(f.name)
+            raise
+        self._evict()
+        return ks_ds
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        for file in self._files():
+            os.remove(file)
+
+    def _files(self) -> list[str]:
+        return [os.path.join(self.path, f) for f in os.listdir(self.path)
+                if f.startswith('ks_ds_') and f.endswith('.npy')]
+
+    def _evict(self):
+        files = self._files()
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for file in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                # removed by another process in the meantime
+                pass
+
+
 def ks_test_gr(
     sample: np.ndarray,
     mc: float,
@@ -48,6 +324,9 @@ def ks_test_gr(
     beta: float,
     n: int = 10000,
     ks_ds: list | None = None,
+    max_memory: int = 2**28,
+    simulation: Literal['magnitudes', 'multinomial'] = 'magnitudes',
+    ks_cache: KSDistanceCache | None = None,
 ) -> tuple[float, float, list[float]]:
     """
     For a given magnitude sample and mc and beta,
@@ -66,6 +345,17 @@ def ks_test_gr(
         ks_ds:      List of KS distances from synthetic data with the given
                 paramters. If None, they will be estimated here (then, n is
                 not needed). By default None.
+        max_memory: Approximate upper limit in bytes for the memory used to
+                simulate the synthetic samples. They are simulated in
+                chunks that fit into this limit. By default 256 MB.
+        simulation: How the synthetic samples are simulated. With
+                'magnitudes' (default), individual magnitudes are drawn
+                and binned. With 'multinomial', the counts per magnitude bin
+                are drawn directly, which is much faster for large samples.
+                Both result in the same distribution of KS distances.
+        ks_cache:   Cache of simulated KS distances. If given and ks_ds is
+                None, the KS distances are taken from the cache, or
+                simulated and added to it. By default None.
 
     Returns:
         p_val:      p-value
@@ -84,40 +374,23 @@ def ks_test_gr(
             warnings.warn("Sample contains only one value.")
             return 0, 1, []
 
-    if ks_ds is None:
-        ks_ds = []
-
-        n_sample = len(sample)
-        simulated_all = simulate_magnitudes_binned(
-            n * n_sample, beta, mc, delta_m, b_parameter="beta"
-        )
-        max_considered_mag = np.max([np.max(sample), np.max(simulated_all)])
-
-        x_bins = bin_to_precision(
-            np.arange(mc, max_considered_mag + 3
-                      / 2 * delta_m, delta_m), delta_m
-        )
-        x = x_bins[:-1].copy()
-        x_bins -= delta_m / 2
-        _, y_th = cdf_discrete_GR(x, mc=mc, delta_m=delta_m, beta=beta)
-
-        for ii in range(n):
-            simulated = simulated_all[n_sample * ii: n_sample * (ii + 1)]
-            y_hist, _ = np.histogram(simulated, bins=x_bins)
-            y_emp = np.cumsum(y_hist) / np.sum(y_hist)
-
-            ks_d = np.max(np.abs(y_emp - y_th))
-            ks_ds.append(ks_d)
-
-    else:
-        max_considered_mag = np.max(sample)
-        x_bins = bin_to_precision(
-            np.arange(mc, max_considered_mag + 3
-                      / 2 * delta_m, delta_m), delta_m
-        )
-        x = x_bins[:-1].copy()
-        x_bins -= delta_m / 2
-        _, y_th = cdf_discrete_GR(x, mc=mc, delta_m=delta_m, beta=beta)
+    if ks_ds is None and ks_cache is not None:
+        ks_ds = ks_cache.get(len(sample), beta, delta_m, n=n,
+                             max_memory=max_memory,
+                             simulation=simulation).tolist()
+    elif ks_ds is None:
+        ks_ds = _simulate_ks_distances(
+            len(sample), mc=mc, delta_m=delta_m, beta=beta, n=n,
+            max_memory=max_memory, simulation=simulation).tolist()
+
+    max_considered_mag = np.max(sample)
+    x_bins = bin_to_precision(
+        np.arange(mc, max_considered_mag + 3
+                  / 2 * delta_m, delta_m), delta_m
+    )
+    x = x_bins[:-1].copy()
+    x_bins -= delta_m / 2
+    _, y_th = cdf_discrete_GR(x, mc=mc, delta_m=delta_m, beta=beta)
 
     y_hist, _ = np.histogram(sample, bins=x_bins)
     y_emp = np.cumsum(y_hist) / np.sum(y_hist)
@@ -128,6 +401,44 @@ def ks_test_gr(
     return p_val, ks_d_obs, ks_ds
 
 
+def _ks_test_mc(
+    mc_sample: np.ndarray,
+    mc: float,
+    delta_m: float,
+    beta: float | None,
+    b_method: BValueEstimator,
+    n: int,
+    ks_ds: list | None,
+    simulation: Literal['magnitudes', 'multinomial'],
+    ks_cache: KSDistanceCache | None,
+    kwargs: dict,
+    seed: int | None = None,
+) -> tuple[float, float, float]:
+    """
+    Perform the KS test of ``mc_ks`` for a single completeness magnitude.
+    Defined on module level, so that it can be run in a process pool.
+
+    Returns:
+        p:      p-value
+        ks_d:   KS distance of the sample
+        beta:   beta used for the test
+    """
+    # if no beta is given, estimate beta
+    if beta is None:
+        estimator = b_method()
+        estimator.calculate(mc_sample, mc=mc, delta_m=delta_m, **kwargs)
+        beta = estimator.beta
+
+    if seed is not None:
+        np.random.seed(seed)
+
+    p, ks_d, _ = ks_test_gr(
+        mc_sample, mc=mc, delta_m=delta_m, beta=beta, n=n, ks_ds=ks_ds,
+        simulation=simulation, ks_cache=ks_cache,
+    )
+    return p, ks_d, beta
+
+
 def mc_ks(
     sample: np.ndarray,
     delta_m: float,
@@ -139,6 +450,9 @@ def mc_ks(
     b_method: BValueEstimator = ClassicBValueEstimator,
     n: int = 10000,
     ks_ds_list: list[list] | None = None,
+    simulation: Literal['magnitudes', 'multinomial'] = 'magnitudes',
+    ks_cache: KSDistanceCache | None = None,
+    n_jobs: int | None = None,
     **kwargs,
 ) -> tuple[np.ndarray, list[float], np.ndarray, float | None, float | None]:
     """
@@ -171,6 +485,25 @@ def mc_ks(
         ks_ds_list:         List of list of KS distances from synthetic data
                             (needed for testing). If None, they will be
                             estimated in this funciton. By default None
+        simulation:         How the synthetic samples are simulated, either
+                            'magnitudes' or 'multinomial' (faster for large
+                            samples). See :func:`ks_test_gr`. By default
+                            'magnitudes'
+        ks_cache:           Cache of simulated KS distances. If given, the KS
+                            distances are taken from the cache, or simulated
+                            and added to it, see :class:`KSDistanceCache`.
+                            Ignored if ks_ds_list is given. By default None
+        n_jobs:             Number of processes used to test the candidate
+                            mcs in parallel, -1 uses all CPUs. Each candidate
+                            is simulated with its own seed derived from the
+                            global random state, so the results are
+                            reproducible with ``np.random.seed`` and the same
+                            for any n_jobs >= 1 (but not the same as with
+                            None). At most twice as many candidates as
+                            processes are tested ahead; if stop_when_passed
+                            is True, those still pending once one passes are
+                            cancelled. If None, the mcs are tested one after
+                            the other in this process. By default None
         **kwargs:           Additional keyword arguments for the b-value
                             estimator.
 
@@ -221,45 +554,61 @@ def mc_ks(
     ps = []
     betas = []
 
-    for ii, mc in enumerate(mcs_test):
-
-        if verbose:
-            print("\ntesting mc", mc)
-
-        mc_sample = sample[sample >= mc - delta_m / 2]
-
-        # if no beta is given, estimate beta
-        if beta is None:
-            estimator = b_method()
-            estimator.calculate(mc_sample, mc=mc, delta_m=delta_m, **kwargs)
-            mc_beta = estimator.beta
-        else:
-            mc_beta = beta
-
-        if ks_ds_list is None:
-            p, ks_d, _ = ks_test_gr(
-                mc_sample, mc=mc, delta_m=delta_m, beta=mc_beta, n=n
-            )
-        else:
-            p, ks_d, _ = ks_test_gr(
-                mc_sample,
-                mc=mc,
-                delta_m=delta_m,
-                beta=mc_beta,
-                n=n,
-                ks_ds=ks_ds_list[ii],
-            )
+    if beta is None and b_method in _SUFFIX_METHODS:
+        # estimate beta for all candidates in one pass
+        mc_betas = estimate_b_by_mc(sample, mcs_test, delta_m,
+                                    b_parameter='beta', method=b_method,
+                                    **kwargs)[0]
+    else:
+        mc_betas = [beta] * len(mcs_test)
 
-        mcs_tested.append(mc)
-        ks_ds.append(ks_d)
-        ps.append(p)
-        betas.append(mc_beta)
+    def candidate_args(ii, mc):
+        return (sample[sample >= mc - delta_m / 2], mc, delta_m, mc_betas[ii],
+                b_method, n, None if ks_ds_list is None else ks_ds_list[ii],
+                simulation, ks_cache, kwargs)
 
-        if verbose:
-            print("..p-value: ", p)
+    executor = None
+    if n_jobs is None:
+        results = (_ks_test_mc(*candidate_args(ii, mc))
+                   for ii, mc in enumerate(mcs_test))
+    else:
+        # candidates are evaluated in parallel, each with its own seed
+        # derived from the global random state
+        seeds = np.random.SeedSequence(
+            np.random.randint(2**31)).generate_state(len(mcs_test))
+        max_workers = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+
+        def parallel_results():
+            # keep a bounded window of candidates submitted ahead
+            futures = deque()
+            for ii, mc in enumerate(mcs_test):
+                futures.append(executor.submit(
+                    _ks_test_mc, *candidate_args(ii, mc), seed=seeds[ii]))
+                if len(futures) >= 2 * max_workers:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        results = parallel_results()
+
+    try:
+        for mc, (p, ks_d, mc_beta) in zip(mcs_test, results):
+
+            if verbose:
+                print("\ntesting mc", mc)
+                print("..p-value: ", p)
+
+            mcs_tested.append(mc)
+            ks_ds.append(ks_d)
+            ps.append(p)
+            betas.append(mc_beta)
 
-        if p >= p_pass and stop_when_passed:
-            break
+            if p >= p_pass and stop_when_passed:
+                break
+    finally:
+        if executor is not None:
+            # candidates above the first passing mc are not needed anymore
+            executor.shutdown(cancel_futures=True)
 
     ps = np.array(ps)
 
@@ -326,6 +675,8 @@ def mc_by_bvalue_stability(
         stability_range: float = 0.5,
         mcs_test: np.ndarray | None = None,
         stop_when_passed: bool = True,
+        b_method: BValueEstimator = ClassicBValueEstimator,
+        **kwargs,
 ):
     """
     Estimates Mc using a test of stability.
@@ -352,6 +703,12 @@ def mc_by_bvalue_stability(
         stop_when_passed:   Whether to stop the stability test
             when a passing completeness magnitude (Mc) is found. Default is
             True.
+        b_method:           b-value estimator to use. For the classic and the
+            Utsu estimator, all b-values are computed in one pass, see
+            :func:`seismostats.analysis.bvalue.estimate_b_by_mc`. Default is
+            the classic estimator.
+        **kwargs:           Additional keyword arguments for the b-value
+            estimator.
 
     Returns:
         - best_mc:  Single best magnitude of completeness estimate.
@@ -382,28 +739,41 @@ def mc_by_bvalue_stability(
                 "The range of magnitudes is smaller than the stability range."
             )
 
+    mcs_plus = []
+    for mc in mcs_test:
+        mc_plus = np.arange(mc, mc + stability_range, delta_m)
+        mcs_plus.append(mc_plus[mc_plus <= np.max(sample)])
+
+    if b_method in _SUFFIX_METHODS and not kwargs:
+        # all b-values are derived from a single FMD of the sample
+        b_all, std_all, n_all = estimate_b_by_mc(
+            sample, np.concatenate([mcs_test, *mcs_plus]), delta_m,
+            method=b_method)
+        n_mcs = len(mcs_test)
+        splits = np.cumsum([len(mc_plus) for mc_plus in mcs_plus])[:-1]
+        b_plus = np.split(b_all[n_mcs:], splits)
+
+        def b_values(ii):
+            return b_all[ii], std_all[ii], n_all[ii], b_plus[ii]
+    else:
+        def b_values(ii):
+            b_loop, std_loop, n_loop = estimate_b_by_mc(
+                sample, np.concatenate([[mcs_test[ii]], mcs_plus[ii]]),
+                delta_m, method=b_method, **kwargs)
+            return b_loop[0], std_loop[0], n_loop[0], b_loop[1:]
+
     bs = []
     diff_bs = []
+    value = False
     for ii, mc in enumerate(mcs_test):
-        # TODO: here, one should be able to choose the method
-        b, std = estimate_b(
-            sample[sample >= mc - delta_m / 2], mc, delta_m,
-            return_std=True)
-        if len(sample[sample >= mc - delta_m / 2]) < 30:
+        b, std, n_mc, b_ex = b_values(ii)
+        if n_mc < 30:
             warnings.warn(
                 "Number of events above tested Mc is less than 30. "
                 "This might affect the stability test."
             )
         bs.append(b)
 
-        mc_plus = np.arange(mc, mc + stability_range, delta_m)
-        mc_plus = mc_plus[mc_plus <= np.max(sample)]
-        b_ex = []
-        for mc_p in mc_plus:
-            # TODO: here, one should be able to choose the method
-            b_p = estimate_b(sample[sample >= mc_p - delta_m / 2],
-                             mc_p, delta_m)
-            b_ex.append(b_p)
         b_avg = np.sum(b_ex) / steps
         diff_b = np.abs(b_avg - b) / std
         diff_bs.append(diff_b)
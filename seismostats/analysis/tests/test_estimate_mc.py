@@ -1,13 +1,21 @@
+import os
 import warnings
 
 import numpy as np
 import pandas as pd
 import pytest
 from numpy.testing import assert_allclose, assert_almost_equal, assert_equal
+from scipy import stats
 
+from seismostats.analysis.bvalue import UtsuBValueEstimator
 from seismostats.analysis.bvalue.positive import BPositiveBValueEstimator
-from seismostats.analysis.estimate_mc import (mc_by_bvalue_stability, mc_ks,
+from seismostats.analysis.estimate_mc import (KSDistanceCache,
+                                              _simulate_ks_distances,
+                                              cdf_discrete_GR, ks_test_gr,
+                                              mc_by_bvalue_stability, mc_ks,
                                               mc_max_curvature)
+from seismostats.utils.binning import bin_to_precision
+from seismostats.utils.simulate_distributions import simulate_magnitudes_binned
 
 
 @pytest.fixture
@@ -175,6 +183,16 @@ def test_estimate_mc_ks(
     )
     assert_allclose([4.362e-01], ps, atol=0.03)
 
+    # test with multinomial simulation of the synthetic samples
+    best_mc, best_beta, mcs_tested, betas, ks_ds, ps = mc_ks(
+        magnitudes,
+        delta_m=0.1,
+        mcs_test=[1.1],
+        p_pass=0.1,
+        simulation='multinomial',
+    )
+    assert_allclose([4.362e-01], ps, atol=0.03)
+
     # test when mcs are not given
     best_mc, best_beta, mcs_tested, betas, ks_ds, ps = mc_ks(
         magnitudes,
@@ -201,6 +219,145 @@ def test_estimate_mc_ks(
     assert_equal(len(ps), 1)
 
 
+@pytest.mark.parametrize(
+    "mc, delta_m, beta, max_memory",
+    [(1.0, 0.1, 2.3, 2**28), (0.5, 0.01, 1.5, 10**5), (-0.2, 0.2, 2.0, 1)]
+)
+def test_ks_test_gr_simulation(mc, delta_m, beta, max_memory):
+    n, n_sample = 200, 150
+    np.random.seed(0)
+    sample = simulate_magnitudes_binned(
+        n_sample, beta, mc, delta_m, b_parameter="beta")
+
+    np.random.seed(1)
+    p_val, ks_d_obs, ks_ds = ks_test_gr(
+        sample, mc, delta_m, beta, n=n, max_memory=max_memory)
+
+    # reference: histogram of each simulated sample
+    np.random.seed(1)
+    simulated_all = simulate_magnitudes_binned(
+        n * n_sample, beta, mc, delta_m, b_parameter="beta")
+    max_mag = np.max([np.max(sample), np.max(simulated_all)])
+    x_bins = bin_to_precision(
+        np.arange(mc, max_mag + 3 / 2 * delta_m, delta_m), delta_m)
+    _, y_th = cdf_discrete_GR(x_bins[:-1], mc=mc, delta_m=delta_m, beta=beta)
+    x_bins -= delta_m / 2
+    ks_ds_loop = []
+    for ii in range(n):
+        simulated = simulated_all[n_sample * ii: n_sample * (ii + 1)]
+        y_hist, _ = np.histogram(simulated, bins=x_bins)
+        y_emp = np.cumsum(y_hist) / np.sum(y_hist)
+        ks_ds_loop.append(np.max(np.abs(y_emp - y_th)))
+
+    assert_equal(ks_ds, ks_ds_loop)
+    assert_equal(p_val, np.mean(np.array(ks_ds_loop) >= ks_d_obs))
+
+
+@pytest.mark.parametrize(
+    "n_sample, delta_m, beta",
+    [(30, 0.1, 2.3), (500, 0.01, 1.5), (200, 0.2, 3.0)]
+)
+def test_simulate_ks_distances_multinomial(n_sample, delta_m, beta):
+    np.random.seed(0)
+    ks_ds = _simulate_ks_distances(n_sample, 1.0, delta_m, beta, n=5000)
+    ks_ds_multinomial = _simulate_ks_distances(
+        n_sample, 1.0, delta_m, beta, n=5000, simulation='multinomial')
+
+    assert stats.ks_2samp(ks_ds, ks_ds_multinomial).pvalue > 0.01
+
+    with pytest.raises(ValueError):
+        _simulate_ks_distances(n_sample, 1.0, delta_m, beta, n=10,
+                               simulation='unknown')
+
+
+def test_ks_distance_cache(magnitudes, tmp_path):
+    cache = KSDistanceCache(str(tmp_path), max_entries=2)
+    assert cache.key(12345, 2.3456, 0.1) == (12300, 0.235)
+
+    ks_ds = cache.get(100, 2.3, 0.1, n=500)
+    assert len(ks_ds) == 500
+    assert len(os.listdir(tmp_path)) == 1
+
+    # same key, taken from disk, also by a new cache object
+    assert_equal(cache.get(100, 2.3001, 0.1, n=500), ks_ds)
+    assert_equal(KSDistanceCache(str(tmp_path)).get(100, 2.3, 0.1, n=200),
+                 ks_ds[:200])
+
+    # more distances than cached are simulated again
+    assert len(cache.get(100, 2.3, 0.1, n=1000)) == 1000
+
+    # least recently used entries are evicted
+    cache.get(200, 2.3, 0.1, n=10)
+    os.utime(os.path.join(tmp_path, 'ks_ds_200_0.23.npy'), (0, 0))
+    cache.get(300, 2.3, 0.1, n=10)
+    assert sorted(os.listdir(tmp_path)) == ['ks_ds_100_0.23.npy',
+                                            'ks_ds_300_0.23.npy']
+
+    cache.clear()
+    assert len(os.listdir(tmp_path)) == 0
+
+    # ks_test_gr returns a list, whether simulated or taken from the cache
+    sample = np.array([1.0, 1.1, 1.0, 1.3, 1.2])
+    _, _, ks_ds_simulated = ks_test_gr(sample, 1.0, 0.1, 2.3, n=10)
+    _, _, ks_ds_cached = ks_test_gr(sample, 1.0, 0.1, 2.3, n=10,
+                                    ks_cache=cache)
+    assert isinstance(ks_ds_simulated, list)
+    assert isinstance(ks_ds_cached, list)
+    cache.clear()
+
+    # mc_ks with cache
+    _, _, _, _, _, ps = mc_ks(
+        magnitudes, delta_m=0.1, mcs_test=[1.1], p_pass=0.1, n=2000,
+        ks_cache=cache)
+    assert_allclose([4.362e-01], ps, atol=0.05)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_ks_distance_cache_failures(tmp_path, monkeypatch):
+    cache = KSDistanceCache(str(tmp_path))
+
+    # a failed write does not leave a temporary file behind
+    def fail_replace(src, dst):
+        raise OSError('disk full')
+    with monkeypatch.context() as m:
+        m.setattr(os, 'replace', fail_replace)
+        with pytest.raises(OSError):
+            cache.get(100, 2.3, 0.1, n=10)
+    assert os.listdir(tmp_path) == []
+
+    # an entry evicted by another process after reading is still returned
+    ks_ds = cache.get(100, 2.3, 0.1, n=10)
+
+    def evicted(file):
+        raise FileNotFoundError(file)
+    with monkeypatch.context() as m:
+        m.setattr(os, 'utime', evicted)
+        assert_equal(cache.get(100, 2.3, 0.1, n=10), ks_ds)
+
+
+def test_estimate_mc_ks_parallel(magnitudes):
+    mcs = [0.9, 1.0, 1.1, 1.2]
+
+    np.random.seed(0)
+    result = mc_ks(magnitudes, delta_m=0.1, mcs_test=mcs,
+                   stop_when_passed=False, n=1000, n_jobs=1)
+    np.random.seed(0)
+    result_parallel = mc_ks(magnitudes, delta_m=0.1, mcs_test=mcs,
+                            stop_when_passed=False, n=1000, n_jobs=2)
+
+    for res, res_parallel in zip(result, result_parallel):
+        assert_equal(res, res_parallel)
+    assert_equal(result[2], mcs)
+
+    # only candidates up to the first passing mc are returned
+    np.random.seed(0)
+    best_mc, _, mcs_tested, _, _, ps = mc_ks(
+        magnitudes, delta_m=0.1, mcs_test=mcs, n=1000, n_jobs=2)
+    assert_equal(best_mc, result[0])
+    assert_equal(mcs_tested, mcs[:mcs.index(best_mc) + 1])
+    assert_equal(ps, result[5][:len(ps)])
+
+
 def test_estimate_mc_maxc(magnitudes):
     mc = mc_max_curvature(magnitudes, delta_m=0.1, correction_factor=0.2)
 
@@ -234,3 +391,24 @@ def test_estimate_mc_bvalue_stability_larger_bins(magnitudes):
         magnitudes, delta_m=0.1, stability_range=0.5)
 
     assert_almost_equal(1.1, mc)
+
+
+def test_estimate_mc_bvalue_stability_method(setup_catalog):
+    mags = setup_catalog[0]['magnitude'].values
+    mcs_test = np.arange(0.8, 1.8, 0.01)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        result_utsu = mc_by_bvalue_stability(
+            mags, delta_m=0.01, mcs_test=mcs_test,
+            b_method=UtsuBValueEstimator)
+        # weights are not supported by the fast path, fall back to the
+        # estimator
+        result_weights = mc_by_bvalue_stability(
+            mags, delta_m=0.01, mcs_test=mcs_test,
+            weights=np.ones(len(mags)))
+        result = mc_by_bvalue_stability(
+            mags, delta_m=0.01, mcs_test=mcs_test)
+
+    assert_almost_equal(result_utsu[0], 1.44)
+    assert_almost_equal(result_weights[0], result[0])
+    assert_allclose(result_weights[4], result[4], rtol=1e-8)
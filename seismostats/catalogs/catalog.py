@@ -1,23 +1,28 @@
 from __future__ import annotations
 
+import io
 import logging
 import os
+import re
 import uuid
 from collections import defaultdict
 from datetime import datetime
-from typing import Any
+from typing import IO, Any, Iterator
 
 import numpy as np
 import pandas as pd
+from requests import Response
 from shapely import Polygon
 
 from seismostats.analysis.bvalue import estimate_b
 from seismostats.analysis.bvalue.base import BValueEstimator
 from seismostats.analysis.bvalue.classic import ClassicBValueEstimator
-from seismostats.analysis.estimate_mc import mc_ks
-from seismostats.io.parser import parse_quakeml, parse_quakeml_file
-from seismostats.utils import (_check_required_cols, _render_template,
-                               require_cols)
+from seismostats.analysis.estimate_mc import KSDistanceCache, mc_ks
+from seismostats.io.parser import (EventFilter, _open_compressed, iter_quakeml,
+                                   parse_quakeml, parse_quakeml_file,
+                                   parse_quakeml_files)
+from seismostats.utils import (_check_required_cols, _get_template,
+                               _render_template, require_cols)
 from seismostats.utils.binning import bin_to_precision
 
 try:
@@ -36,6 +41,102 @@ QML_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
 _PD_TIME_COLS = ['year', 'month', 'day',
                  'hour', 'minute', 'second', 'microsecond']
 
+# compressions of QuakeML files by file extension
+_COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz',
+                           '.zst': 'zstd'}
+
+# types of the columns converted by Catalog.from_dict: 'numeric' columns
+# are converted with pd.to_numeric, 'datetime' columns to naive UTC times
+# and in 'string' columns the NULL_TOKENS are replaced by None
+CATALOG_SCHEMA = {
+    'time': 'datetime',
+    'magnitude': 'numeric',
+    'latitude': 'numeric',
+    'longitude': 'numeric',
+    'depth': 'numeric',
+    'associatedphasecount': 'numeric',
+    'usedphasecount': 'numeric',
+    'associatedstationcount': 'numeric',
+    'usedstationcount': 'numeric',
+    'standarderror': 'numeric',
+    'azimuthalgap': 'numeric',
+    'secondaryazimuthalgap': 'numeric',
+    'maximumdistance': 'numeric',
+    'minimumdistance': 'numeric',
+    'mediandistance': 'numeric',
+    'magnitude_type': 'string',
+    'event_type': 'string',
+}
+
+NULL_TOKENS = ['', 'nan', 'NaN', 'none', 'None', 'na', 'Na', 'NA',
+               'null', 'Null', 'NULL']
+
+_UNCERTAINTY_REGEX = "(_uncertainty|_lowerUncertainty|" \
+    "_upperUncertainty|_confidenceLevel)$"
+_ID_REGEX = "(eventID|originID|magnitudeID)$"
+
+
+def _convert_column(values: np.ndarray, column_type: str) -> np.ndarray:
+    """
+    Converts the values of a column to the given type of CATALOG_SCHEMA,
+    values that already have the type are returned without copying them.
+    """
+    if column_type == 'numeric':
+        if values.dtype.kind in 'biuf':
+            return values
+        return pd.to_numeric(values, errors='coerce')
+
+    if column_type == 'datetime':
+        if values.dtype.kind == 'M':
+            return values
+        try:
+            times = pd.to_datetime(values, format='ISO8601')
+        except (ValueError, TypeError):
+            times = pd.to_datetime(values)
+        if times.tz is not None:
+            times = times.tz_localize(None)
+        return times.to_numpy()
+
+    if values.dtype.kind not in 'OSU':
+        return values
+    values = values.astype(object, copy=False)
+    null = pd.Series(values, copy=False).isin(NULL_TOKENS).to_numpy()
+    if null.any():
+        values = np.where(null, None, values)
+    return values
+
+
+def _parsed_columns(columns: list[str] | None) -> list[str] | None:
+    # the required columns are always parsed
+    if columns is None:
+        return None
+    return REQUIRED_COLS_CATALOG + [c for c in columns
+                                    if c not in REQUIRED_COLS_CATALOG]
+
+
+def _quakeml_events(df: pd.DataFrame,
+                    secondary_mags: list[str]) -> list[dict]:
+    """
+    Event dictionaries of the QuakeML template, with the secondary
+    magnitudes grouped by magnitude type.
+    """
+    events = df.to_dict(orient='records')
+
+    for event in events:
+        event['sec_mags'] = defaultdict(dict)
+        for mag in secondary_mags:
+            if pd.notna(event[mag]) and pd.notna(event['magnitude_type']) \
+                    and event['magnitude_type'] not in mag:
+
+                mag_type = mag.split('_')[1]
+                mag_key = mag.replace('_' + mag_type, '')
+
+                event['sec_mags'][mag_type][mag_key] = \
+                    event[mag]
+            del event[mag]
+
+    return events
+
 
 def _catalog_constructor_with_fallback(*args, **kwargs):
     df = Catalog(*args, **kwargs)
@@ -139,13 +240,17 @@ class Catalog(pd.DataFrame):
                      include_all_magnitudes: bool = True,
                      include_uncertainties: bool = False,
                      include_ids: bool = False,
-                     include_quality: bool = False) -> Catalog:
+                     include_quality: bool = False,
+                     backend: str = 'sax',
+                     columns: list[str] | None = None,
+                     event_filter: EventFilter | None = None) -> Catalog:
         """
         Create a Catalog from a QuakeML file.
 
         Args:
             quakeml:                Path to a QuakeML file or QuakeML
-                                    as a string.
+                                    as a string. The file can be
+                                    compressed with gzip, bz2, xz or zstd.
             include_all_magnitudes: Whether all available magnitude types
                                     should be included.
             include_uncertainties:  Whether value columns with uncertainties
@@ -154,89 +259,202 @@ class Catalog(pd.DataFrame):
                                     should be included.
             include_quality:        Whether columns with quality information
                                     should be included.
+            backend:                Parser used, 'sax' or 'lxml'. The lxml
+                                    parser is faster, the SAX parser is used
+                                    if lxml is not installed.
+            columns:                Columns that are parsed in addition to
+                                    the required columns. If None, all
+                                    columns are parsed.
+            event_filter:           Filters applied to the events while
+                                    they are parsed.
 
         Returns:
             Catalog
         """
+        columns = _parsed_columns(columns)
         if os.path.isfile(quakeml):
             catalog = parse_quakeml_file(
-                quakeml, include_all_magnitudes, include_quality)
+                quakeml, include_all_magnitudes, include_quality, backend,
+                columnar=True, columns=columns, event_filter=event_filter)
         else:
             catalog = parse_quakeml(
-                quakeml, include_all_magnitudes, include_quality)
+                quakeml, include_all_magnitudes, include_quality, backend,
+                columnar=True, columns=columns, event_filter=event_filter)
 
         df = cls.from_dict(catalog, include_uncertainties, include_ids)
 
         return df
 
     @classmethod
-    def from_dict(cls,
-                  data: list[dict],
-                  include_uncertainties: bool = True,
-                  include_ids: bool = True, *args, **kwargs) -> Catalog:
+    def from_quakeml_files(cls, file_paths: str | list[str],
+                           include_all_magnitudes: bool = True,
+                           include_uncertainties: bool = False,
+                           include_ids: bool = False,
+                           include_quality: bool = False,
+                           backend: str = 'sax',
+                           columns: list[str] | None = None,
+                           event_filter: EventFilter | None = None,
+                           n_jobs: int | None = None) -> Catalog:
         """
-        Create a Catalog from a list of dictionaries.
+        Create a Catalog from many QuakeML files, for example an archive
+        of daily files. The files are parsed in a process pool and the
+        columns of all events are concatenated once, in the order of the
+        files.
 
         Args:
-            data:                   A list of earthquake event information
-                                    dictionaries.
+            file_paths:             Paths to the QuakeML files, or a glob
+                                    pattern. The files matching a pattern
+                                    are parsed in sorted order.
+            include_all_magnitudes: Whether all available magnitude types
+                                    should be included.
             include_uncertainties:  Whether value columns with uncertainties
                                     should be included.
             include_ids:            Whether event, origin, and magnitude IDs
                                     should be included.
+            include_quality:        Whether columns with quality information
+                                    should be included.
+            backend:                Parser used, 'sax' or 'lxml'. The lxml
+                                    parser is faster, the SAX parser is used
+                                    if lxml is not installed.
+            columns:                Columns that are parsed in addition to
+                                    the required columns. If None, all
+                                    columns are parsed.
+            event_filter:           Filters applied to the events while
+                                    they are parsed.
+            n_jobs:                 Number of processes used, -1 uses all
+                                    CPUs. If None, the files are parsed in
+                                    this process.
 
         Returns:
             Catalog
         """
+        catalog = parse_quakeml_files(
+            file_paths, include_all_magnitudes, include_quality, backend,
+            _parsed_columns(columns), event_filter, n_jobs)
+        return cls.from_dict(catalog, include_uncertainties, include_ids)
 
-        df = super().from_dict(data, *args, **kwargs)
-        df = cls(df)
-
-        numeric_cols = ['magnitude', 'latitude', 'longitude', 'depth',
-                        'associatedphasecount', 'usedphasecount',
-                        'associatedstationcount', 'usedstationcount',
-                        'standarderror', 'azimuthalgap',
-                        'secondaryazimuthalgap', 'maximumdistance',
-                        'minimumdistance', 'mediandistance']
-
-        string_cols = ['magnitude_type', 'event_type']
-
-        for num in numeric_cols:
-            if num in df.columns:
-                df[num] = pd.to_numeric(df[num], errors='coerce')
-
-        # make sure empty rows in string columns are NoneType
-        for strc in string_cols:
-            if strc in df.columns:
-                df[strc] = df[strc].replace(
-                    to_replace=['',
-                                'nan', 'NaN',
-                                'none', 'None',
-                                'na', 'Na', 'NA',
-                                'null', 'Null', 'NULL'],
-                    value=None)
+    @classmethod
+    def iter_quakeml(cls, quakeml: str | Response,
+                     chunk_size: int = 50_000,
+                     include_all_magnitudes: bool = True,
+                     include_uncertainties: bool = False,
+                     include_ids: bool = False,
+                     include_quality: bool = False,
+                     backend: str = 'sax',
+                     columns: list[str] | None = None,
+                     event_filter: EventFilter | None = None
+                     ) -> Iterator[Catalog]:
+        """
+        Create Catalogs of chunks of the events of a QuakeML file, as they
+        are parsed. Only one chunk is held in memory at a time, so that
+        catalogs that do not fit in memory can be filtered or accumulated.
 
-        if 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time']).dt.tz_localize(None)
+        Args:
+            quakeml:                Path to a QuakeML file, QuakeML as a
+                                    string, or response object from a
+                                    QuakeML request.
+            chunk_size:             Number of events parsed for each
+                                    Catalog. Events with missing
+                                    coordinates or time are dropped.
+            include_all_magnitudes: Whether all available magnitude types
+                                    should be included.
+            include_uncertainties:  Whether value columns with uncertainties
+                                    should be included.
+            include_ids:            Whether event, origin, and magnitude IDs
+                                    should be included.
+            include_quality:        Whether columns with quality information
+                                    should be included.
+            backend:                Parser used, 'sax' or 'lxml'. The lxml
+                                    parser is faster, the SAX parser is used
+                                    if lxml is not installed.
+            columns:                Columns that are parsed in addition to
+                                    the required columns. If None, all
+                                    columns are parsed.
+            event_filter:           Filters applied to the events while
+                                    they are parsed.
+
+        Yields:
+            Catalog, the columns of the chunks can differ if a column has
+            no value in a chunk.
+        """
+        if isinstance(quakeml, str) and not os.path.isfile(quakeml):
+            quakeml = io.BytesIO(quakeml.encode('utf-8'))
 
-        if not include_uncertainties and isinstance(df, Catalog):
-            df = df.drop_uncertainties()
-        if not include_ids and isinstance(df, Catalog):
-            df = df.drop_ids()
+        for chunk in iter_quakeml(quakeml, chunk_size,
+                                  include_all_magnitudes, include_quality,
+                                  backend, columnar=True,
+                                  columns=_parsed_columns(columns),
+                                  event_filter=event_filter):
+            yield cls.from_dict(chunk, include_uncertainties, include_ids)
 
-        if not isinstance(df, Catalog):
-            df = Catalog(df)
+    @classmethod
+    def from_dict(cls,
+                  data: list[dict] | dict,
+                  include_uncertainties: bool = True,
+                  include_ids: bool = True, *args, **kwargs) -> Catalog:
+        """
+        Create a Catalog from a list of dictionaries.
 
-        if df.empty:
-            df = Catalog(columns=REQUIRED_COLS_CATALOG + ['magnitude_type'])
+        The columns in CATALOG_SCHEMA are converted to their types, times
+        in ISO 8601 format are parsed without inferring the format. Rows
+        without latitude, longitude or time are dropped.
 
-        full_len = len(df)
+        Args:
+            data:                   A list of earthquake event information
+                                    dictionaries, or a dictionary of
+                                    columns. Column arrays are used
+                                    without copying them.
+            include_uncertainties:  Whether value columns with uncertainties
+                                    should be included.
+            include_ids:            Whether event, origin, and magnitude IDs
+                                    should be included.
 
-        df = df.dropna(subset=['latitude', 'longitude', 'time'])
+        Returns:
+            Catalog
+        """
 
-        if len(df) < full_len:
+        if isinstance(data, dict) and not args and not kwargs and all(
+                isinstance(values, (list, np.ndarray))
+                for values in data.values()):
+            # plain columns without an index are taken as they are
+            columns = {column: np.asarray(values)
+                       for column, values in data.items()}
+            index = None
+        else:
+            df = pd.DataFrame.from_dict(data, *args, **kwargs)
+            columns = {column: df[column].to_numpy() for column in df}
+            index = df.index
+
+        # the columns are dropped before they are converted
+        if not include_uncertainties:
+            columns = {k: v for k, v in columns.items()
+                       if not re.search(_UNCERTAINTY_REGEX, k)}
+        if not include_ids:
+            columns = {k: v for k, v in columns.items()
+                       if not re.search(_ID_REGEX, k)}
+
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        if n_rows == 0:
+            return Catalog(columns=REQUIRED_COLS_CATALOG + ['magnitude_type'])
+
+        for column, column_type in CATALOG_SCHEMA.items():
+            if column in columns:
+                columns[column] = _convert_column(columns[column],
+                                                  column_type)
+
+        valid = np.logical_and.reduce([
+            pd.notna(columns[column])
+            for column in ['latitude', 'longitude', 'time']])
+        if not valid.all():
+            columns = {k: v[valid] for k, v in columns.items()}
+            index = np.flatnonzero(valid) if index is None \
+                else index[valid]
+
+        df = cls(columns, index=index, copy=False)
+
+        if n_rows > len(df):
             df.logger.info(
-                f"Dropped {full_len - len(df)} rows with missing values")
+                f"Dropped {n_rows - len(df)} rows with missing values")
 
         return df
 
@@ -333,10 +551,7 @@ class Catalog(pd.DataFrame):
             catalog: Catalog with uncertainty columns removed.
         """
 
-        rgx = "(_uncertainty|_lowerUncertainty|" \
-            "_upperUncertainty|_confidenceLevel)$"
-
-        cols = self.filter(regex=rgx).columns
+        cols = self.filter(regex=_UNCERTAINTY_REGEX).columns
         df = self.drop(columns=cols)
         return df
 
@@ -350,8 +565,7 @@ class Catalog(pd.DataFrame):
             catalog: Catalog with ID columns removed.
         """
 
-        rgx = "(eventID|originID|magnitudeID)$"
-        cols = self.filter(regex=rgx).columns
+        cols = self.filter(regex=_ID_REGEX).columns
         df = self.drop(columns=cols)
         return df
 
@@ -415,7 +629,8 @@ class Catalog(pd.DataFrame):
         stop_when_passed: bool = True,
         verbose: bool = False,
         beta: float | None = None,
-        n_samples: int = 10000
+        n_samples: int = 10000,
+        ks_cache: KSDistanceCache | None = None,
     ) -> tuple[np.ndarray, list[float], np.ndarray, float | None, float | None]:
         """
         Estimate the completeness magnitude (mc), possible mc values given as
@@ -432,6 +647,8 @@ class Catalog(pd.DataFrame):
             beta:               If beta is 'known', only estimate mc.
             n_samples:          Number of magnitude samples to be generated in
                                 p-value calculation of KS distance.
+            ks_cache:           Cache of simulated KS distances, reused
+                                across calls and processes.
 
         Returns:
             mcs_test:   Tested completeness magnitudes.
@@ -452,15 +669,16 @@ class Catalog(pd.DataFrame):
 
         # TODO change once we have a global estimate_mc
         mc_est = mc_ks(self.magnitude,
-                       mcs_test,
-                       delta_m,
-                       p_pass,
-                       stop_when_passed,
-                       verbose,
-                       beta,
-                       n_samples)
-
-        self.mc = mc_est[3]
+                       delta_m=delta_m,
+                       mcs_test=mcs_test,
+                       p_pass=p_pass,
+                       stop_when_passed=stop_when_passed,
+                       verbose=verbose,
+                       beta=beta,
+                       n=n_samples,
+                       ks_cache=ks_cache)
+
+        self.mc = mc_est[0]
         return mc_est
 
     @require_cols(require=['magnitude'])
@@ -611,23 +829,87 @@ class Catalog(pd.DataFrame):
 
         secondary_mags = self._secondary_magnitudekeys()
 
-        data = dict(events=df.to_dict(orient='records'),
+        data = dict(events=_quakeml_events(df, secondary_mags),
                     agencyID=agencyID, author=author)
 
-        for event in data['events']:
-            event['sec_mags'] = defaultdict(dict)
-            for mag in secondary_mags:
-                if pd.notna(event[mag]) and pd.notna(event['magnitude_type']) \
-                        and event['magnitude_type'] not in mag:
-
-                    mag_type = mag.split('_')[1]
-                    mag_key = mag.replace('_' + mag_type, '')
+        return _render_template(data, QML_TEMPLATE)
 
-                    event['sec_mags'][mag_type][mag_key] = \
-                        event[mag]
-                del event[mag]
+    @require_cols(require=_required_cols + ['magnitude_type'])
+    def to_quakeml_file(self, path_or_buffer: str | IO,
+                        agencyID: str = ' ', author: str = ' ',
+                        chunk_size: int = 10_000,
+                        compression: str | None = 'infer'):
+        """
+        Write the catalog in QuakeML format to a file, the same document
+        as to_quakeml. The events are converted and written in chunks, so
+        that the whole document is never held in memory.
 
-        return _render_template(data, QML_TEMPLATE)
+        Args:
+            path_or_buffer: Path of the file, or file-like object to which
+                        the QuakeML is written.
+            agencyID:   Agency ID with which to store the catalog.
+            author:     Author of the catalog.
+            chunk_size: Number of events converted at once.
+            compression: 'gzip', 'bz2', 'xz' or 'zstd' to compress the
+                        file written to a path. If 'infer', the compression
+                        is inferred from the extension of the path
+                        ('.gz', '.bz2', '.xz' or '.zst'). Must be None or
+                        'infer' for file-like objects.
+
+        The document is written to a temporary file next to the path, which
+        then replaces the file at the path, so that an existing file is only
+        overwritten by a complete document.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        is_path = isinstance(path_or_buffer, (str, os.PathLike))
+        if not is_path and compression not in (None, 'infer'):
+            raise ValueError("compression is only supported when writing "
+                             "to a path")
+
+        data = dict(events=self._quakeml_event_chunks(chunk_size),
+                    agencyID=agencyID, author=author)
+        stream = _get_template(QML_TEMPLATE).stream(**data)
+
+        if not is_path:
+            stream.dump(path_or_buffer,
+                        None if isinstance(path_or_buffer, io.TextIOBase)
+                        else 'utf-8')
+            return
+
+        path = os.fspath(path_or_buffer)
+        if compression == 'infer':
+            compression = next((c for e, c in _COMPRESSION_EXTENSIONS.items()
+                                if path.endswith(e)), None)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with (open(tmp_path, 'xb') if compression is None
+                  else _open_compressed(tmp_path, 'wb', compression)) as file:
+                stream.dump(file, 'utf-8')
+            os.replace(tmp_path, path)
+        except BaseException:
+            # do not leave the temporary file behind
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _quakeml_event_chunks(self, chunk_size: int) -> Iterator[dict]:
+        """
+        Event dictionaries of the QuakeML template, converted in chunks
+        of events.
+        """
+        secondary_mags = self._secondary_magnitudekeys()
+        n_dropped = 0
+        for start in range(0, len(self), chunk_size):
+            df = self.iloc[start:start + chunk_size]._create_ids()
+            full_len = len(df)
+            df = df.dropna(subset=['latitude', 'longitude', 'time'])
+            n_dropped += full_len - len(df)
+            yield from _quakeml_events(df, secondary_mags)
+        if n_dropped:
+            self.logger.info(f"Dropped {n_dropped} rows with missing values")
 
     def __finalize__(self, other, method=None, **kwargs) -> Catalog:
         """ Propagate metadata from other to self.
@@ -1,3 +1,6 @@
+import bz2
+import gzip
+import io
 import os
 import re
 import uuid
@@ -7,9 +10,12 @@ import pandas as pd
 import pytest
 
 from seismostats.analysis.bvalue import estimate_b
+from seismostats.analysis.estimate_mc import KSDistanceCache
 from seismostats.catalogs.catalog import (REQUIRED_COLS_CATALOG, Catalog,
                                           ForecastCatalog)
+from seismostats.io.parser import EventFilter
 from seismostats.utils.binning import bin_to_precision
+from seismostats.utils.simulate_distributions import simulate_magnitudes_binned
 
 RAW_DATA = {'name': ['Object 1', 'Object 2', 'Object 3'],
             'magnitude': [10.0, 12.5, 8.2],
@@ -122,6 +128,19 @@ def test_catalog_estimate_mc():
         catalog.estimate_mc()
 
 
+def test_catalog_estimate_mc_cache(tmp_path):
+    np.random.seed(0)
+    mags = simulate_magnitudes_binned(500, 1, 1.0, 0.1)
+    catalog = Catalog({'magnitude': mags})
+    cache = KSDistanceCache(str(tmp_path))
+
+    mc_est = catalog.estimate_mc(delta_m=0.1, mcs_test=[0.9, 1.0, 1.1],
+                                 n_samples=500, ks_cache=cache)
+
+    assert catalog.mc == mc_est[0]
+    assert len(os.listdir(tmp_path)) == len(mc_est[2])
+
+
 @pytest.mark.parametrize(
     "mag_values, delta_m, mc",
     [
@@ -174,6 +193,121 @@ def test_to_quakeml():
 
     assert catalog.equals(catalog2)
 
+    catalog3 = Catalog.from_quakeml(
+        xml_file,
+        include_uncertainties=True,
+        include_ids=True,
+        include_quality=True,
+        backend='lxml')
+
+    assert catalog.equals(catalog3)
+
+
+def test_iter_quakeml():
+    xml_file = os.path.join(PATH_RESOURCES, 'quakeml_data.xml')
+    with open(xml_file, 'r') as file:
+        xml_content = file.read()
+    catalog = Catalog.from_quakeml(xml_file)
+
+    for quakeml in [xml_file, xml_content]:
+        chunks = list(Catalog.iter_quakeml(quakeml, chunk_size=1))
+        assert len(chunks) == len(catalog)
+        assert all(isinstance(chunk, Catalog) for chunk in chunks)
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks, ignore_index=True), catalog)
+
+    assert list(Catalog.iter_quakeml('')) == []
+
+
+def test_from_quakeml_selection():
+    xml_file = os.path.join(PATH_RESOURCES, 'quakeml_data.xml')
+    catalog = Catalog.from_quakeml(xml_file)
+
+    selected = Catalog.from_quakeml(xml_file, columns=['magnitude_type'])
+    assert set(selected.columns) == set(
+        REQUIRED_COLS_CATALOG + ['magnitude_type'])
+    pd.testing.assert_frame_equal(selected, catalog[selected.columns])
+
+    event_filter = EventFilter(min_magnitude=catalog['magnitude'].max())
+    selected = Catalog.from_quakeml(xml_file, event_filter=event_filter)
+    largest = catalog['magnitude'] == catalog['magnitude'].max()
+    assert 0 < len(selected) < len(catalog)
+    pd.testing.assert_frame_equal(
+        selected, catalog.loc[largest, selected.columns].reset_index(drop=True))
+
+
+def test_from_quakeml_files(tmp_path):
+    xml_file = os.path.join(PATH_RESOURCES, 'quakeml_data.xml')
+    with open(xml_file, 'r') as file:
+        xml_content = file.read()
+    for day in range(3):
+        (tmp_path / f'day_{day}.xml').write_text(xml_content)
+    expected = pd.concat([Catalog.from_quakeml(xml_file)] * 3,
+                         ignore_index=True)
+
+    catalog = Catalog.from_quakeml_files(str(tmp_path / 'day_*.xml'))
+    assert isinstance(catalog, Catalog)
+    pd.testing.assert_frame_equal(catalog, expected)
+
+    catalog = Catalog.from_quakeml_files(
+        sorted(str(path) for path in tmp_path.iterdir()), n_jobs=2)
+    pd.testing.assert_frame_equal(catalog, expected)
+
+
+def test_to_quakeml_file(tmp_path, monkeypatch):
+    xml_file = os.path.join(PATH_RESOURCES, 'quakeml_data.xml')
+    catalog = Catalog.from_quakeml(
+        xml_file,
+        include_uncertainties=True,
+        include_ids=True,
+        include_quality=True)
+    catalog = pd.concat([catalog] * 3, ignore_index=True)
+    expected = catalog.to_quakeml(agencyID='SED', author='catalog-tools')
+
+    for chunk_size in [1, 2, 100]:
+        buffer = io.StringIO()
+        catalog.to_quakeml_file(buffer, agencyID='SED',
+                                author='catalog-tools', chunk_size=chunk_size)
+        assert buffer.getvalue() == expected
+
+    buffer = io.BytesIO()
+    catalog.to_quakeml_file(buffer, agencyID='SED', author='catalog-tools')
+    assert buffer.getvalue().decode('utf-8') == expected
+
+    catalog.to_quakeml_file(tmp_path / 'catalog.xml', agencyID='SED',
+                            author='catalog-tools')
+    assert (tmp_path / 'catalog.xml').read_text() == expected
+
+    # the compression is inferred from the extension
+    catalog.to_quakeml_file(str(tmp_path / 'catalog.xml.gz'),
+                            agencyID='SED', author='catalog-tools')
+    with gzip.open(tmp_path / 'catalog.xml.gz', 'rt') as f:
+        assert f.read() == expected
+    catalog.to_quakeml_file(str(tmp_path / 'catalog.xml'),
+                            agencyID='SED', author='catalog-tools',
+                            compression='bz2')
+    with bz2.open(tmp_path / 'catalog.xml', 'rt') as f:
+        assert f.read() == expected
+    assert Catalog.from_quakeml(str(tmp_path / 'catalog.xml'),
+                                include_uncertainties=True, include_ids=True,
+                                include_quality=True).equals(catalog)
+
+    with pytest.raises(ValueError):
+        catalog.to_quakeml_file(io.StringIO(), chunk_size=0)
+    with pytest.raises(ValueError):
+        catalog.to_quakeml_file(io.BytesIO(), compression='gzip')
+
+    # a failed write leaves the existing file untouched
+    def failing_chunks(self, chunk_size):
+        yield from catalog._quakeml_event_chunks(chunk_size)
+        raise RuntimeError('conversion failed')
+    monkeypatch.setattr(Catalog, '_quakeml_event_chunks', failing_chunks)
+    with pytest.raises(RuntimeError):
+        catalog.to_quakeml_file(tmp_path / 'catalog.xml.gz')
+    with gzip.open(tmp_path / 'catalog.xml.gz', 'rt') as f:
+        assert f.read() == expected
+    assert sorted(os.listdir(tmp_path)) == ['catalog.xml', 'catalog.xml.gz']
+
 
 def test_to_quakeml_without():
     xml_file = os.path.join(PATH_RESOURCES, 'quakeml_data.xml')
@@ -236,6 +370,62 @@ def test_to_quakeml_forecast():
     assert catalog.name == 'Catalog 1'
 
 
+def test_from_dict():
+    data = {'longitude': ['1', '2', '3', '4'],
+            'latitude': [1.0, 2.0, None, 4.0],
+            'depth': ['1', '2', '3', 'x'],
+            'magnitude': np.array([1.5, 2.0, 2.5, 3.0]),
+            'time': ['2020-01-01T00:00:00Z', '2020-01-02T00:00:00.5Z',
+                     None, '2020-01-04T12:00:00.123456Z'],
+            'event_type': ['earthquake', 'NULL', 'earthquake', ''],
+            'magnitude_type': ['ML', 'Mw', 'ML', 'none'],
+            'eventID': ['a', 'b', 'c', 'd'],
+            'magnitude_uncertainty': ['0.1', '0.2', '0.3', '0.4']}
+
+    catalog = Catalog.from_dict(data, include_uncertainties=False)
+    assert isinstance(catalog, Catalog)
+    assert list(catalog.columns) == ['longitude', 'latitude', 'depth',
+                                     'magnitude', 'time', 'event_type',
+                                     'magnitude_type', 'eventID']
+    # the row without latitude and time is dropped
+    assert list(catalog.index) == [0, 1, 3]
+    np.testing.assert_array_equal(catalog['depth'], [1, 2, np.nan])
+    assert catalog['time'].dtype == 'datetime64[ns]'
+    assert list(catalog['time']) == [
+        pd.Timestamp('2020-01-01'), pd.Timestamp('2020-01-02 00:00:00.5'),
+        pd.Timestamp('2020-01-04 12:00:00.123456')]
+    assert list(catalog['event_type']) == ['earthquake', None, None]
+    assert list(catalog['magnitude_type']) == ['ML', 'Mw', None]
+    assert list(catalog['magnitude']) == [1.5, 2.0, 3.0]
+
+    # columns that already have their type are not copied
+    data = {'longitude': np.array([1.0, 2.0]),
+            'latitude': np.array([1.0, 2.0]),
+            'depth': np.array([1.0, 2.0]),
+            'magnitude': np.array([1.0, 2.0]),
+            'time': np.array(['2020-01-01', '2020-01-02'],
+                             dtype='datetime64[ns]')}
+    catalog = Catalog.from_dict(data)
+    assert np.shares_memory(catalog['magnitude'].to_numpy(),
+                            data['magnitude'])
+
+    # columns given as dicts or Series keep their index
+    data = {'longitude': {'a': 1.0, 'b': 2.0},
+            'latitude': {'a': 1.0, 'b': 2.0},
+            'depth': {'a': 1.0, 'b': 2.0},
+            'magnitude': {'a': 1.0, 'b': 2.0},
+            'time': {'a': '2020-01-01', 'b': '2020-01-02'}}
+    catalog = Catalog.from_dict(data)
+    assert list(catalog.index) == ['a', 'b']
+    assert list(catalog['magnitude']) == [1.0, 2.0]
+
+    data = {column: pd.Series(list(values.values()), index=[5, 6])
+            for column, values in data.items()}
+    catalog = Catalog.from_dict(data)
+    assert list(catalog.index) == [5, 6]
+    assert catalog['time'].dtype == 'datetime64[ns]'
+
+
 def test_empty_catalog():
     catalog = Catalog()
     assert catalog.empty
@@ -1,9 +1,49 @@
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import sys
+import warnings
 import xml.sax
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 from xml.sax._exceptions import SAXParseException
 
+import numpy as np
+import pandas as pd
 from requests import Response
 
+try:
+    from lxml import etree
+except ImportError:
+    _lxml_available = False
+else:
+    _lxml_available = True
+
+try:
+    import zstandard
+except ImportError:
+    _zstandard_available = False
+else:
+    _zstandard_available = True
+
+BACKENDS = ('sax', 'lxml')
+
+# number of bytes read at once when parsing incrementally
+_BLOCK_SIZE = 1 << 16
+
+# magic bytes at the start of compressed files
+_COMPRESSIONS = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
 
 def _get_realvalue(key: str, value: str) -> dict:
     real_values = {'value': '',
@@ -194,6 +234,170 @@ def _parse_to_dict(event: dict, origins: list, magnitudes: list,
         _extract_secondary_magnitudes(magnitudes)
 
 
+class EventFilter:
+    """
+    Simple filters of the parsed earthquake events, applied as soon as an
+    event is parsed. The bounds are inclusive, and events without a value
+    for a filtered field are dropped.
+
+    Args:
+        start_time : datetime or str, optional
+            Earliest origin time, in UTC.
+        end_time : datetime or str, optional
+            Latest origin time, in UTC.
+        min_latitude, max_latitude : float, optional
+            Latitude range of the epicenters.
+        min_longitude, max_longitude : float, optional
+            Longitude range of the epicenters.
+        min_magnitude, max_magnitude : float, optional
+            Range of the preferred magnitude.
+        event_type : str or list[str], optional
+            Event type, or event types that are kept.
+    """
+
+    def __init__(self,
+                 start_time: datetime | str | None = None,
+                 end_time: datetime | str | None = None,
+                 min_latitude: float | None = None,
+                 max_latitude: float | None = None,
+                 min_longitude: float | None = None,
+                 max_longitude: float | None = None,
+                 min_magnitude: float | None = None,
+                 max_magnitude: float | None = None,
+                 event_type: str | list[str] | None = None):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.min_latitude = min_latitude
+        self.max_latitude = max_latitude
+        self.min_longitude = min_longitude
+        self.max_longitude = max_longitude
+        self.min_magnitude = min_magnitude
+        self.max_magnitude = max_magnitude
+        self.event_type = event_type
+
+        self._ranges = [
+            (column, -np.inf if lower is None else lower,
+             np.inf if upper is None else upper)
+            for column, lower, upper in [
+                ('latitude', min_latitude, max_latitude),
+                ('longitude', min_longitude, max_longitude),
+                ('magnitude', min_magnitude, max_magnitude)]
+            if lower is not None or upper is not None]
+        self._start = None if start_time is None else _to_utc(start_time)
+        self._end = None if end_time is None else _to_utc(end_time)
+        self._event_types = [event_type] if isinstance(event_type, str) \
+            else event_type
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        Columns of the parsed events that are filtered.
+        """
+        columns = [column for column, _, _ in self._ranges]
+        if self._start is not None or self._end is not None:
+            columns.append('time')
+        if self._event_types is not None:
+            columns.append('event_type')
+        return columns
+
+    def __call__(self, event: dict) -> bool:
+        """
+        Whether the event dictionary passes the filters.
+        """
+        try:
+            for column, lower, upper in self._ranges:
+                if not lower <= float(event[column]) <= upper:
+                    return False
+            if self._start is not None or self._end is not None:
+                time = _to_utc(event['time'])
+                if self._start is not None and time < self._start:
+                    return False
+                if self._end is not None and time > self._end:
+                    return False
+        except (KeyError, TypeError, ValueError):
+            return False
+        return self._event_types is None \
+            or event.get('event_type') in self._event_types
+
+
+def _to_utc(time: datetime | str) -> pd.Timestamp:
+    time = pd.Timestamp(time)
+    return time if time.tzinfo is None else time.tz_convert(None)
+
+
+def _handler_keys(columns: list[str] | None = None,
+                  include_all_magnitudes: bool = True,
+                  include_quality: bool = True) -> set[str]:
+    """
+    Keys of the dictionaries of the QuakeMLHandler from which
+    _parse_to_dict takes the given columns, and the keys it needs to
+    select the preferred origin and magnitudes. All columns if None.
+    """
+    mappings = EVENT_MAPPINGS | ORIGIN_MAPPINGS | MAGNITUDE_MAPPINGS
+    if include_quality:
+        mappings = mappings | QUALITY_MAPPINGS
+    keys = {'preferredOriginID', 'preferredMagnitudeID', 'originpublicID',
+            'magnitudepublicID', 'magnitudetype'}
+    keys.update(key for key, value in mappings.items()
+                if columns is None or value in columns)
+    if include_all_magnitudes:
+        keys.update(SECONDARY_MAGNITUDE_MAPPINGS(''))
+        keys.update(['magnitudecreationInfoversion',
+                     'magnitudecreationInfocreationTime'])
+    return keys
+
+
+def _prefixes(keys: set[str]) -> frozenset[str]:
+    """
+    All prefixes of the keys, the locations of the elements that are
+    needed to read the keys.
+    """
+    return frozenset(key[:i] for key in keys for i in range(1, len(key) + 1))
+
+
+class _EventSelection:
+    """
+    Output columns and filters of the parsed events, shared by the
+    backends. Only the elements at the locations in prefixes are read.
+    """
+
+    def __init__(self, include_all_magnitudes: bool = True,
+                 include_quality: bool = True,
+                 columns: list[str] | None = None,
+                 event_filter: EventFilter | None = None):
+        self.columns = None if columns is None else set(columns)
+        self.event_filter = event_filter
+        self.include_quality = include_quality
+
+        # the filtered columns are needed, but not in the output
+        needed = None if columns is None else list(columns) + (
+            event_filter.columns if event_filter is not None else [])
+        # secondary magnitudes are only read for columns that are not
+        # mapped from the preferred origin and magnitude
+        mapped = (EVENT_MAPPINGS | ORIGIN_MAPPINGS | MAGNITUDE_MAPPINGS
+                  | QUALITY_MAPPINGS).values()
+        self.include_all_magnitudes = include_all_magnitudes and (
+            needed is None or any(c.startswith('magnitude_')
+                                  and c not in mapped for c in needed))
+        self.prefixes = _prefixes(_handler_keys(
+            needed, self.include_all_magnitudes, include_quality))
+
+    def __call__(self, event: dict, origins: list,
+                 magnitudes: list) -> dict | None:
+        """
+        Returns the dictionary of event parameters with the output
+        columns, or None if the event does not pass the filters.
+        """
+        event = _parse_to_dict(event, origins, magnitudes,
+                               self.include_all_magnitudes,
+                               self.include_quality)
+        if self.event_filter is not None and not self.event_filter(event):
+            return None
+        if self.columns is not None:
+            event = {k: v for k, v in event.items() if k in self.columns}
+        return event
+
+
 class QuakeMLHandler(xml.sax.ContentHandler):
     """
     A SAX ContentHandler that is used to parse QuakeML files and extract
@@ -205,17 +409,27 @@ class QuakeMLHandler(xml.sax.ContentHandler):
         include_all_magnitudes : bool, optional
             If True, include all magnitudes in the catalog. Otherwise,
             only include the preferred magnitude.
+        columns : list[str], optional
+            Columns of the extracted events, all columns if None.
+        event_filter : EventFilter, optional
+            Filters of the extracted events.
     Notes:
         This class is a SAX ContentHandler, and is used in conjunction
         with an xml.sax parser to extract earthquake event information
-        from QuakeML files.
+        from QuakeML files. Elements that are not needed for the columns
+        and filters are skipped with their descendants.
     """
 
     def __init__(
-            self, catalog, include_all_magnitudes=True, include_quality=True):
+            self, catalog, include_all_magnitudes=True, include_quality=True,
+            columns=None, event_filter=None):
         self.catalog = catalog
         self.include_all_magnitudes = include_all_magnitudes
         self.include_quality = include_quality
+        self.selection = _EventSelection(
+            include_all_magnitudes, include_quality, columns, event_filter)
+        # depth of the skipped element that is being read
+        self.skip = 0
         self.event = []
         self.origin = []
         self.magnitude = []
@@ -230,7 +444,10 @@ class QuakeMLHandler(xml.sax.ContentHandler):
             getattr(self, key)[-1][self.location + additional_key] = value
 
     def startElement(self, tagName, attrs):
-        if tagName in ['event', 'origin', 'magnitude']:
+        if self.skip:
+            self.skip += 1
+
+        elif tagName in ['event', 'origin', 'magnitude']:
 
             self.parent = tagName
             self.location = tagName if tagName != 'event' else ''
@@ -240,14 +457,21 @@ class QuakeMLHandler(xml.sax.ContentHandler):
                 self.setter(self.parent, attrs['publicID'], 'publicID')
 
         elif self.parent != '':
-            self.location += tagName
+            if self.location + tagName in self.selection.prefixes:
+                self.location += tagName
+            else:
+                self.skip = 1
 
     def endElement(self, tagName):
+        if self.skip:
+            self.skip -= 1
+            return
+
         if tagName == 'event':
-            self.catalog.append(_parse_to_dict(
-                self.event[-1], self.origin, self.magnitude,
-                include_all_magnitudes=self.include_all_magnitudes,
-                include_quality=self.include_quality))
+            event = self.selection(self.event[-1], self.origin,
+                                   self.magnitude)
+            if event is not None:
+                self.catalog.append(event)
             self.parent = ''
             self.location = ''
             self.event = []
@@ -261,7 +485,7 @@ class QuakeMLHandler(xml.sax.ContentHandler):
             self.location = self.location[:-len(tagName)]
 
     def characters(self, chars):
-        if chars.strip() and self.parent:
+        if not self.skip and self.parent and chars.strip():
             self.setter(self.parent, chars.strip())
 
     def startDocument(self):
@@ -271,85 +495,619 @@ class QuakeMLHandler(xml.sax.ContentHandler):
         pass
 
 
-def parse_quakeml_file(
-        file_path: str, include_all_magnitudes: bool = True,
-        include_quality: bool = True) -> list[dict]:
+STRING_COLUMNS = ['event_type', 'magnitude_type', 'evaluationmode']
+TIME_COLUMNS = ['time']
+
+
+def _column_type(column: str) -> str:
     """
-    Parse a QuakeML file and return a list of earthquake event information
-    dictionaries.
+    Type of the values of a column of the parsed events: 'time', 'str'
+    for identifiers and types, and 'float' for all other values.
+    """
+    if column in TIME_COLUMNS:
+        return 'time'
+    if column in STRING_COLUMNS or column.endswith('ID'):
+        return 'str'
+    return 'float'
+
+
+class QuakeMLColumns:
+    """
+    Collects earthquake event information dictionaries in one typed
+    buffer per column instead of a list of dictionaries. Floats are
+    stored in arrays of doubles, times in arrays of int64 nanoseconds
+    since the epoch, and identifiers and types as interned strings.
+    Missing values are NaN, NaT and None.
+
+    Can be used as the catalog of the QuakeMLHandler, the dictionary of
+    each event is discarded after it is appended. The values are
+    converted in chunks of events.
+    """
+
+    # number of events whose values are converted at once
+    _chunk_size = 8192
+
+    def __init__(self):
+        self._buffers = {}
+        self._types = {}
+        # values of the events that are not converted yet
+        self._pending = {}
+        self._n_events = 0
+
+    def __len__(self) -> int:
+        return self._n_events
+
+    def _add_column(self, column: str):
+        # the events before have no value in the new column
+        n_pending = self._n_events % self._chunk_size
+        n_converted = self._n_events - n_pending
+        self._types[column] = _column_type(column)
+        if self._types[column] == 'float':
+            self._buffers[column] = array('d', [np.nan]) * n_converted
+        elif self._types[column] == 'time':
+            self._buffers[column] = \
+                array('q', [np.iinfo(np.int64).min]) * n_converted
+        else:
+            self._buffers[column] = [None] * n_converted
+        self._pending[column] = [None] * n_pending
+
+    def _convert(self):
+        # moves the pending values to the buffers
+        for column, values in self._pending.items():
+            if self._types[column] == 'float':
+                self._buffers[column].frombytes(pd.to_numeric(
+                    np.array(values, dtype=object), errors='coerce'
+                ).astype(float).tobytes())
+            elif self._types[column] == 'time':
+                times = pd.to_datetime(values, format='ISO8601',
+                                       utc=True).tz_localize(None)
+                self._buffers[column].frombytes(
+                    times.as_unit('ns').asi8.astype(np.int64).tobytes())
+            else:
+                self._buffers[column].extend(
+                    [None if v is None else sys.intern(v) for v in values])
+            values.clear()
+
+    def append(self, event: dict):
+        """
+        Appends the values of an event information dictionary.
+        """
+        for column in event:
+            if column not in self._pending:
+                self._add_column(column)
+        for column, values in self._pending.items():
+            values.append(event.get(column))
+        self._n_events += 1
+        if self._n_events % self._chunk_size == 0:
+            self._convert()
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        """
+        Returns the columns as arrays, the arrays of floats and times use
+        the memory of the buffers.
+        """
+        self._convert()
+        columns = {}
+        for column, buffer in self._buffers.items():
+            if self._types[column] == 'float':
+                columns[column] = np.frombuffer(buffer, dtype=float) \
+                    if len(buffer) else np.array([], dtype=float)
+            elif self._types[column] == 'time':
+                columns[column] = np.frombuffer(
+                    buffer, dtype=np.int64).view('datetime64[ns]') \
+                    if len(buffer) else np.array([], dtype='datetime64[ns]')
+            else:
+                columns[column] = np.array(buffer, dtype=object)
+        return columns
+
+
+def _use_lxml(backend: str) -> bool:
+    """
+    Whether the lxml backend is used, falls back to the SAX parser if
+    lxml is not installed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+    if backend == 'lxml' and not _lxml_available:
+        warnings.warn("lxml is not installed, using the SAX parser.")
+        return False
+    return backend == 'lxml'
+
+
+def _add_children(element, location: str, target: dict,
+                  prefixes: frozenset[str]):
+    """
+    Adds the text of the descendants of an element to a dictionary, with
+    the same keys as the QuakeMLHandler. Only the descendants at the
+    locations in prefixes are read.
+    """
+    for child in element.iterchildren(tag=etree.Element):
+        name = location + child.tag.rpartition('}')[2]
+        if name not in prefixes:
+            continue
+        text = child.text
+        if text and (text := text.strip()):
+            if name in target:
+                target[name] += text
+            else:
+                target[name] = text
+        _add_children(child, name, target, prefixes)
+
+
+def _parse_event_element(element,
+                         selection: _EventSelection) -> dict | None:
+    """
+    Parse an lxml event element and return a dictionary of event
+    parameters, the same as the QuakeMLHandler, or None if the event
+    does not pass the filters.
+    """
+    event, origins, magnitudes = {}, [], []
+    if element.get('publicID') is not None:
+        event['publicID'] = element.get('publicID')
+
+    for child in element.iterchildren(tag=etree.Element):
+        name = child.tag.rpartition('}')[2]
+        if name in ('origin', 'magnitude'):
+            target = {}
+            if child.get('publicID') is not None:
+                target[f'{name}publicID'] = child.get('publicID')
+            _add_children(child, name, target, selection.prefixes)
+            if name == 'origin':
+                origins.append(target)
+            else:
+                magnitudes.append(target)
+        elif name in selection.prefixes:
+            text = child.text
+            if text and (text := text.strip()):
+                event[name] = event.get(name, '') + text
+            _add_children(child, name, event, selection.prefixes)
+
+    return selection(event, origins, magnitudes)
+
+
+def _iterparse_events(source, include_all_magnitudes: bool = True,
+                      include_quality: bool = True,
+                      columns: list[str] | None = None,
+                      event_filter: EventFilter | None = None):
+    """
+    Parse QuakeML with lxml and yield the earthquake event information
+    dictionaries. Each event element is removed from the tree after it is
+    parsed, so memory does not grow with the number of events.
 
     Args:
-        file_path : str
-            Path to the QuakeML file.
+        source : str or file-like
+            Path to a QuakeML file or file-like object with QuakeML.
+    """
+    selection = _EventSelection(include_all_magnitudes, include_quality,
+                                columns, event_filter)
+    context = etree.iterparse(source, events=('end',), tag='{*}event',
+                              huge_tree=True)
+    try:
+        for _, element in context:
+            event = _parse_event_element(element, selection)
+            if event is not None:
+                yield event
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    except etree.XMLSyntaxError as e:
+        if 'no element found' in str(e) \
+                or e.code == etree.ErrorTypes.ERR_DOCUMENT_EMPTY:
+            return
+        raise e
 
-    Returns:
-        list[dict]
-            A list of earthquake event information dictionaries.
+
+def _iterparse_quakeml(source, data: list | QuakeMLColumns,
+                       include_all_magnitudes: bool = True,
+                       include_quality: bool = True,
+                       columns: list[str] | None = None,
+                       event_filter: EventFilter | None = None):
+    """
+    Parse QuakeML with lxml and append the earthquake event information
+    dictionaries to data.
+
+    Args:
+        source : str or file-like
+            Path to a QuakeML file or file-like object with QuakeML.
+        data : list or QuakeMLColumns
+            Collection to which the events are appended.
+    """
+    for event in _iterparse_events(source, include_all_magnitudes,
+                                   include_quality, columns, event_filter):
+        data.append(event)
+
+
+def _open_compressed(file_path: str, mode: str, compression: str):
+    """
+    Opens a file compressed with 'gzip', 'bz2', 'xz' or 'zstd'.
+
+    Raises:
+        ImportError: if the compression is zstd and the optional
+            zstandard package is not available
+    """
+    if compression not in _COMPRESSIONS.values():
+        raise ValueError("compression must be one of "
+                         f"{', '.join(_COMPRESSIONS.values())}")
+    if compression == 'zstd':
+        if not _zstandard_available:
+            raise ImportError(
+                "the optional zstandard package is not available")
+        return zstandard.open(file_path, mode)
+    return {'gzip': gzip, 'bz2': bz2, 'xz': lzma}[compression].open(
+        file_path, mode)
+
+
+@contextmanager
+def _open_quakeml(file_path: str):
+    """
+    Opens a QuakeML file. If it is compressed with gzip, bz2, xz or zstd,
+    detected by its magic bytes, yields a file object that decompresses
+    it while it is read, otherwise yields the path.
+
+    Raises:
+        ImportError: if the file is compressed with zstd and the optional
+            zstandard package is not available
+    """
+    with open(file_path, 'rb') as f:
+        magic = f.read(6)
+    compression = next((c for m, c in _COMPRESSIONS.items()
+                        if magic.startswith(m)), None)
+
+    if compression is None:
+        yield file_path
+        return
+    with _open_compressed(file_path, 'rb', compression) as file:
+        yield file
+
+
+def _parse_source(source, data: list | QuakeMLColumns,
+                  include_all_magnitudes: bool = True,
+                  include_quality: bool = True,
+                  backend: str = 'sax',
+                  columns: list[str] | None = None,
+                  event_filter: EventFilter | None = None):
+    """
+    Parse QuakeML from a path or file-like object and append the
+    earthquake event information dictionaries to data.
     """
-    data = []
-    handler = QuakeMLHandler(data, include_all_magnitudes, include_quality)
+    if _use_lxml(backend):
+        _iterparse_quakeml(source, data, include_all_magnitudes,
+                           include_quality, columns, event_filter)
+        return
+    handler = QuakeMLHandler(data, include_all_magnitudes, include_quality,
+                             columns, event_filter)
     parser = xml.sax.make_parser()
     parser.setContentHandler(handler)
     try:
-        parser.parse(file_path)
+        parser.parse(source)
     except SAXParseException as e:
         if 'no element found' in str(e):
-            return data
+            return
         raise e
-    return data
+
+
+def parse_quakeml_file(
+        file_path: str, include_all_magnitudes: bool = True,
+        include_quality: bool = True, backend: str = 'sax',
+        columnar: bool = False, columns: list[str] | None = None,
+        event_filter: EventFilter | None = None
+) -> list[dict] | dict[str, np.ndarray]:
+    """
+    Parse a QuakeML file and return a list of earthquake event information
+    dictionaries, or a dictionary of typed column arrays if columnar
+    is True.
+
+    Args:
+        file_path : str
+            Path to the QuakeML file, which can be compressed with gzip,
+            bz2, xz or zstd.
+        backend : str, optional
+            'sax' or 'lxml'. The lxml parser is faster, the SAX parser is
+            used if lxml is not installed.
+        columnar : bool, optional
+            If True, return a dictionary of typed column arrays instead
+            (see QuakeMLColumns).
+        columns : list[str], optional
+            Columns of the events, all columns if None. Elements that are
+            only needed for other columns are not read.
+        event_filter : EventFilter, optional
+            Filters applied to each event as soon as it is parsed.
+
+    Returns:
+        list[dict] or dict[str, np.ndarray]
+            A list of earthquake event information dictionaries, or if
+            columnar is True, a dictionary of typed column arrays (see
+            QuakeMLColumns).
+    """
+    data = QuakeMLColumns() if columnar else []
+    with _open_quakeml(file_path) as source:
+        _parse_source(source, data, include_all_magnitudes, include_quality,
+                      backend, columns, event_filter)
+    return data.to_dict() if columnar else data
 
 
 def parse_quakeml(
         quakeml: str, include_all_magnitudes: bool = True,
-        include_quality: bool = True) -> list[dict]:
+        include_quality: bool = True, backend: str = 'sax',
+        columnar: bool = False, columns: list[str] | None = None,
+        event_filter: EventFilter | None = None
+) -> list[dict] | dict[str, np.ndarray]:
     """
     Parse a QuakeML string and return a list of earthquake event information
-    dictionaries.
+    dictionaries, or a dictionary of typed column arrays if columnar
+    is True.
 
     Args:
         quakeml : str
             A QuakeML string.
+        backend : str, optional
+            'sax' or 'lxml'. The lxml parser is faster, the SAX parser is
+            used if lxml is not installed.
+        columnar : bool, optional
+            If True, return a dictionary of typed column arrays instead
+            (see QuakeMLColumns).
+        columns : list[str], optional
+            Columns of the events, all columns if None. Elements that are
+            only needed for other columns are not read.
+        event_filter : EventFilter, optional
+            Filters applied to each event as soon as it is parsed.
 
     Returns:
-        list[dict]
-            A list of earthquake event information dictionaries.
+        list[dict] or dict[str, np.ndarray]
+            A list of earthquake event information dictionaries, or if
+            columnar is True, a dictionary of typed column arrays (see
+            QuakeMLColumns).
     """
-    data = []
+    data = QuakeMLColumns() if columnar else []
 
     if quakeml == '':
-        return data
+        pass
+    elif _use_lxml(backend):
+        _iterparse_quakeml(io.BytesIO(quakeml.encode('utf-8')), data,
+                           include_all_magnitudes, include_quality,
+                           columns, event_filter)
+    else:
+        handler = QuakeMLHandler(
+            data, include_all_magnitudes, include_quality, columns,
+            event_filter)
+        xml.sax.parseString(quakeml, handler)
 
-    handler = QuakeMLHandler(data, include_all_magnitudes, include_quality)
-    xml.sax.parseString(quakeml, handler)
-    return data
+    return data.to_dict() if columnar else data
 
 
 def parse_quakeml_response(
         response: Response,
         include_all_magnitudes: bool = True,
-        include_quality: bool = True) -> list[dict]:
+        include_quality: bool = True,
+        backend: str = 'sax',
+        columnar: bool = False,
+        columns: list[str] | None = None,
+        event_filter: EventFilter | None = None
+) -> list[dict] | dict[str, np.ndarray]:
     """
     Parse a QuakeML response and return a list of earthquake event information
-    dictionaries.
+    dictionaries, or a dictionary of typed column arrays if columnar
+    is True.
 
     Args:
         response : Response
             A response object from a QuakeML request.
+        backend : str, optional
+            'sax' or 'lxml'. The lxml parser is faster, the SAX parser is
+            used if lxml is not installed.
+        columnar : bool, optional
+            If True, return a dictionary of typed column arrays instead
+            (see QuakeMLColumns).
+        columns : list[str], optional
+            Columns of the events, all columns if None. Elements that are
+            only needed for other columns are not read.
+        event_filter : EventFilter, optional
+            Filters applied to each event as soon as it is parsed.
 
     Returns:
-        list[dict]
-            A list of earthquake event information dictionaries.
+        list[dict] or dict[str, np.ndarray]
+            A list of earthquake event information dictionaries, or if
+            columnar is True, a dictionary of typed column arrays (see
+            QuakeMLColumns).
     """
     response.raw.decode_content = True  # if content-encoding is used decode
-    data = []
-    handler = QuakeMLHandler(data, include_all_magnitudes, include_quality)
-    parser = xml.sax.make_parser()
-    parser.setContentHandler(handler)
+    data = QuakeMLColumns() if columnar else []
+    _parse_source(response.raw, data, include_all_magnitudes,
+                  include_quality, backend, columns, event_filter)
+    return data.to_dict() if columnar else data
 
-    try:
-        parser.parse(response.raw)
-    except SAXParseException as e:
-        if 'no element found' in str(e):
-            return data
-        raise e
-    return data
+
+def _missing_values(column: str, n: int) -> np.ndarray:
+    """
+    Array of n missing values of the type of a column.
+    """
+    column_type = _column_type(column)
+    if column_type == 'float':
+        return np.full(n, np.nan)
+    if column_type == 'time':
+        return np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+    return np.full(n, None, dtype=object)
+
+
+def _concat_columns(parts: list[dict[str, np.ndarray]]
+                    ) -> dict[str, np.ndarray]:
+    """
+    Concatenates dictionaries of typed column arrays, as returned by
+    QuakeMLColumns.to_dict. Columns missing in a part are filled with
+    missing values.
+    """
+    parts = [part for part in parts if part]
+    if len(parts) == 1:
+        return parts[0]
+    lengths = [len(next(iter(part.values()))) for part in parts]
+    columns = dict.fromkeys(column for part in parts for column in part)
+    return {column: np.concatenate(
+        [part[column] if column in part else _missing_values(column, n)
+         for part, n in zip(parts, lengths)]) for column in columns}
+
+
+def _parse_files(file_paths: list[str], kwargs: dict
+                 ) -> dict[str, np.ndarray]:
+    """
+    Parses QuakeML files and returns their concatenated columns.
+    """
+    return _concat_columns([parse_quakeml_file(path, columnar=True, **kwargs)
+                            for path in file_paths])
+
+
+def parse_quakeml_files(
+        file_paths: str | list[str], include_all_magnitudes: bool = True,
+        include_quality: bool = True, backend: str = 'sax',
+        columns: list[str] | None = None,
+        event_filter: EventFilter | None = None,
+        n_jobs: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Parse many QuakeML files and return the typed column arrays of all
+    their events, in the order of the files.
+
+    Args:
+        file_paths : str or list[str]
+            Paths to the QuakeML files, or a glob pattern. The files
+            matching a pattern are parsed in sorted order, and can be
+            compressed with gzip, bz2, xz or zstd.
+        backend : str, optional
+            'sax' or 'lxml'. The lxml parser is faster, the SAX parser is
+            used if lxml is not installed.
+        columns : list[str], optional
+            Columns of the events, all columns if None. Elements that are
+            only needed for other columns are not read.
+        event_filter : EventFilter, optional
+            Filters applied to each event as soon as it is parsed.
+        n_jobs : int, optional
+            Number of processes used, -1 uses all CPUs. If None, the files
+            are parsed in this process.
+
+    Returns:
+        dict[str, np.ndarray]
+            A dictionary of typed column arrays (see QuakeMLColumns).
+    """
+    if isinstance(file_paths, str):
+        file_paths = sorted(glob.glob(file_paths))
+    kwargs = {'include_all_magnitudes': include_all_magnitudes,
+              'include_quality': include_quality, 'backend': backend,
+              'columns': columns, 'event_filter': event_filter}
+
+    if n_jobs is None or len(file_paths) <= 1:
+        return _parse_files(file_paths, kwargs)
+
+    max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    # a few batches of consecutive files per process, each process returns
+    # the columns of a batch so that few arrays are sent back
+    batches = [list(batch) for batch in np.array_split(
+        np.array(file_paths, dtype=object),
+        min(4 * max_workers, len(file_paths)))]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return _concat_columns(list(executor.map(
+            _parse_files, batches, [kwargs] * len(batches))))
+
+
+class _Chunks:
+    """
+    Collects earthquake event information dictionaries in chunks of
+    chunk_size events, can be used as the catalog of the QuakeMLHandler.
+    """
+
+    def __init__(self, chunk_size: int, columnar: bool = False):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.chunk_size = chunk_size
+        self.columnar = columnar
+        self.ready = []
+        self._current = self._new()
+
+    def _new(self) -> list | QuakeMLColumns:
+        return QuakeMLColumns() if self.columnar else []
+
+    def append(self, event: dict):
+        self._current.append(event)
+        if len(self._current) >= self.chunk_size:
+            self.close()
+
+    def close(self):
+        """
+        Ends the current chunk if it contains events.
+        """
+        if len(self._current):
+            self.ready.append(self._current)
+            self._current = self._new()
+
+    def pop(self) -> list[list[dict] | dict[str, np.ndarray]]:
+        """
+        Removes and returns the completed chunks.
+        """
+        ready, self.ready = self.ready, []
+        return [c.to_dict() if self.columnar else c for c in ready]
+
+
+def iter_quakeml(
+        source, chunk_size: int = 50_000,
+        include_all_magnitudes: bool = True,
+        include_quality: bool = True, backend: str = 'sax',
+        columnar: bool = False, columns: list[str] | None = None,
+        event_filter: EventFilter | None = None):
+    """
+    Parse QuakeML incrementally and yield the earthquake event information
+    dictionaries in chunks as they are parsed, so that only one chunk is
+    held in memory at a time.
+
+    Args:
+        source : str, file-like or Response
+            Path to a QuakeML file, which can be compressed with gzip, bz2,
+            xz or zstd, file-like object with QuakeML or response object
+            from a QuakeML request.
+        chunk_size : int, optional
+            Number of events of each chunk, the last chunk can be smaller.
+        backend : str, optional
+            'sax' or 'lxml'. The lxml parser is faster, the SAX parser is
+            used if lxml is not installed.
+        columnar : bool, optional
+            If True, yield dictionaries of typed column arrays instead
+            (see QuakeMLColumns).
+        columns : list[str], optional
+            Columns of the events, all columns if None. Elements that are
+            only needed for other columns are not read.
+        event_filter : EventFilter, optional
+            Filters applied to each event as soon as it is parsed.
+
+    Yields:
+        list[dict]
+            A list of earthquake event information dictionaries.
+    """
+    chunks = _Chunks(chunk_size, columnar)
+    if isinstance(source, Response):
+        source.raw.decode_content = True  # if content-encoding is used decode
+        source = source.raw
+
+    with ExitStack() as stack:
+        if isinstance(source, str):
+            source = stack.enter_context(_open_quakeml(source))
+        if _use_lxml(backend):
+            for event in _iterparse_events(source, include_all_magnitudes,
+                                           include_quality, columns,
+                                           event_filter):
+                chunks.append(event)
+                yield from chunks.pop()
+        else:
+            handler = QuakeMLHandler(
+                chunks, include_all_magnitudes, include_quality, columns,
+                event_filter)
+            parser = xml.sax.make_parser()
+            parser.setContentHandler(handler)
+            if isinstance(source, str):
+                source = stack.enter_context(open(source, 'rb'))
+            try:
+                while block := source.read(_BLOCK_SIZE):
+                    parser.feed(block)
+                    yield from chunks.pop()
+                parser.close()
+            except SAXParseException as e:
+                if 'no element found' not in str(e):
+                    raise e
+
+    chunks.close()
+    yield from chunks.pop()
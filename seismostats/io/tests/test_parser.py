@@ -1,14 +1,23 @@
+import bz2
+import gzip
+import lzma
 import os
 import xml.sax
+from datetime import datetime
 from xml.sax._exceptions import SAXParseException
 
 import numpy as np
+import pandas as pd
 import pytest
 import requests
 import responses
 
-from seismostats.io.parser import (QuakeMLHandler, parse_quakeml,
-                                   parse_quakeml_file, parse_quakeml_response)
+import seismostats.io.parser
+from seismostats.io.parser import (EventFilter, QuakeMLColumns, QuakeMLHandler,
+                                   _lxml_available, _zstandard_available,
+                                   iter_quakeml, parse_quakeml,
+                                   parse_quakeml_file, parse_quakeml_files,
+                                   parse_quakeml_response)
 
 OUT = [
     {
@@ -239,3 +248,232 @@ def test_parse_quakeml_response():
 
     with pytest.raises(SAXParseException):
         catalog = parse_quakeml_response(resp3)
+
+
+@pytest.mark.skipif(not _lxml_available, reason="lxml is not installed")
+def test_parse_quakeml_lxml():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+    with open(xml_file, 'r') as f:
+        xml_str = f.read()
+
+    for include_all_magnitudes, include_quality in [(True, True),
+                                                    (False, False)]:
+        expected = parse_quakeml_file(
+            xml_file, include_all_magnitudes, include_quality)
+        catalog = parse_quakeml_file(
+            xml_file, include_all_magnitudes, include_quality,
+            backend='lxml')
+        assert catalog == expected
+        catalog = parse_quakeml(
+            xml_str, include_all_magnitudes, include_quality,
+            backend='lxml')
+        assert catalog == expected
+
+    catalog = parse_quakeml_file('seismostats/io/tests/empty.xml',
+                                 backend='lxml')
+    assert catalog == []
+
+    with pytest.raises(SyntaxError):
+        parse_quakeml_file('seismostats/io/tests/wrong.xml', backend='lxml')
+
+
+def test_parse_quakeml_backend(monkeypatch):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+
+    with pytest.raises(ValueError):
+        parse_quakeml_file(xml_file, backend='dom')
+
+    # falls back to the SAX parser without lxml
+    monkeypatch.setattr(seismostats.io.parser, '_lxml_available', False)
+    with pytest.warns(UserWarning):
+        catalog = parse_quakeml_file(xml_file, backend='lxml')
+    np.testing.assert_equal(sorted(catalog, key=lambda k: k['eventID']),
+                            sorted(OUT, key=lambda k: k['eventID']))
+
+
+@pytest.mark.parametrize('backend', ['sax', 'lxml'])
+def test_parse_quakeml_columnar(backend, monkeypatch):
+    if backend == 'lxml' and not _lxml_available:
+        pytest.skip("lxml is not installed")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+
+    # the values are converted in several chunks
+    monkeypatch.setattr(QuakeMLColumns, '_chunk_size', 3)
+    expected = parse_quakeml_file(xml_file, backend=backend)
+    columns = parse_quakeml_file(xml_file, columnar=True, backend=backend)
+    assert list(columns) == list(dict.fromkeys(k for e in expected for k in e))
+    assert all(len(values) == len(expected) for values in columns.values())
+
+    assert columns['time'].dtype == 'datetime64[ns]'
+    np.testing.assert_array_equal(
+        columns['time'],
+        pd.to_datetime([e['time'] for e in expected]).tz_localize(None))
+    for column in ['eventID', 'event_type', 'magnitude_type']:
+        assert columns[column].dtype == object
+        assert list(columns[column]) == [e[column] for e in expected]
+    for column in ['latitude', 'magnitude', 'magnitude_MLv',
+                   'depth_uncertainty', 'associatedphasecount']:
+        assert columns[column].dtype == float
+        np.testing.assert_array_equal(
+            columns[column],
+            np.array([e.get(column) for e in expected], dtype=float))
+
+    assert parse_quakeml_file('seismostats/io/tests/empty.xml',
+                              columnar=True, backend=backend) == {}
+
+
+def test_quakeml_columns():
+    data = QuakeMLColumns()
+    data._chunk_size = 2
+    data.append({'eventID': 'a', 'magnitude': '1.5'})
+    data.append({'eventID': 'b', 'magnitude': None})
+    # a new column is filled with missing values for the earlier events
+    data.append({'eventID': 'c', 'magnitude': '2',
+                 'time': '2020-01-01T00:00:00Z'})
+    assert len(data) == 3
+
+    columns = data.to_dict()
+    assert list(columns) == ['eventID', 'magnitude', 'time']
+    assert list(columns['eventID']) == ['a', 'b', 'c']
+    np.testing.assert_array_equal(columns['magnitude'], [1.5, np.nan, 2.0])
+    np.testing.assert_array_equal(
+        columns['time'],
+        np.array(['NaT', 'NaT', '2020-01-01'], dtype='datetime64[ns]'))
+
+
+@pytest.mark.parametrize('backend', ['sax', 'lxml'])
+def test_iter_quakeml(backend, monkeypatch):
+    if backend == 'lxml' and not _lxml_available:
+        pytest.skip("lxml is not installed")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+    expected = parse_quakeml_file(xml_file)
+
+    # the file is read in several blocks
+    monkeypatch.setattr(seismostats.io.parser, '_BLOCK_SIZE', 1000)
+    chunks = list(iter_quakeml(xml_file, chunk_size=3, backend=backend))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert [e for chunk in chunks for e in chunk] == expected
+
+    with open(xml_file, 'rb') as f:
+        chunks = list(iter_quakeml(f, chunk_size=2, columnar=True,
+                                   backend=backend))
+    assert [len(chunk['eventID']) for chunk in chunks] == [2, 2]
+
+    assert list(iter_quakeml('seismostats/io/tests/empty.xml',
+                             backend=backend)) == []
+    with pytest.raises(ValueError):
+        next(iter_quakeml(xml_file, chunk_size=0))
+
+
+@pytest.mark.parametrize('backend', ['sax', 'lxml'])
+def test_parse_quakeml_selection(backend):
+    if backend == 'lxml' and not _lxml_available:
+        pytest.skip("lxml is not installed")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+    expected = parse_quakeml_file(xml_file)
+
+    columns = ['time', 'magnitude', 'magnitude_MLv', 'associatedphasecount']
+    catalog = parse_quakeml_file(xml_file, columns=columns, backend=backend)
+    assert catalog == [{k: v for k, v in e.items() if k in columns}
+                       for e in expected]
+
+    event_filter = EventFilter(start_time='2021-12-25',
+                               end_time='2021-12-30T00:00:00Z',
+                               min_magnitude=1.0, min_latitude=46,
+                               event_type=['earthquake'])
+    catalog = parse_quakeml_file(xml_file, columns=['eventID'],
+                                 event_filter=event_filter, backend=backend)
+    assert catalog == [{'eventID': e['eventID']} for e in expected
+                       if event_filter(e)]
+    assert 0 < len(catalog) < len(expected)
+
+    # the filtered columns are read even if they are not returned
+    assert parse_quakeml_file(
+        xml_file, columns=['eventID'], backend=backend,
+        event_filter=EventFilter(max_magnitude=-10)) == []
+
+
+def test_event_filter():
+    event = {'time': '2021-12-30T07:43:14.681975Z', 'latitude': '46.05',
+             'longitude': '7.38', 'magnitude': '2.5',
+             'event_type': 'earthquake'}
+    assert EventFilter()(event)
+    assert EventFilter(start_time='2021-12-30T07:43:14.681975',
+                       end_time=datetime(2021, 12, 31), min_latitude=46,
+                       max_longitude=7.38, min_magnitude=2.5,
+                       event_type='earthquake')(event)
+    assert not EventFilter(end_time='2021-12-30')(event)
+    assert not EventFilter(max_magnitude=2.4)(event)
+    assert not EventFilter(event_type=['explosion'])(event)
+    # events with a missing value are dropped
+    assert not EventFilter(min_magnitude=1)(event | {'magnitude': None})
+
+
+def test_parse_quakeml_files(tmp_path):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_files = [os.path.join(current_dir, 'query.xml'),
+                 os.path.join(current_dir, 'empty.xml'),
+                 os.path.join(current_dir, 'query.xml')]
+    expected = parse_quakeml_file(xml_files[0], columnar=True)
+    columns = parse_quakeml_files(xml_files)
+    assert list(columns) == list(expected)
+    for column, values in columns.items():
+        np.testing.assert_array_equal(
+            values, np.concatenate([expected[column]] * 2))
+
+    # the same order with a process pool
+    parallel = parse_quakeml_files(xml_files, n_jobs=2)
+    assert list(parallel) == list(columns)
+    for column, values in columns.items():
+        np.testing.assert_array_equal(parallel[column], values)
+
+    # columns missing in a file are filled with missing values
+    (tmp_path / 'a.xml').write_text(open(xml_files[0]).read())
+    (tmp_path / 'b.xml').write_text(open(xml_files[0]).read().replace(
+        '<type>earthquake</type>', ''))
+    columns = parse_quakeml_files(str(tmp_path / '*.xml'),
+                                  columns=['event_type', 'magnitude'])
+    assert list(columns['event_type']) == ['earthquake'] * 4 + [None] * 4
+    assert len(columns['magnitude']) == 8
+
+    assert parse_quakeml_files([]) == {}
+
+
+def _compress_zstd(data: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize('compress', [
+    gzip.compress, bz2.compress, lzma.compress,
+    pytest.param(_compress_zstd, marks=pytest.mark.skipif(
+        not _zstandard_available, reason="zstandard is not installed"))])
+@pytest.mark.parametrize('backend', ['sax', 'lxml'])
+def test_parse_quakeml_compressed(compress, backend, tmp_path):
+    if backend == 'lxml' and not _lxml_available:
+        pytest.skip("lxml is not installed")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    xml_file = os.path.join(current_dir, 'query.xml')
+    expected = parse_quakeml_file(xml_file)
+
+    # the compression is detected from the content, not the file name
+    compressed = tmp_path / 'query.xml'
+    with open(xml_file, 'rb') as f:
+        compressed.write_bytes(compress(f.read()))
+
+    assert parse_quakeml_file(str(compressed), backend=backend) == expected
+    chunks = iter_quakeml(str(compressed), chunk_size=3, backend=backend)
+    assert [e for chunk in chunks for e in chunk] == expected
+
+
+def test_parse_quakeml_zstd_missing(tmp_path, monkeypatch):
+    compressed = tmp_path / 'query.xml.zst'
+    compressed.write_bytes(b'\x28\xb5\x2f\xfd' + bytes(10))
+    monkeypatch.setattr(seismostats.io.parser, '_zstandard_available', False)
+    with pytest.raises(ImportError):
+        parse_quakeml_file(str(compressed))
@@ -5,6 +5,7 @@ import numpy as np
 from scipy.stats import norm
 
 # Own functions
+from seismostats.analysis.bvalue import estimate_b_by_mc
 from seismostats.analysis.bvalue.base import BValueEstimator
 from seismostats.analysis.bvalue.classic import ClassicBValueEstimator
 
@@ -38,18 +39,8 @@ def plot_mc_vs_b(
         ax that was plotted on
     """
 
-    b_values = []
-    b_errors = []
-    estimator = b_method()
-
-    for mc in mcs:
-        estimator.calculate(
-            magnitudes, mc=mc, delta_m=delta_m, **kwargs)
-        b_values.append(estimator.b_value)
-        b_errors.append(estimator.std)
-
-    b_values = np.array(b_values)
-    b_errors = np.array(b_errors)
+    b_values, b_errors, _ = estimate_b_by_mc(
+        magnitudes, mcs, delta_m, method=b_method, **kwargs)
 
     if ax is None:
         _, ax = plt.subplots()
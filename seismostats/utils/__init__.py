@@ -2,7 +2,7 @@ import functools
 import math
 
 import pandas as pd
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 
 from seismostats.utils.binning import (bin_to_precision, get_cum_fmd,  # noqa
                                        get_fmd)
@@ -74,7 +74,7 @@ def is_nan(value):
     return isinstance(value, float) and math.isnan(value)
 
 
-def _render_template(data: dict, template_path: str) -> str:
+def _get_template(template_path: str) -> Template:
 
     env = Environment(
         loader=FileSystemLoader('/'),  # Base directory for templates
@@ -82,7 +82,12 @@ def _render_template(data: dict, template_path: str) -> str:
     )
     env.tests['nan'] = is_nan
 
-    template = env.get_template(template_path)
+    return env.get_template(template_path)
+
+
+def _render_template(data: dict, template_path: str) -> str:
+
+    template = _get_template(template_path)
 
     qml = template.render(**data)
     return qml